@@ -1,19 +1,52 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 import base64
+import logging
 
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, Path as PathParam, Query, Response, UploadFile, File
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 from typing import List
 from pydantic import BaseModel
 import uuid
 
-from poster_schemas import PosterConfig, PosterType
+from poster_schemas import PosterConfig, PosterType, RenderQuality
 from poster_defaults import get_poster_default
-from pine_poster_adapter import cleanup_uploads, render_pine_poster_from_config
+from poster_result import RenderResult
+from pine_poster_adapter import cleanup_uploads
 from pine_poster import CENTER_UPLOAD_DIR, LABEL_UPLOAD_DIR
+from poster_executor import CONFIG_ERRORS, RenderQueueFull, RenderWorkerError, render_executor
+from poster_cache import render_cache, render_cache_key, resolve_render_defaults
+from poster_raster import WARM_SCALES
+from poster_templates import preload_templates
+from poster_batch import BATCH_MAX_ITEMS, batch_executor, stream_batch_zip
+from poster_images import preload_center_image, prepare_avatar
+from poster_output import EXTENSIONS, MEDIA_TYPES, resolve_output
+from poster_jobs import job_runner
+from poster_preview import PreviewSession
 
-app = FastAPI(title="Pine Poster API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Decode templates and pre-start the render worker pool so the first
+    # request doesn't pay for either.
+    preload_templates(WARM_SCALES)
+    render_executor.start()
+    batch_executor.start()
+    # Queued jobs (including ones interrupted by the last shutdown) resume here.
+    job_runner.start()
+    yield
+    job_runner.shutdown()
+    batch_executor.shutdown()
+    render_executor.shutdown()
+
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Pine Poster API", lifespan=lifespan)
 
 # Allow Next.js dev server
 app.add_middleware(
@@ -25,6 +58,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # let the editor read the binary render endpoint's cache headers
+    expose_headers=["ETag", "Content-Location", "X-Poster-Cached"],
 )
 
 
@@ -33,6 +68,12 @@ class CleanupPayload(BaseModel):
     label_images: list[str | None] | None = None
 
 
+class JobRequest(BaseModel):
+    config: PosterConfig | None = None
+    configs: list[PosterConfig] | None = None
+    quality: RenderQuality | None = None
+
+
 @app.get("/poster/default")
 def get_default(
     poster_type: PosterType = Query(..., description="One of: pie, bar, dual")
@@ -41,28 +82,246 @@ def get_default(
     return cfg.model_dump(by_alias=True)
 
 
-@app.post("/poster/render")
-def render_poster(config: PosterConfig):
+# Rendered posters are content-addressed by render_cache_key, so a key
+# always names the same bytes: strong ETags, immutable caching.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _prepare_render(
+    config: PosterConfig, quality: RenderQuality | None, adaptive: bool = True
+) -> tuple[PosterConfig, str]:
+    config = resolve_render_defaults(config)
+    # Resolve the effective quality before keying, so a load-degraded
+    # preview is cached as the draft it actually is. Batches pass
+    # adaptive=False: their output must not depend on current load.
+    effective = quality or config.quality
+    if adaptive:
+        effective = render_executor.adapt_quality(effective)
+    if effective != config.quality:
+        config = config.model_copy(update={"quality": effective})
+    return config, render_cache_key(config)
+
+
+def _render_cached(config: PosterConfig, cache_key: str) -> tuple[RenderResult, bool]:
     try:
-        out_path: Path = render_pine_poster_from_config(config)
-    except Exception as e:
+        return render_cache.get_or_render(cache_key, lambda: render_executor.render(config))
+    except (RenderQueueFull, RenderWorkerError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except CONFIG_ERRORS as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception(
+            "Render failed", extra={"event": "render_failed", "cache_key": cache_key}
+        )
+        raise HTTPException(status_code=500, detail="Render failed") from e
+
 
-    if not out_path.exists():
-        raise HTTPException(status_code=500, detail="Rendered file missing on disk")
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
 
-    with out_path.open("rb") as f:
-        img_bytes = f.read()
 
-    b64 = base64.b64encode(img_bytes).decode("ascii")
+def _poster_path(cache_key: str, media_type: str) -> str:
+    return f"/poster/{cache_key}.{EXTENSIONS[media_type]}"
+
+
+@app.post("/poster/render")
+def render_poster(
+    config: PosterConfig,
+    quality: RenderQuality | None = Query(
+        None, description="Override config.quality: draft, preview, standard or export"
+    ),
+):
+    config, cache_key = _prepare_render(config, quality)
+    result, cached = _render_cached(config, cache_key)
+
+    b64 = base64.b64encode(result.image_bytes).decode("ascii")
 
     return {
         "ok": True,
         "image_base64": b64,
+        "media_type": result.media_type,
+        "cache_key": cache_key,
+        "cached": cached,
         "config_used": config.model_dump(by_alias=True),
     }
 
 
+@app.post("/poster/render/image")
+def render_poster_image(
+    config: PosterConfig,
+    quality: RenderQuality | None = Query(
+        None, description="Override config.quality: draft, preview, standard or export"
+    ),
+    if_none_match: str | None = Header(None),
+):
+    """
+    Render and return the raw image bytes (no base64/JSON). The ETag is the
+    config's cache key, so a matching If-None-Match gets a 304 without
+    rendering; Content-Location names the cached GET URL for the poster.
+    """
+    config, cache_key = _prepare_render(config, quality)
+    etag = f'"{cache_key}"'
+    if _etag_matches(if_none_match, etag):
+        fmt = resolve_output(config.quality, config.output and config.output.model_dump())["format"]
+        return Response(status_code=304, headers={
+            "ETag": etag,
+            "Content-Location": _poster_path(cache_key, MEDIA_TYPES[fmt]),
+        })
+
+    result, cached = _render_cached(config, cache_key)
+    return Response(
+        content=result.image_bytes,
+        media_type=result.media_type,
+        headers={
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Content-Location": _poster_path(cache_key, result.media_type),
+            "X-Poster-Cached": "1" if cached else "0",
+        },
+    )
+
+
+@app.post("/poster/render/batch")
+def render_poster_batch(
+    configs: List[PosterConfig],
+    quality: RenderQuality | None = Query(
+        None, description="Override every config's quality: draft, preview, standard or export"
+    ),
+):
+    """
+    Render many posters in parallel and stream them back as a ZIP, entry by
+    entry as they finish. Identical configs render once; per-item errors
+    are reported in the trailing manifest.json instead of failing the batch.
+    """
+    if not configs:
+        raise HTTPException(status_code=400, detail="No configs to render")
+    if len(configs) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"A batch takes at most {BATCH_MAX_ITEMS} configs"
+        )
+
+    items = [_prepare_render(config, quality, adaptive=False) for config in configs]
+    # Report packs render on the batch pool, so they never hold the workers
+    # that interactive renders and live previews are waiting for.
+    return StreamingResponse(
+        stream_batch_zip(items, render_cache.get_or_render),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="posters.zip"'},
+    )
+
+
+@app.websocket("/poster/preview/ws")
+async def preview_socket(websocket: WebSocket):
+    """
+    Live preview channel for the editor: send every config edit, receive
+    only the newest render (see PreviewSession for the message protocol).
+    """
+    await websocket.accept()
+    session = PreviewSession(
+        websocket,
+        prepare=_prepare_render,
+        render=lambda config, key: render_cache.get_or_render(
+            key, lambda: render_executor.render(config)
+        ),
+    )
+    try:
+        await session.run()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/poster/render/stats")
+def render_stats():
+    return {**render_executor.stats(), "cache": render_cache.stats(),
+            "batch": batch_executor.stats(), "jobs": job_runner.stats()}
+
+
+def _job_status(job: dict) -> dict:
+    def ms(start, end):
+        return round((end - start) * 1000, 1) if start is not None and end is not None else None
+
+    status = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": {"done": job["progress_done"], "total": job["progress_total"]},
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "queue_ms": ms(job["created_at"], job["started_at"]),
+        "run_ms": ms(job["started_at"], job["finished_at"]),
+        "attempts": job["attempts"],
+        "error": job["error"],
+    }
+    if job["status"] == "done":
+        status["media_type"] = job["media_type"]
+        status["result_url"] = f"/poster/jobs/{job['id']}/result"
+        if job["cache_key"]:
+            status["cache_key"] = job["cache_key"]
+    return status
+
+
+@app.post("/poster/jobs", status_code=202)
+def submit_render_job(request: JobRequest):
+    """
+    Queue a render (`config`) or a ZIP batch (`configs`) and return at once.
+    Jobs run on their own worker pool, persist in SQLite across restarts,
+    and are polled through GET /poster/jobs/{job_id}.
+    """
+    if (request.config is None) == (request.configs is None):
+        raise HTTPException(status_code=400, detail="Send exactly one of config or configs")
+    configs = [request.config] if request.config is not None else request.configs
+    if not configs:
+        raise HTTPException(status_code=400, detail="No configs to render")
+    if len(configs) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"A batch takes at most {BATCH_MAX_ITEMS} configs"
+        )
+
+    # Jobs aren't interactive: no load-based quality downgrade, only the
+    # pinned defaults (e.g. today's date) and an explicit quality override.
+    configs = [resolve_render_defaults(config) for config in configs]
+    if request.quality:
+        configs = [config.model_copy(update={"quality": request.quality}) for config in configs]
+
+    job_id = job_runner.submit(configs, batch=request.configs is not None)
+    return {
+        "ok": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/poster/jobs/{job_id}",
+    }
+
+
+@app.get("/poster/jobs/{job_id}")
+def get_render_job(job_id: str):
+    job = job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return _job_status(job)
+
+
+@app.get("/poster/jobs/{job_id}/result")
+def get_render_job_result(job_id: str):
+    result = job_runner.store.result(job_id)
+    if result is None:
+        job = job_runner.store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, not done")
+
+    media_type, content = result
+    headers = {"Cache-Control": "private, max-age=3600"}
+    if media_type == "application/zip":
+        headers["Content-Disposition"] = 'attachment; filename="posters.zip"'
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
 @app.post("/poster/upload/center-image")
 async def upload_center_image(file: UploadFile = File(...)):
     suffix = Path(file.filename).suffix.lower()
@@ -71,6 +330,8 @@ async def upload_center_image(file: UploadFile = File(...)):
 
     content = await file.read()
     dest.write_bytes(content)
+    # resized watermark for every renderer/warm tier, so renders just paste it
+    await run_in_threadpool(preload_center_image, str(dest))
 
     # Return the absolute path to store in config.center_image
     return {"path": str(dest)}
@@ -92,6 +353,8 @@ async def upload_label_images(files: List[UploadFile] = File(...)):
 
         contents = await f.read()
         dest.write_bytes(contents)
+        # circle-cropped thumbnail now, so renders never decode the original
+        await run_in_threadpool(prepare_avatar, str(dest))
 
         saved_paths.append(str(dest))
 
@@ -111,3 +374,20 @@ def cleanup_poster_uploads(payload: CleanupPayload):
     return {"ok": True, **result}
 
 
+# Declared last: the {hash}.{ext} pattern must not shadow the named routes above.
+@app.get("/poster/{cache_key}.{ext}")
+def get_poster_image(
+    cache_key: str = PathParam(..., pattern=r"^[0-9a-f]{64}$"),
+    ext: str = PathParam(...),
+    if_none_match: str | None = Header(None),
+):
+    """Serve an already-rendered poster straight from the render cache."""
+    etag = f'"{cache_key}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    result = render_cache.get(cache_key)
+    if result is None or EXTENSIONS.get(result.media_type) != ext:
+        raise HTTPException(status_code=404, detail="Poster not found in the render cache")
+    return Response(content=result.image_bytes, media_type=result.media_type, headers=headers)
@@ -1,34 +1,27 @@
 # pine_overlay_chart_dual_axis_optional_right_highlight_points.py
 
-from collections import OrderedDict
-from PIL import Image, ImageDraw, ImageFont
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+from PIL import ImageDraw
 import matplotlib.dates as mdates
 import matplotlib.ticker as mticker
 import numpy as np
-from datetime import datetime, timedelta, timezone
-from dateutil import parser as dateparser
+from datetime import datetime, timedelta
 from matplotlib.font_manager import FontProperties
-import os
-import io
-import urllib.request
-from pathlib import Path
 import logging
 
-
-# ---------------------- File Helpers  ----------------------
-BASE_DIR = Path(__file__).resolve().parent
-GRAPHS_DIR = BASE_DIR / "graphs"
-TEMPLATE_DIR = GRAPHS_DIR / "templates"
-TMP_DIR = GRAPHS_DIR / "tmp"
-
-GRAPHS_DIR.mkdir(parents=True, exist_ok=True)
-TMP_DIR.mkdir(parents=True, exist_ok=True)
-
-DEFAULT_TEMPLATE_PATH = TEMPLATE_DIR / "main_template.png"
-DEFAULT_TEMPLATE_NAME = "main"
-DEFAULT_OUTPUT_PATH = GRAPHS_DIR / "pine_poster_datetime.png"
+from poster_raster import DEFAULT_QUALITY, chart_box, figure_to_image, new_chart_figure, quality_scale
+from poster_dates import bucket_starts, parse_x_values, to_datetime64
+from poster_collections import add_bars, add_vspans
+from poster_decimate import (
+    lttb_indices,
+    minmax_indices,
+    point_budget,
+    tiled_bar_edges,
+    with_required,
+)
+from poster_result import encode_poster
+from poster_fonts import get_font
+from poster_images import CENTER_WATERMARKS, center_diameter, center_watermark
+from poster_templates import DEFAULT_TEMPLATE_NAME, get_template
 
 
 logger = logging.getLogger(__name__)
@@ -48,159 +41,131 @@ def _time_range_to_timedelta(r: str):
     return None
 
 
-def _normalize_datetime_to_naive_utc(dt: datetime) -> datetime:
-    if dt.tzinfo is None:
-        return dt
-    return dt.astimezone(timezone.utc).replace(tzinfo=None)
-
-
-def apply_time_range(xs, left_series_dict, right_series, time_range: str):
+def apply_time_range(xs, Y_left, Y_right, time_range: str):
     """
-    xs: list[datetime]
-    left_series_dict: dict[str, list[float]] from y_series (all same length)
-    right_series: list[float] or None
+    xs: datetime64 array (naive UTC)
+    Y_left: 2-D float array, one row per left series
+    Y_right: 1-D float array or None
     time_range: one of the TimeRange values
-    """
 
-    if not xs:
-        return xs, left_series_dict, right_series
+    Keeps the trailing `time_range` window. Sorted x (the normal case) is
+    cut with searchsorted, so the returned arrays are views, not copies.
+    """
 
     dt = _time_range_to_timedelta(time_range)
-    if dt is None:
-        return xs, left_series_dict, right_series
-
-    max_ts = max(xs)
-    start_ts = max_ts - dt
+    if dt is None or xs.size == 0:
+        return xs, Y_left, Y_right
 
-    keep_indices = [i for i, x in enumerate(xs) if x >= start_ts]
+    start_ts = xs.max() - np.timedelta64(dt)
 
-    if not keep_indices:
-        return xs, left_series_dict, right_series
-
-    def _filter_list(lst):
-        return [lst[i] for i in keep_indices]
-
-    xs_f = _filter_list(xs)
-
-    left_filtered = {key: _filter_list(vals) for key, vals in left_series_dict.items()}
-
-    if right_series is not None:
-        right_filtered = _filter_list(right_series)
+    if xs.size < 2 or bool((xs[1:] >= xs[:-1]).all()):
+        keep = slice(int(np.searchsorted(xs, start_ts, side="left")), None)
     else:
-        right_filtered = None
-
-    return xs_f, left_filtered, right_filtered
-
-
-def _bucket_start(dt: datetime, time_bucket: str) -> datetime | None:
-    bucket = (time_bucket or "none").lower()
+        keep = xs >= start_ts
 
-    if bucket in ("none", "off", "all"):
-        return None
+    right_filtered = Y_right[keep] if Y_right is not None else None
+    return xs[keep], Y_left[:, keep], right_filtered
 
-    if bucket == "7d":
-        base = dt - timedelta(days=dt.weekday())
-        return datetime(base.year, base.month, base.day)
 
-    if bucket == "30d":
-        return datetime(dt.year, dt.month, 1)
+BUCKET_AGGS = ("sum", "mean", "min", "max", "last", "count")
 
-    if bucket == "90d":
-        quarter_start_month = 3 * ((dt.month - 1) // 3) + 1
-        return datetime(dt.year, quarter_start_month, 1)
 
-    if bucket == "180d":
-        half_year_month = 1 if dt.month <= 6 else 7
-        return datetime(dt.year, half_year_month, 1)
+def _reduce_buckets(values, starts, ends, agg: str):
+    """Grouped reduction along the last axis; bucket i is values[..., starts[i]:ends[i]]."""
+    if agg == "sum":
+        return np.add.reduceat(values, starts, axis=-1)
+    if agg == "mean":
+        return np.add.reduceat(values, starts, axis=-1) / (ends - starts)
+    if agg == "min":
+        return np.minimum.reduceat(values, starts, axis=-1)
+    if agg == "max":
+        return np.maximum.reduceat(values, starts, axis=-1)
+    if agg == "last":
+        return values[..., ends - 1]
+    if agg == "count":
+        counts = (ends - starts).astype(float)
+        return np.broadcast_to(counts, values.shape[:-1] + counts.shape).copy()
+    raise ValueError(f"bucket aggregation must be one of: {', '.join(BUCKET_AGGS)}")
 
-    if bucket == "1y":
-        return datetime(dt.year, 1, 1)
-
-    return None
 
+def apply_time_bucket(xs, Y_left, Y_right, time_bucket: str, agg_left="sum", agg_right="sum"):
+    """
+    Aggregate datetime-series points into calendar buckets.
 
-def apply_time_bucket(xs, left_series_dict, right_series, time_bucket: str):
-    """Aggregate datetime-series points into requested time buckets."""
+    agg_left is one aggregation for every left series, or a list with one
+    per row of Y_left; agg_right applies to the right series. Each is one
+    of BUCKET_AGGS (e.g. sum volumes, but average a price).
+    """
 
-    if not xs:
-        return xs, left_series_dict, right_series
+    if xs.size == 0:
+        return xs, Y_left, Y_right
 
-    bucket_labels = [_bucket_start(x, time_bucket) for x in xs]
-    if all(b is None for b in bucket_labels):
-        return xs, left_series_dict, right_series
+    keys = bucket_starts(xs, time_bucket)
+    if keys is None:
+        # no bucketing: points keep the order they were given in
+        return xs, Y_left, Y_right
 
-    labels = list(left_series_dict.keys())
-    order = sorted(range(len(xs)), key=lambda i: xs[i])
-    buckets = OrderedDict()
+    if xs.size > 1 and not bool((xs[1:] >= xs[:-1]).all()):
+        order = np.argsort(xs, kind="stable")
+        xs, keys, Y_left = xs[order], keys[order], Y_left[:, order]
+        Y_right = Y_right[order] if Y_right is not None else None
 
-    for idx in order:
-        b_start = bucket_labels[idx]
-        if b_start is None:
-            return xs, left_series_dict, right_series
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], keys.size)
 
-        bucket = buckets.get(b_start)
-        if bucket is None:
-            bucket = {
-                "left": {label: 0.0 for label in labels},
-                "right": 0.0 if right_series is not None else None,
-            }
-            buckets[b_start] = bucket
+    if isinstance(agg_left, str):
+        left_bucketed = _reduce_buckets(Y_left, starts, ends, agg_left)
+    else:
+        left_bucketed = np.array(
+            [_reduce_buckets(row, starts, ends, agg) for row, agg in zip(Y_left, agg_left)]
+        ).reshape(Y_left.shape[0], starts.size)
 
-        for label in labels:
-            bucket["left"][label] += float(left_series_dict[label][idx])
+    right_bucketed = None
+    if Y_right is not None:
+        right_bucketed = _reduce_buckets(Y_right, starts, ends, agg_right)
 
-        if right_series is not None and bucket["right"] is not None:
-            bucket["right"] += float(right_series[idx])
+    return keys[starts], left_bucketed, right_bucketed
 
-    xs_bucketed = list(buckets.keys())
-    left_bucketed = {
-        label: [bucket["left"][label] for bucket in buckets.values()]
-        for label in labels
-    }
 
-    right_bucketed = None
-    if right_series is not None:
-        right_bucketed = [bucket["right"] for bucket in buckets.values()]
+# ------------------ highlight lookup -----------------------
+def _to_x_plot_many(values, x_is_date: bool) -> np.ndarray:
+    """Convert raw highlight x values / region bounds to the plot's x scale in one call."""
+    if x_is_date:
+        return mdates.date2num(to_datetime64(values))
+    return np.asarray(values, dtype=float)
 
-    return xs_bucketed, left_bucketed, right_bucketed
 
-def _resolve_template_path(template_name: str) -> Path:
+def _nearest_indices(x_plot: np.ndarray, targets: np.ndarray) -> np.ndarray:
     """
-    Map a simple template name to a template PNG filename.
-
-    For now:
-      "main" -> main_template.png
-
-    Later you can add:
-      "dark" -> dark_template.png
-      "alt"  -> alt_template.png
+    Index of the sample nearest to each target, via a binary search over the
+    sorted x index (O(m log n) for m targets instead of m full scans). Ties go
+    to the earliest sample, like np.argmin(np.abs(x_plot - target)).
     """
-    name = (template_name or DEFAULT_TEMPLATE_NAME).strip().lower()
+    targets = np.asarray(targets, dtype=float)
+    if targets.size == 0 or x_plot.size == 0:
+        return np.empty(targets.size, dtype=np.intp)
 
-    # simple convention: <name>_template.png
-    candidate = TEMPLATE_DIR / f"{name}_template.png"
-    if candidate.exists():
-        return candidate
+    order = None
+    xs = x_plot
+    if x_plot.size > 1 and np.any(x_plot[1:] < x_plot[:-1]):
+        order = np.argsort(x_plot, kind="stable")
+        xs = x_plot[order]
 
-    # fallback to main if missing
-    return DEFAULT_TEMPLATE_PATH
+    right = np.minimum(np.searchsorted(xs, targets), xs.size - 1)
+    left = np.maximum(right - 1, 0)
+    # first sample of each run of equal x (lowest original index after a stable sort)
+    left = np.searchsorted(xs, xs[left], "left")
+    right = np.searchsorted(xs, xs[right], "left")
 
+    d_left = np.abs(xs[left] - targets)
+    d_right = np.abs(xs[right] - targets)
+    if order is None:
+        return np.where(d_right < d_left, right, left)
 
+    left, right = order[left], order[right]
+    take_right = (d_right < d_left) | ((d_right == d_left) & (right < left))
+    return np.where(take_right, right, left)
 
-# ----------------------- font helper -----------------------
-def _pick_font(path_candidates, size):
-    for p in path_candidates or []:
-        if p and os.path.exists(p):
-            try:
-                return ImageFont.truetype(p, size)
-            except Exception:
-                pass
-    for name in ["Courier Prime.ttf", "Courier New.ttf", "DejaVuSansMono.ttf"]:
-        try:
-            return ImageFont.truetype(name, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
 
 # ------------------ color helpers --------------------------
 def _hex_to_rgb01(hexstr):
@@ -386,22 +351,6 @@ def _set_log_ticks(ax, data_arrays, pad_frac=0.22):
     ax.yaxis.get_offset_text().set_visible(False)
 
 
-# ------------------ image helpers --------------------------
-def _load_image(path_or_url):
-    if not path_or_url:
-        return None
-    try:
-        if isinstance(path_or_url, str) and path_or_url.startswith(("http://", "https://")):
-            with urllib.request.urlopen(path_or_url) as resp:
-                data = resp.read()
-            img = Image.open(io.BytesIO(data)).convert("RGBA")
-        else:
-            img = Image.open(path_or_url).convert("RGBA")
-        return img
-    except Exception as e:
-        print("⚠️ Could not load image:", path_or_url, "error:", e)
-        return None
-
 # ----------------------- main render -----------------------
 def _render_pine_poster_dual_impl(
     title,
@@ -421,48 +370,51 @@ def _render_pine_poster_dual_impl(
     log_right=False,
     include_zero_right=True,
     template_name: str = DEFAULT_TEMPLATE_NAME,
+    quality: str = DEFAULT_QUALITY,
+    output=None,
     highlight_regions=None,
     highlight_points=None,
     date_str=None,
     center_image=None,
     time_range="all",
     time_bucket="none",
+    bucket_agg_left="sum",
+    bucket_agg_right="sum",
+    max_points=None,
 ):
-    
-    out_path = DEFAULT_OUTPUT_PATH
-    template_path = _resolve_template_path(template_name)
 
-
-    dpi = 300
+    scale = quality_scale(quality)
+    dpi = 300 * scale
     line_width = 1.1
     base_color_hex = "#1C5C3D"
     area_alpha = 0.18
 
-    # --- normalize LEFT series ---
+    # --- normalize LEFT series (one series x points matrix) ---
     dict_input = isinstance(y_series, dict)
     if dict_input:
         left_labels = list(y_series.keys())
-        Y_left = [np.array(list(y_series[k]), dtype=float) for k in left_labels]
+        left_rows = [y_series[k] for k in left_labels]
     else:
         if hasattr(y_series, "__iter__") and not isinstance(
             y_series[0], (list, tuple, np.ndarray)
         ):
-            Y_left = [np.array(list(y_series), dtype=float)]
+            left_rows = [y_series]
             left_labels = ["Series"]
         else:
-            Y_left = [np.array(list(s), dtype=float) for s in y_series]
-            left_labels = [f"S{i+1}" for i in range(len(Y_left))]
+            left_rows = list(y_series)
+            left_labels = [f"S{i+1}" for i in range(len(left_rows))]
 
-    if not Y_left:
+    if not left_rows:
         raise ValueError("y_series must contain at least one series.")
-    L = len(Y_left[0])
-    if any(len(s) != L for s in Y_left):
+    L = len(left_rows[0])
+    if any(len(s) != L for s in left_rows):
         raise ValueError("All left-axis series must have the same length.")
+    Y_left = np.array(left_rows, dtype=float).reshape(len(left_rows), L)
 
     # --- normalize RIGHT series ---
     Y_right = None
     if right_series is not None:
-        Y_right = [np.array(list(right_series), dtype=float)]
+        Y_right = [np.asarray(right_series, dtype=float)]
         if len(Y_right[0]) != L:
             raise ValueError("right_series must have the same length as left y_series.")
 
@@ -491,168 +443,136 @@ def _render_pine_poster_dual_impl(
         palette_left = list(colors_hex)
 
     # --- template/layout ---
-    template = Image.open(template_path).convert("RGBA")
+    template = get_template(template_name, scale)
     W, H = template.size
+    # matplotlib sizes are in points (DPI already scales them): size them
+    # off the standard-tier height so every quality tier lays out the same
+    pt_H = H / scale
 
-    mpl.rcParams.update({
-        "font.family": "monospace",
-        "font.monospace": ["Courier Prime", "Courier New",
-                           "DejaVuSansMono", "Liberation Mono", "monospace"]
-    })
 
     left_margin = int(0.096 * W)
-    right_margin = int(0.062 * W)
     title_y = int(0.038 * H)
     subtitle_y = int(0.09 * H)
     footer_label_x = int(0.09 * W)
     footer_value_x = footer_label_x + int(0.07 * W)
     date_y = int(0.86 * H)
     note_y = int(0.895 * H)
-    chart_top = int(0.15 * H)
-    chart_bottom = int(0.90 * H)
-    chart_left = footer_value_x - 229
-    chart_right = W - right_margin + 60
+    chart_left, chart_top, chart_right, chart_bottom = chart_box(W, H, scale)
     chart_width = chart_right - chart_left
     chart_height = chart_bottom - chart_top
 
     # --- fonts/canvas ---
-    title_font = _pick_font([None, None], int(0.045 * H))
-    subtitle_font = _pick_font([None, None], int(0.022 * H))
-    footer_font = _pick_font([None, None], int(0.017 * H))
+    title_font = get_font(int(0.045 * H))
+    subtitle_font = get_font(int(0.022 * H))
+    footer_font = get_font(int(0.017 * H))
 
-    base_ylabel_size = int(0.01 * H)
-    base_tick_size = int(0.005 * H)
+    base_ylabel_size = int(0.01 * pt_H)
+    base_tick_size = int(0.005 * pt_H)
 
     ylabel_font_size = max(6, base_ylabel_size - 2.5)
     tick_font_size = max(6, base_tick_size + 2)
-    legend_font_size = max(6, int(0.008 * H))
+    legend_font_size = max(6, int(0.008 * pt_H))
 
     canvas = template.copy()
     draw = ImageDraw.Draw(canvas)
     if title:
-        for dx, dy in [(0,0),(1,0),(0,1)]:
+        shadow = max(1, round(scale))  # faux-bold offset; at least 1px at draft/preview
+        for dx, dy in [(0,0),(shadow,0),(0,shadow)]:
             draw.text((left_margin+dx, title_y+dy), title,
                       fill=(0,0,0,255), font=title_font)
     if subtitle:
         draw.text((left_margin, subtitle_y), subtitle,
                   fill=(0,0,0,255), font=subtitle_font)
 
-    # --- x parsing (shared) ---
+    # --- x parsing (shared; vectorized and memoized in poster_dates) ---
     x_is_date = False
-
-    def _parse_x_values(vals):
-        parsed_dt = []
-        for xv in vals:
-            if isinstance(xv, datetime):
-                dt = xv
-            else:
-                dt = dateparser.parse(str(xv))
-            if not isinstance(dt, datetime):
-                raise ValueError("x_values entries must be datetime-like or numeric")
-            parsed_dt.append(_normalize_datetime_to_naive_utc(dt))
-        return parsed_dt
-
-    def _looks_like_datetime(vals):
-        for xv in vals:
-            if isinstance(xv, datetime):
-                return True
-            if isinstance(xv, str):
-                if any(tok in xv for tok in ("-", "/", "T", ":")):
-                    return True
-            # Also treat pandas/NumPy datetime64 by string inspection
-            if hasattr(xv, "dtype") and "datetime" in str(getattr(xv, "dtype", "")):
-                return True
-        return False
-
-    def _all_numeric(vals):
-        try:
-            [float(v) for v in vals]
-            return True
-        except Exception:
-            return False
-
     if x_values is None:
-        X = list(range(1, L + 1))
+        X = np.arange(1, L + 1, dtype=float)
     else:
-        vals_list = list(x_values)
-        if _looks_like_datetime(vals_list):
-            try:
-                X = _parse_x_values(vals_list)
-                x_is_date = True
-            except Exception as exc:
-                raise ValueError(
-                    "x_values must be parseable datetimes for time-series charts"
-                ) from exc
-        elif _all_numeric(vals_list):
-            X = [float(v) for v in vals_list]
-            x_is_date = False
-        else:
-            try:
-                X = _parse_x_values(vals_list)
-                x_is_date = True
-            except Exception as exc:
-                raise ValueError(
-                    "x_values must be parseable datetimes or numeric values"
-                ) from exc
+        X, x_is_date = parse_x_values(x_values)
 
-    N = len(Y_left[0])
+    N = L
 
     if x_is_date:
-        left_series_dict = {
-            label: list(series) for label, series in zip(left_labels, Y_left)
-        }
-        right_list = Y_right[0].tolist() if Y_right is not None else None
-
-        X, left_series_dict, right_list = apply_time_range(
-            X, left_series_dict, right_list, time_range
-        )
-        X, left_series_dict, right_list = apply_time_bucket(
-            X, left_series_dict, right_list, time_bucket
-        )
-
-        left_labels = list(left_series_dict.keys())
-        Y_left = [np.array(vals, dtype=float) for vals in left_series_dict.values()]
-        if right_list is not None and Y_right is not None:
-            Y_right = [np.array(right_list, dtype=float)]
+        right_arr = Y_right[0] if Y_right is not None else None
+        X, Y_left, right_arr = apply_time_range(X, Y_left, right_arr, time_range)
+        # per-series aggregation may be given as {series label: agg}
+        if isinstance(bucket_agg_left, dict):
+            agg_left = [bucket_agg_left.get(label, "sum") for label in left_labels]
         else:
-            Y_right = None
+            agg_left = bucket_agg_left or "sum"
+        X, Y_left, right_arr = apply_time_bucket(
+            X, Y_left, right_arr, time_bucket, agg_left, bucket_agg_right or "sum"
+        )
+        Y_right = [right_arr] if right_arr is not None else None
 
-        L = len(Y_left[0])
-        N = L
+        L = N = Y_left.shape[1]
 
-    if x_is_date:
-        x_num = mdates.date2num(X)
-        x_plot = x_num
+        x_plot = mdates.date2num(X)
     else:
         try:
-            x_plot = np.array(X, dtype=float)
+            x_plot = np.asarray(X, dtype=float)
         except Exception as exc:
             raise ValueError(
                 "x_values must be numeric when not parsed as datetimes"
             ) from exc
 
-    # helper to convert highlight x to same scale
-    def _to_x_plot(val):
-        if x_is_date:
-            if isinstance(val, datetime):
-                return mdates.date2num(val)
-            else:
-                return mdates.date2num(dateparser.parse(str(val)))
-        else:
-            return float(val)
+    # --- highlight resolution: every point and region bound in one pass ---
+    # (snapped at full resolution, so markers land on real samples)
+    point_xs = [pt.get("x") for pt in highlight_points or []]
+    bands = [
+        (r.get("start"), r.get("end"), r.get("label", ""))
+        for r in highlight_regions or []
+        if r.get("start") is not None and r.get("end") is not None
+    ]
+    raw = [v for v in point_xs if v is not None]
+    raw += [b[0] for b in bands] + [b[1] for b in bands]
+    resolved = _to_x_plot_many(raw, x_is_date) if raw else np.empty(0)
+
+    n_pts = len(raw) - 2 * len(bands)
+    snapped = iter(_nearest_indices(x_plot, resolved[:n_pts]).tolist())
+    highlight_idx = [None if v is None else next(snapped) for v in point_xs]
+    band_bounds = resolved[n_pts:].reshape(2, len(bands))
+    band_starts, band_ends = band_bounds.min(axis=0), band_bounds.max(axis=0)
+    required_idx = {i for i in highlight_idx if i is not None}
+
+    # --- decimation: never draw more samples than the chart has pixels for ---
+    budget = point_budget(chart_width, max_points)
+    decimate = bool(budget) and N > budget
+
+    def _line_idx(s):
+        # LTTB keeps the visual shape of lines
+        if not decimate:
+            return slice(None)
+        return with_required(lttb_indices(x_plot, s, budget), required_idx)
+
+    def _envelope_idx(rows, keep_min=True):
+        # min/max per pixel column keeps peaks/troughs of areas (and the
+        # tallest bar of each column for bars)
+        if not decimate:
+            return slice(None)
+        return with_required(minmax_indices(rows, budget // 2, keep_min), required_idx)
 
     # --- shared step & bar width (so both axes match) ---
-    if len(x_plot) > 1:
+    if decimate:
+        base_step = float(x_plot[-1] - x_plot[0]) / (budget // 2)
+    elif len(x_plot) > 1:
         base_step = float(np.diff(x_plot).mean())
     else:
         base_step = 0.8
     left_bar_width = base_step * 0.8
     right_bar_width = left_bar_width   # same thickness for right bars
 
+    def _bar_geometry(xb, width):
+        # decimated bars are about one per pixel column: tile them edge to
+        # edge without antialiasing, or the seams show up as stripes
+        if not decimate:
+            return xb, width, {"align": "center"}
+        left, widths = tiled_bar_edges(xb, width)
+        return left, widths, {"align": "edge", "antialiased": False}
+
     # --- figure/axes ---
-    fig_h_inches = chart_height / dpi
-    fig_w_inches = chart_width / dpi
-    fig = plt.figure(figsize=(fig_w_inches, fig_h_inches), dpi=dpi)
+    fig = new_chart_figure(chart_width, chart_height, dpi)
     ax_left = fig.add_subplot(111)
     fig.patch.set_alpha(0.0)
     ax_left.set_facecolor((1,1,1,0))
@@ -661,9 +581,10 @@ def _render_pine_poster_dual_impl(
     if Y_right is not None:
         ax_right = ax_left.twinx()
 
-    # Track stacking mode for point placement
+    # Track stacking mode for point placement; one cumulative stack (row i =
+    # top of layer i) serves area and bar drawing and stacked highlight y
     stack_mode_left = "none"      # "none" | "area" | "bar"
-    cum_stack_left = None         # for area
+    cum_stack_left = Y_left.cumsum(axis=0)
 
     # ---------------- LEFT AXIS PLOTTING --------------------
     ct_left = chart_type.lower().strip()
@@ -671,9 +592,10 @@ def _render_pine_poster_dual_impl(
 
     if ct_left == "line":
         for s, col, lab in zip(Y_left, palette_left, left_labels):
+            idx = _line_idx(s)
             ax_left.plot(
-                x_plot,
-                s,
+                x_plot[idx],
+                s[idx],
                 linewidth=line_width,
                 color=_hex_to_rgb01(col),
                 label=lab
@@ -683,19 +605,20 @@ def _render_pine_poster_dual_impl(
 
     elif ct_left == "area":
         rgb_cols = [_hex_to_rgb01(c) for c in palette_left]
+        cum = cum_stack_left
+        idx = _envelope_idx(cum)
         ax_left.stackplot(
-            x_plot,
-            *Y_left,
+            x_plot[idx],
+            *[s[idx] for s in Y_left],
             colors=rgb_cols,
             alpha=area_alpha,
             labels=left_labels,
             linewidth=0.0
         )
-        cum = np.row_stack(Y_left).cumsum(axis=0)
         for s, col in zip(cum, palette_left):
             ax_left.plot(
-                x_plot,
-                s,
+                x_plot[idx],
+                s[idx],
                 color=_hex_to_rgb01(col),
                 linewidth=max(0.9, line_width-0.3)
             )
@@ -704,20 +627,23 @@ def _render_pine_poster_dual_impl(
         tick_arrays_left = [cum[-1]]
 
         stack_mode_left = "area"
-        cum_stack_left = cum
 
     elif ct_left == "bar":
-        bottom_vals = np.zeros(N, dtype=float)
+        idx = _envelope_idx(cum_stack_left[-1], keep_min=False)
+        x_bar, bar_width, bar_kwargs = _bar_geometry(x_plot[idx], left_bar_width)
+        bottom_vals = np.zeros(len(x_bar), dtype=float)
         for s, col, lab in zip(Y_left, palette_left, left_labels):
-            ax_left.bar(
-                x_plot,
+            s = s[idx]
+            add_bars(
+                ax_left,
+                x_bar,
                 s,
-                width=left_bar_width,
+                width=bar_width,
                 bottom=bottom_vals,
                 color=_hex_to_rgb01(col),
-                align="center",
                 label=lab,
                 alpha=0.55,
+                **bar_kwargs,
             )
             bottom_vals += s
         ax_left.set_xlim(x_plot[0] - left_bar_width/2, x_plot[-1] + left_bar_width/2)
@@ -736,95 +662,85 @@ def _render_pine_poster_dual_impl(
         ct_r = right_chart_type.lower().strip()
 
         if ct_r == "line":
+            idx = _line_idx(sR)
             ax_right.plot(
-                x_plot,
-                sR,
+                x_plot[idx],
+                sR[idx],
                 linewidth=line_width,
                 color=right_color,
                 label=ylabel_right or "Right"
             )
         elif ct_r == "area":
             baseline = 0.0 if (not log_right and sR.min() >= 0) else (sR.min() * 0.999 if log_right else 0.0)
+            idx = _envelope_idx(sR)
             ax_right.fill_between(
-                x_plot,
+                x_plot[idx],
                 baseline,
-                sR,
+                sR[idx],
                 color=right_color,
                 alpha=area_alpha
             )
             ax_right.plot(
-                x_plot,
-                sR,
+                x_plot[idx],
+                sR[idx],
                 linewidth=line_width,
                 color=right_color,
                 label=ylabel_right or "Right"
             )
         elif ct_r == "bar":
-            ax_right.bar(
-                x_plot,
-                sR,
-                width=right_bar_width,
+            idx = _envelope_idx(sR, keep_min=False)
+            x_bar, bar_width, bar_kwargs = _bar_geometry(x_plot[idx], right_bar_width)
+            add_bars(
+                ax_right,
+                x_bar,
+                sR[idx],
+                width=bar_width,
                 color=right_color,
-                align="center",
                 label=ylabel_right or "Right",
                 alpha=0.55,
+                **bar_kwargs,
             )
         else:
             raise ValueError("right_chart_type must be one of: 'line', 'bar', 'area'")
 
     # ---------------- HIGHLIGHT REGIONS (BANDS) -------------------
-    if highlight_regions:
-        for region in highlight_regions:
-            start_raw = region.get("start")
-            end_raw = region.get("end")
-            band_label = region.get("label", "")
-
-            if start_raw is None or end_raw is None:
-                continue
+    if bands:
+        add_vspans(
+            ax_left,
+            band_starts,
+            band_ends,
+            facecolors=(0.55, 0.65, 0.95, 0.25),  # darker blue & a bit more opaque
+            edgecolors=(0.30, 0.40, 0.70, 0.9),   # dark border
+            linewidths=0.5,
+            zorder=0.1,
+        )
 
-            x_start = _to_x_plot(start_raw)
-            x_end = _to_x_plot(end_raw)
-            if x_end < x_start:
-                x_start, x_end = x_end, x_start
-
-            ax_left.axvspan(
-                x_start,
-                x_end,
-                facecolor=(0.55, 0.65, 0.95, 0.25),  # darker blue & a bit more opaque
-                edgecolor=(0.30, 0.40, 0.70, 0.9),   # dark border
-                linewidth=0.5,
-                zorder=0.1,
+    for (_, _, band_label), x_start, x_end in zip(bands, band_starts, band_ends):
+        if band_label:
+            x_center = 0.5 * (x_start + x_end)
+            ax_left.text(
+                x_center,
+                0.02,
+                band_label,
+                transform=ax_left.get_xaxis_transform(),
+                ha="center",
+                va="bottom",
+                fontsize=max(6, tick_font_size),
+                fontweight="bold",
+                color="#1f2933",
+                zorder=3,
             )
 
-            if band_label:
-                x_center = 0.5 * (x_start + x_end)
-                ax_left.text(
-                    x_center,
-                    0.02,
-                    band_label,
-                    transform=ax_left.get_xaxis_transform(),
-                    ha="center",
-                    va="bottom",
-                    fontsize=max(6, tick_font_size),
-                    fontweight="bold",
-                    color="#1f2933",
-                    zorder=3,
-                )
-
     # ---------------- HIGHLIGHT POINTS -------------------
     if highlight_points:
-        for pt in highlight_points:
-            x_raw = pt.get("x")
+        for pt, idx_x in zip(highlight_points, highlight_idx):
             series_key = pt.get("series", 0)  # label or index
             label_text = pt.get("label", "")
             axis_side = pt.get("axis", "left").lower()
 
-            if x_raw is None:
+            if idx_x is None:
                 continue
 
-            x_val = _to_x_plot(x_raw)
-            idx_x = int(np.argmin(np.abs(x_plot - x_val)))
-
             if axis_side == "right" and ax_right is not None and Y_right is not None:
                 # right axis (single series)
                 y_arr = Y_right[0]
@@ -855,12 +771,9 @@ def _render_pine_poster_dual_impl(
                 x_point = x_plot[idx_x]
 
                 # --- stacked-aware y value ---
-                if stack_mode_left == "area" and cum_stack_left is not None:
-                    # top of this series's layer
+                if stack_mode_left in ("area", "bar"):
+                    # top of this series's layer / bar segment in the stack
                     y_point = cum_stack_left[s_idx, idx_x]
-                elif stack_mode_left == "bar":
-                    # top of this series's bar segment in the stack
-                    y_point = sum(Y_left[i][idx_x] for i in range(s_idx + 1))
                 else:
                     # plain line / non-stacked
                     y_point = Y_left[s_idx][idx_x]
@@ -985,45 +898,34 @@ def _render_pine_poster_dual_impl(
         leg.get_frame().set_facecolor((1,1,1,0.35))
         leg.set_zorder(10)   # <- ensure legend sits above highlight bands
 
-    plt.tight_layout(pad=0.35)
-    tmp_chart_path = TMP_DIR / "_tmp_chart_datetime.png"
-    fig.savefig(tmp_chart_path, transparent=True, dpi=dpi)
-    plt.close(fig)
+    fig.tight_layout(pad=0.35)
 
     # --- composite on template ---
-    chart_img = Image.open(tmp_chart_path).convert("RGBA")
-    chart_img = chart_img.resize((chart_width, chart_height),
-                                 Image.Resampling.LANCZOS)
+    chart_img = figure_to_image(fig, chart_width, chart_height)
 
     # optional center watermark
     if center_image is not None:
-        center_img = _load_image(center_image)
-        if center_img is not None:
-            diameter = int(min(chart_width, chart_height) * 0.4)
-            if diameter > 0:
-                center_img = center_img.resize((diameter, diameter), Image.Resampling.LANCZOS)
-                mask = Image.new("L", (diameter, diameter), 0)
-                mask_draw = ImageDraw.Draw(mask)
-                mask_draw.ellipse((0, 0, diameter, diameter), fill=155)
-                cx = chart_width // 2
-                cy = chart_height // 2
-                top_left = (cx - diameter // 2, cy - diameter // 2)
-                chart_img.paste(center_img, top_left, mask)
+        diameter = center_diameter(chart_width, chart_height, "dual")
+        watermark = center_watermark(center_image, diameter, CENTER_WATERMARKS["dual"][1])
+        if watermark is not None:
+            center_img, mask = watermark
+            cx = chart_width // 2
+            cy = chart_height // 2
+            top_left = (cx - diameter // 2, cy - diameter // 2)
+            chart_img.paste(center_img, top_left, mask)
 
     canvas.alpha_composite(chart_img, (chart_left, chart_top))
 
     # --- footer (date + note) ---
     if date_str is None:
         date_str = datetime.now().strftime("%B %d, %Y")
-    draw.text((footer_value_x - 134, date_y + 69),
+    draw.text((footer_value_x - int(134 * scale), date_y + int(69 * scale)),
               date_str, fill=(0,0,0,255), font=footer_font)
     if note_value:
-        draw.text((footer_value_x - 134, note_y + 63),
+        draw.text((footer_value_x - int(134 * scale), note_y + int(63 * scale)),
                   note_value, fill=(0,0,0,255), font=footer_font)
 
-    canvas.save(out_path)
-    print(f"✅ Saved:", out_path)
-    return out_path
+    return encode_poster(canvas, "dual", quality, output)
 
 
 def render_pine_poster_dual(
@@ -1044,12 +946,17 @@ def render_pine_poster_dual(
     log_right=False,
     include_zero_right=True,
     template_name: str = DEFAULT_TEMPLATE_NAME,
+    quality: str = DEFAULT_QUALITY,
+    output=None,
     highlight_regions=None,
     highlight_points=None,
     date_str=None,
     center_image=None,
     time_range="all",
     time_bucket="none",
+    bucket_agg_left="sum",
+    bucket_agg_right="sum",
+    max_points=None,
 ):
     """Logging/error-handling wrapper for the dual-axis renderer."""
 
@@ -1058,16 +965,20 @@ def render_pine_poster_dual(
         "x_len": len(x_values) if x_values is not None else 0,
         "y_series_count": len(y_series) if y_series is not None else 0,
         "template_name": template_name,
+        "quality": quality,
         "has_center_image": bool(center_image),
         "highlight_regions_count": len(highlight_regions) if highlight_regions else 0,
         "highlight_points_count": len(highlight_points) if highlight_points else 0,
         "time_range": time_range,
         "time_bucket": time_bucket,
+        "bucket_agg_left": bucket_agg_left,
+        "bucket_agg_right": bucket_agg_right,
+        "max_points": max_points,
     }
     logger.info("Rendering dual-axis poster", extra=render_context)
 
     try:
-        out_path = _render_pine_poster_dual_impl(
+        result = _render_pine_poster_dual_impl(
             title=title,
             subtitle=subtitle,
             note_value=note_value,
@@ -1085,18 +996,23 @@ def render_pine_poster_dual(
             log_right=log_right,
             include_zero_right=include_zero_right,
             template_name=template_name,
+            quality=quality,
+            output=output,
             highlight_regions=highlight_regions,
             highlight_points=highlight_points,
             date_str=date_str,
             center_image=center_image,
             time_range=time_range,
             time_bucket=time_bucket,
+            bucket_agg_left=bucket_agg_left,
+            bucket_agg_right=bucket_agg_right,
+            max_points=max_points,
         )
         logger.info(
             "Dual-axis poster rendered",
-            extra={**render_context, "event": "render_dual_success", "output_path": str(out_path)},
+            extra={**render_context, "event": "render_dual_success", "image_bytes": len(result.image_bytes)},
         )
-        return out_path
+        return result
     except Exception:
         logger.exception(
             "Dual-axis poster render failed",
@@ -1151,7 +1067,6 @@ if __name__ == "__main__":
         include_zero_right=True,
 
 
-        out_path="pine_demo_1_line_regime.png",
         highlight_regions=[
             {
                 "start": xs[15],
@@ -1161,7 +1076,7 @@ if __name__ == "__main__":
         ],
         highlight_points=None,
         date_str=None,
-    )
+    ).save("pine_demo_1_line_regime.png")
 
     # ---------------- EXAMPLE 2 ----------------
     # Line on left, bar on right + two callout points
@@ -1184,7 +1099,6 @@ if __name__ == "__main__":
         log_right=False,
         include_zero_right=False,
 
-        out_path="pine_demo_2_line_right_bar_points.png",
         highlight_regions=None,
         highlight_points=[
             {
@@ -1201,7 +1115,7 @@ if __name__ == "__main__":
             },
         ],
         date_str=None,
-    )
+    ).save("pine_demo_2_line_right_bar_points.png")
 
     # ---------------- EXAMPLE 3 ----------------
     # Stacked area chart left + regime + one point on series B
@@ -1228,7 +1142,6 @@ if __name__ == "__main__":
         include_zero_right=True,
 
   
-        out_path="pine_demo_3_area_regime_point.png",
         highlight_regions=[
             {
                 "start": xs[40],
@@ -1245,7 +1158,7 @@ if __name__ == "__main__":
             }
         ],
         date_str=None,
-    )
+    ).save("pine_demo_3_area_regime_point.png")
 
     # ---------------- EXAMPLE 4 ----------------
     # Stacked bar left + right-axis line + callouts on both axes
@@ -1272,7 +1185,6 @@ if __name__ == "__main__":
         include_zero_right=False,
 
        
-        out_path="pine_demo_4_bar_right_line_points.png",
         highlight_regions=None,
         highlight_points=[
             {
@@ -1289,4 +1201,4 @@ if __name__ == "__main__":
             },
         ],
         date_str=None,
-    )
+    ).save("pine_demo_4_bar_right_line_points.png")
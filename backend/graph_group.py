@@ -1,72 +1,33 @@
 # pine_overlay_bar_horizontal_safe_imgs.py
 
-from PIL import Image, ImageDraw, ImageFont
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+from PIL import ImageDraw
 import matplotlib.ticker as mticker
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+from matplotlib.transforms import blended_transform_factory
 import numpy as np
 from datetime import datetime
-import os
-import io
-import urllib.request
-from pathlib import Path
 import logging
 
-
-# ---------------------- File Helpers  ----------------------
-BASE_DIR = Path(__file__).resolve().parent
-GRAPHS_DIR = BASE_DIR / "graphs"
-TEMPLATE_DIR = GRAPHS_DIR / "templates"
-TMP_DIR = GRAPHS_DIR / "tmp"
-
-GRAPHS_DIR.mkdir(parents=True, exist_ok=True)
-TMP_DIR.mkdir(parents=True, exist_ok=True)
-
-DEFAULT_TEMPLATE_PATH = TEMPLATE_DIR / "main_template.png"
-DEFAULT_TEMPLATE_NAME = "main"
-DEFAULT_OUTPUT_PATH = GRAPHS_DIR / "pine_poster_group.png"
+from poster_raster import DEFAULT_QUALITY, chart_box, figure_to_image, new_chart_figure, quality_scale
+from poster_result import encode_poster
+from poster_fonts import get_font
+from poster_images import (
+    CENTER_WATERMARKS,
+    avatar_thumbnail,
+    center_diameter,
+    center_watermark,
+    composite_centered,
+)
+from poster_templates import DEFAULT_TEMPLATE_NAME, get_template
 
 
 logger = logging.getLogger(__name__)
 
-def _resolve_template_path(template_name: str) -> Path:
-    """
-    Map a simple template name to a template PNG filename.
-
-    For now:
-      "main" -> main_template.png
-
-    Later you can add:
-      "dark" -> dark_template.png
-      "alt"  -> alt_template.png
-    """
-    name = (template_name or DEFAULT_TEMPLATE_NAME).strip().lower()
-
-    # simple convention: <name>_template.png
-    candidate = TEMPLATE_DIR / f"{name}_template.png"
-    if candidate.exists():
-        return candidate
-
-    # fallback to main if missing
-    return DEFAULT_TEMPLATE_PATH
-
-
-
-# ----------------------- font helper -----------------------
-def _pick_font(path_candidates, size):
-    for p in path_candidates or []:
-        if p and os.path.exists(p):
-            try:
-                return ImageFont.truetype(p, size)
-            except Exception:
-                pass
-    for name in ["Courier Prime.ttf", "Courier New.ttf", "DejaVuSansMono.ttf"]:
-        try:
-            return ImageFont.truetype(name, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+# How bar avatars reach the chart: "pil" pastes the pre-sized thumbnails onto
+# the chart raster after drawing; "matplotlib" draws them as AnnotationBbox
+# artists with the rest of the figure.
+AVATAR_COMPOSITING_MODES = ("pil", "matplotlib")
+DEFAULT_AVATAR_COMPOSITING = "pil"
 
 # ------------------ color helpers --------------------------
 def _hex_to_rgb01(hexstr):
@@ -280,37 +241,6 @@ def _set_linear_x_ticks(ax, data_arrays, include_zero=True, pad_frac=0.22):
     )
     ax.xaxis.get_offset_text().set_visible(False)
 
-# ------------------ image helpers --------------------------
-def _load_image(path_or_url):
-    if not path_or_url:
-        return None
-    try:
-        if isinstance(path_or_url, str) and path_or_url.startswith(("http://", "https://")):
-            with urllib.request.urlopen(path_or_url) as resp:
-                data = resp.read()
-            img = Image.open(io.BytesIO(data)).convert("RGBA")
-        else:
-            img = Image.open(path_or_url).convert("RGBA")
-        return img
-    except Exception as e:
-        print("⚠️ Could not load image:", path_or_url, "error:", e)
-        return None
-
-def _circle_crop(img):
-    w, h = img.size
-    size = min(w, h)
-    left = (w - size) // 2
-    top = (h - size) // 2
-    img = img.crop((left, top, left + size, top + size))
-
-    mask = Image.new("L", (size, size), 0)
-    d = ImageDraw.Draw(mask)
-    d.ellipse((0, 0, size, size), fill=255)
-
-    img = img.convert("RGBA").copy()
-    img.putalpha(mask)
-    return img
-
 # ----------------------- main render -----------------------
 def _render_pine_poster_bar_impl(
     title,
@@ -320,11 +250,14 @@ def _render_pine_poster_bar_impl(
     values,
     colors_hex=None,
     template_name: str = DEFAULT_TEMPLATE_NAME,
+    quality: str = DEFAULT_QUALITY,
+    output=None,
     date_str=None,
     center_image=None,              
     value_axis_label="Volume (USD)",
     label_images=None,               
     orientation="horizontal",       
+    avatar_compositing: str = DEFAULT_AVATAR_COMPOSITING,
 ):
     """
     Horizontal-focused version:
@@ -333,14 +266,14 @@ def _render_pine_poster_bar_impl(
     - Avatars are drawn *inside* the axes (x_axes = 0.02) so they aren't clipped.
     """
 
-    out_path = DEFAULT_OUTPUT_PATH
-    template_path = _resolve_template_path(template_name)
-
     orientation = orientation.lower()
     if orientation not in ("vertical", "horizontal"):
         raise ValueError("orientation must be 'vertical' or 'horizontal'")
+    if avatar_compositing not in AVATAR_COMPOSITING_MODES:
+        raise ValueError(f"avatar_compositing must be one of {AVATAR_COMPOSITING_MODES}")
 
-    dpi = 300
+    scale = quality_scale(quality)
+    dpi = 300 * scale
     base_color_hex = "#1C5C3D"
 
     values = np.array(values, dtype=float)
@@ -355,19 +288,14 @@ def _render_pine_poster_bar_impl(
     n = len(values)
 
     # --- template/layout ---
-    template = Image.open(template_path).convert("RGBA")
+    template = get_template(template_name, scale)
     W, H = template.size
+    # matplotlib sizes are in points (DPI already scales them): size them
+    # off the standard-tier height so every quality tier lays out the same
+    pt_H = H / scale
 
-    mpl.rcParams.update({
-        "font.family": "monospace",
-        "font.monospace": [
-            "Courier Prime", "Courier New",
-            "DejaVuSansMono", "Liberation Mono", "monospace"
-        ]
-    })
 
     left_margin = int(0.096 * W)
-    right_margin = int(0.062 * W)
     title_y = int(0.038 * H)
     subtitle_y = int(0.09 * H)
     footer_label_x = int(0.09 * W)
@@ -375,10 +303,7 @@ def _render_pine_poster_bar_impl(
     date_y = int(0.86 * H)
     note_y = int(0.895 * H)
 
-    chart_top = int(0.15 * H)
-    chart_bottom = int(0.90 * H)
-    chart_left = footer_value_x - 229
-    chart_right = W - right_margin + 60
+    chart_left, chart_top, chart_right, chart_bottom = chart_box(W, H, scale)
     chart_width = chart_right - chart_left
     chart_height = chart_bottom - chart_top
 
@@ -397,20 +322,21 @@ def _render_pine_poster_bar_impl(
     colors_rgb = [_hex_to_rgb01(c) for c in palette]
 
     # --- fonts/canvas ---
-    title_font = _pick_font([None, None], int(0.045 * H))
-    subtitle_font = _pick_font([None, None], int(0.022 * H))
-    footer_font = _pick_font([None, None], int(0.017 * H))
+    title_font = get_font(int(0.045 * H))
+    subtitle_font = get_font(int(0.022 * H))
+    footer_font = get_font(int(0.017 * H))
 
-    axis_label_font_size = max(6, int(0.010 * H))
-    tick_label_font_size = max(6, int(0.007 * H))
-    value_label_font_size = max(6, int(0.009 * H))
+    axis_label_font_size = max(6, int(0.010 * pt_H))
+    tick_label_font_size = max(6, int(0.007 * pt_H))
+    value_label_font_size = max(6, int(0.009 * pt_H))
 
     canvas = template.copy()
     draw = ImageDraw.Draw(canvas)
 
     # --- Title / subtitle ---
     if title:
-        for dx, dy in [(0, 0), (1, 0), (0, 1)]:
+        shadow = max(1, round(scale))  # faux-bold offset; at least 1px at draft/preview
+        for dx, dy in [(0, 0), (shadow, 0), (0, shadow)]:
             draw.text(
                 (left_margin + dx, title_y + dy),
                 title,
@@ -426,9 +352,7 @@ def _render_pine_poster_bar_impl(
         )
 
     # --- Matplotlib figure for bar chart ---
-    fig_w_inches = chart_width / dpi
-    fig_h_inches = chart_height / dpi
-    fig = plt.figure(figsize=(fig_w_inches, fig_h_inches), dpi=dpi)
+    fig = new_chart_figure(chart_width, chart_height, dpi)
 
     # extra left space for avatars / labels
     if orientation == "vertical":
@@ -601,50 +525,45 @@ def _render_pine_poster_bar_impl(
             )
 
     # ---- Image labels (avatars) ----------
+    # Each avatar is an AnnotationBbox so tight_layout reserves its space.
+    # In "pil" mode the boxes are hidden before drawing and the thumbnails
+    # are pasted 1:1 onto the chart raster at the same anchors instead.
+    avatars = []  # (thumbnail, anchor xy) to paste after rasterizing
+    avatar_boxes = []
     if label_images is not None:
+        avatar_px = max(1, round(label_image_size_px * dpi / 72))
         for i, img_ref in enumerate(label_images):
             if not img_ref:
                 continue
 
-            raw_img = _load_image(img_ref)
-            if raw_img is None:
+            # pre-cropped thumbnail at the avatar's on-page pixel size, so
+            # it is drawn ~1:1 instead of resampling the upload
+            thumb = avatar_thumbnail(img_ref, avatar_px)
+            if thumb is None:
                 continue
 
-            circ = _circle_crop(raw_img)
-            arr = np.array(circ)
-
-            h0, w0 = arr.shape[0], arr.shape[1]
-            base_size = max(h0, w0)
-            zoom = float(label_image_size_px) / float(base_size) if base_size > 0 else 1.0
-            imagebox = OffsetImage(arr, zoom=zoom)
-
             if orientation == "vertical":
-                x_data = indices[i]
-                y_axes = y_avatar_offset_axes
-                ab = AnnotationBbox(
-                    imagebox,
-                    (x_data, y_axes),
-                    xycoords=("data", "axes fraction"),
-                    frameon=False,
-                    box_alignment=(0.5, 0.5),
-                    pad=0.0,
-                    clip_on=False,
-                )
+                xy = (indices[i], y_avatar_offset_axes)
+                xycoords = ("data", "axes fraction")
             else:
                 # KEY: x_axes is *inside* axes, so images never cross figure edge
-                y_data = indices[i]
-                x_axes = x_avatar_offset_axes_inside
-                ab = AnnotationBbox(
-                    imagebox,
-                    (x_axes, y_data),
-                    xycoords=("axes fraction", "data"),
-                    frameon=False,
-                    box_alignment=(0.5, 0.5),
-                    pad=0.0,
-                    clip_on=False,
-                )
-
+                xy = (x_avatar_offset_axes_inside, indices[i])
+                xycoords = ("axes fraction", "data")
+
+            zoom = float(label_image_size_px) / float(thumb.width)
+            ab = AnnotationBbox(
+                OffsetImage(np.asarray(thumb), zoom=zoom),
+                xy,
+                xycoords=xycoords,
+                frameon=False,
+                box_alignment=(0.5, 0.5),
+                pad=0.0,
+                clip_on=False,
+            )
             ax.add_artist(ab)
+            if avatar_compositing == "pil":
+                avatars.append((thumb, xy))
+                avatar_boxes.append(ab)
 
     # Margins
     if orientation == "vertical":
@@ -652,30 +571,34 @@ def _render_pine_poster_bar_impl(
     else:
         ax.margins(y=0.07, x=0.05)
 
-    plt.tight_layout(pad=0.35)
+    fig.tight_layout(pad=0.35)
+    for ab in avatar_boxes:
+        ab.set_visible(False)
 
-    # --- save chart as image and composite onto template ---
-    tmp_chart_path = TMP_DIR / "_tmp_chart_group.png"
-    fig.savefig(tmp_chart_path, transparent=True, dpi=dpi)
-    plt.close(fig)
+    # --- rasterize chart in memory and composite onto template ---
+    chart_img = figure_to_image(fig, chart_width, chart_height)
 
-    chart_img = Image.open(tmp_chart_path).convert("RGBA")
-    chart_img = chart_img.resize((chart_width, chart_height), Image.Resampling.LANCZOS)
+    if avatar_boxes:
+        # anchors through the final (post-draw) axes transform; Agg's y runs up
+        if orientation == "vertical":
+            anchor_trans = blended_transform_factory(ax.transData, ax.transAxes)
+        else:
+            anchor_trans = blended_transform_factory(ax.transAxes, ax.transData)
+        centers = anchor_trans.transform([xy for _thumb, xy in avatars])
+        centers[:, 1] = fig.bbox.height - centers[:, 1]
+        for (thumb, _xy), center in zip(avatars, centers):
+            composite_centered(chart_img, thumb, center)
 
     # optional center watermark
     if center_image is not None:
-        center_img = _load_image(center_image)
-        if center_img is not None:
-            diameter = int(min(chart_width, chart_height) * 0.4)
-            if diameter > 0:
-                center_img = center_img.resize((diameter, diameter), Image.Resampling.LANCZOS)
-                mask = Image.new("L", (diameter, diameter), 0)
-                mask_draw = ImageDraw.Draw(mask)
-                mask_draw.ellipse((0, 0, diameter, diameter), fill=155)
-                cx = chart_width // 2
-                cy = chart_height // 2
-                top_left = (cx - diameter // 2, cy - diameter // 2)
-                chart_img.paste(center_img, top_left, mask)
+        diameter = center_diameter(chart_width, chart_height, "bar")
+        watermark = center_watermark(center_image, diameter, CENTER_WATERMARKS["bar"][1])
+        if watermark is not None:
+            center_img, mask = watermark
+            cx = chart_width // 2
+            cy = chart_height // 2
+            top_left = (cx - diameter // 2, cy - diameter // 2)
+            chart_img.paste(center_img, top_left, mask)
 
     canvas.alpha_composite(chart_img, (chart_left, chart_top))
 
@@ -683,22 +606,20 @@ def _render_pine_poster_bar_impl(
     if date_str is None:
         date_str = datetime.now().strftime("%B %d, %Y")
     draw.text(
-        (footer_value_x - 134, date_y + 69),
+        (footer_value_x - int(134 * scale), date_y + int(69 * scale)),
         date_str,
         fill=(0, 0, 0, 255),
         font=footer_font,
     )
     if note_value:
         draw.text(
-            (footer_value_x - 134, note_y + 63),
+            (footer_value_x - int(134 * scale), note_y + int(63 * scale)),
             note_value,
             fill=(0, 0, 0, 255),
         font=footer_font,
     )
 
-    canvas.save(out_path)
-    print("✅ Saved:", out_path)
-    return out_path
+    return encode_poster(canvas, "bar", quality, output)
 
 
 def render_pine_poster_bar(
@@ -709,11 +630,14 @@ def render_pine_poster_bar(
     values,
     colors_hex=None,
     template_name: str = DEFAULT_TEMPLATE_NAME,
+    quality: str = DEFAULT_QUALITY,
+    output=None,
     date_str=None,
     center_image=None,
     value_axis_label="Volume (USD)",
     label_images=None,
     orientation="horizontal",
+    avatar_compositing: str = DEFAULT_AVATAR_COMPOSITING,
 ):
     """Logging/error-handling wrapper for the bar renderer."""
 
@@ -721,6 +645,7 @@ def render_pine_poster_bar(
         "event": "render_bar_start",
         "label_count": len(labels) if labels is not None else 0,
         "template_name": template_name,
+        "quality": quality,
         "orientation": orientation,
         "has_center_image": bool(center_image),
         "label_images_count": len(label_images) if label_images is not None else 0,
@@ -728,7 +653,7 @@ def render_pine_poster_bar(
     logger.info("Rendering bar poster", extra=render_context)
 
     try:
-        out_path = _render_pine_poster_bar_impl(
+        result = _render_pine_poster_bar_impl(
             title=title,
             subtitle=subtitle,
             note_value=note_value,
@@ -736,17 +661,20 @@ def render_pine_poster_bar(
             values=values,
             colors_hex=colors_hex,
             template_name=template_name,
+            quality=quality,
+            output=output,
             date_str=date_str,
             center_image=center_image,
             value_axis_label=value_axis_label,
             label_images=label_images,
             orientation=orientation,
+            avatar_compositing=avatar_compositing,
         )
         logger.info(
             "Bar poster rendered",
-            extra={**render_context, "event": "render_bar_success", "output_path": str(out_path)},
+            extra={**render_context, "event": "render_bar_success", "image_bytes": len(result.image_bytes)},
         )
-        return out_path
+        return result
     except Exception:
         logger.exception(
             "Bar poster render failed",
@@ -775,8 +703,7 @@ if __name__ == "__main__":
         labels=labels,
         values=values,
         colors_hex=["#1C5C3D", "#D97706", "#2563EB", "#6B7280", "#10B981"],
-        out_path="pine_demo_bar_horizontal.png",
         value_axis_label="Volume (USD)",
         label_images=label_images,
         orientation="horizontal",
-    )
+    ).save("pine_demo_bar_horizontal.png")
@@ -1,72 +1,30 @@
 # pine_overlay_pie_center_smart_labels_solid_bigpie_thinborder_center_image_fixed.py
 
-from PIL import Image, ImageDraw, ImageFont
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+from PIL import ImageDraw
 import numpy as np
 from datetime import datetime
+from matplotlib.collections import LineCollection, PatchCollection
 from matplotlib.font_manager import FontProperties
-import os
+from matplotlib.patches import Circle, Patch, Wedge
 import math
-import io
-import urllib.request
-from pathlib import Path
 import logging
 
-
-# ---------------------- File Helpers  ----------------------
-BASE_DIR = Path(__file__).resolve().parent
-GRAPHS_DIR = BASE_DIR / "graphs"
-TEMPLATE_DIR = GRAPHS_DIR / "templates"
-TMP_DIR = GRAPHS_DIR / "tmp"
-
-GRAPHS_DIR.mkdir(parents=True, exist_ok=True)
-TMP_DIR.mkdir(parents=True, exist_ok=True)
-
-DEFAULT_TEMPLATE_PATH = TEMPLATE_DIR / "main_template.png"
-DEFAULT_TEMPLATE_NAME = "main"
-DEFAULT_OUTPUT_PATH = GRAPHS_DIR / "pine_poster_pie.png"
+from poster_pie_layout import (
+    LEGEND_BORDERPAD,
+    LEGEND_LABELSPACING,
+    layout_leader_labels,
+    legend_entries,
+    text_extent,
+)
+from poster_raster import DEFAULT_QUALITY, chart_box, figure_to_image, new_chart_figure, quality_scale
+from poster_result import encode_poster
+from poster_fonts import get_font
+from poster_images import CENTER_WATERMARKS, center_diameter, center_watermark
+from poster_templates import DEFAULT_TEMPLATE_NAME, get_template
 
 
 logger = logging.getLogger(__name__)
 
-def _resolve_template_path(template_name: str) -> Path:
-    """
-    Map a simple template name to a template PNG filename.
-
-    For now:
-      "main" -> main_template.png
-
-    Later you can add:
-      "dark" -> dark_template.png
-      "alt"  -> alt_template.png
-    """
-    name = (template_name or DEFAULT_TEMPLATE_NAME).strip().lower()
-
-    # simple convention: <name>_template.png
-    candidate = TEMPLATE_DIR / f"{name}_template.png"
-    if candidate.exists():
-        return candidate
-
-    # fallback to main if missing
-    return DEFAULT_TEMPLATE_PATH
-
-
-# ----------------------- font helper -----------------------
-def _pick_font(path_candidates, size):
-    for p in path_candidates or []:
-        if p and os.path.exists(p):
-            try:
-                return ImageFont.truetype(p, size)
-            except Exception:
-                pass
-    for name in ["Courier Prime.ttf", "Courier New.ttf", "DejaVuSansMono.ttf"]:
-        try:
-            return ImageFont.truetype(name, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
-
 # ------------------ color helpers --------------------------
 def _hex_to_rgb01(hexstr):
     h = hexstr.strip().lstrip("#")
@@ -107,42 +65,27 @@ def _format_compact_number(v):
     else:
         return f"{v:.2f}"
 
-# ------------------ simple vertical label de-overlap --------
-def _spread_labels(labels, min_gap=0.10):
-    """
-    labels: list of dicts with key 'y_label_base'
-    Adds 'y_label' to each dict, spaced by at least min_gap.
-    """
-    labels_sorted = sorted(labels, key=lambda d: d["y_label_base"])
-    prev_y = None
-    for lab in labels_sorted:
-        y = lab["y_label_base"]
-        if prev_y is not None and y - prev_y < min_gap:
-            y = prev_y + min_gap
-        lab["y_label"] = y
-        prev_y = y
-    return labels_sorted
-
-# ------------------ center image loader ---------------------
-def _load_center_image(center_image):
+# ------------------ pie wedges -----------------------------
+def _pie_wedges(values, colors, radius, startangle=90, **wedgeprops):
     """
-    center_image: None, local path, or URL.
-    Returns a PIL.Image (RGBA) or None.
+    Counter-clockwise Wedge patches for `values`, with the same angles as
+    ax.pie (float32 fractions), but not added to any axes.
     """
-    if not center_image:
-        return None
-
-    try:
-        if isinstance(center_image, str) and center_image.startswith(("http://", "https://")):
-            with urllib.request.urlopen(center_image) as resp:
-                data = resp.read()
-            img = Image.open(io.BytesIO(data)).convert("RGBA")
-        else:
-            img = Image.open(center_image).convert("RGBA")
-        return img
-    except Exception as e:
-        print("⚠️ Could not load center image:", e)
-        return None
+    fracs = np.asarray(values, np.float32)
+    # the checks ax.pie used to make for us
+    if (fracs < 0).any():
+        raise ValueError("Wedge sizes must be non negative")
+    total = fracs.sum()
+    if not total > 0:
+        raise ValueError("Pie values must not all be zero")
+    fracs = fracs / total
+    bounds = 360.0 * np.cumsum(
+        np.concatenate(([np.float32(startangle / 360)], fracs)), dtype=np.float32
+    )
+    return [
+        Wedge((0, 0), radius, t1, t2, facecolor=color, clip_on=False, **wedgeprops)
+        for t1, t2, color in zip(bounds[:-1], bounds[1:], colors)
+    ]
 
 # ----------------------- main render -----------------------
 def _render_pine_poster_pie_impl(
@@ -153,6 +96,8 @@ def _render_pine_poster_pie_impl(
     values,
     colors_hex=None,
     template_name: str = DEFAULT_TEMPLATE_NAME, 
+    quality: str = DEFAULT_QUALITY,
+    output=None,
     date_str=None,
     center_image=None,
 ):
@@ -167,10 +112,8 @@ def _render_pine_poster_pie_impl(
                   and % labels inside slices are disabled.
     """
 
-    out_path = DEFAULT_OUTPUT_PATH
-    template_path = _resolve_template_path(template_name)
-
-    dpi = 300
+    scale = quality_scale(quality)
+    dpi = 300 * scale
     base_color_hex = "#1C5C3D"
 
     values = np.array(values, dtype=float)
@@ -191,19 +134,14 @@ def _render_pine_poster_pie_impl(
     colors_rgb = [_hex_to_rgb01(c) for c in palette]
 
     # --- template/layout ---
-    template = Image.open(template_path).convert("RGBA")
+    template = get_template(template_name, scale)
     W, H = template.size
+    # matplotlib sizes are in points (DPI already scales them): size them
+    # off the standard-tier height so every quality tier lays out the same
+    pt_H = H / scale
 
-    mpl.rcParams.update({
-        "font.family": "monospace",
-        "font.monospace": [
-            "Courier Prime", "Courier New",
-            "DejaVuSansMono", "Liberation Mono", "monospace"
-        ]
-    })
 
     left_margin = int(0.096 * W)
-    right_margin = int(0.062 * W)
     title_y = int(0.038 * H)
     subtitle_y = int(0.09 * H)
     footer_label_x = int(0.09 * W)
@@ -211,27 +149,25 @@ def _render_pine_poster_pie_impl(
     date_y = int(0.86 * H)
     note_y = int(0.895 * H)
 
-    chart_top = int(0.15 * H)
-    chart_bottom = int(0.90 * H)
-    chart_left = footer_value_x - 229
-    chart_right = W - right_margin + 60
+    chart_left, chart_top, chart_right, chart_bottom = chart_box(W, H, scale)
     chart_width = chart_right - chart_left
     chart_height = chart_bottom - chart_top
 
     # --- fonts/canvas ---
-    title_font = _pick_font([None, None], int(0.045 * H))
-    subtitle_font = _pick_font([None, None], int(0.022 * H))
-    footer_font = _pick_font([None, None], int(0.017 * H))
-    legend_font_size = max(6, int(0.008 * H))
-    value_label_font_size = max(6, int(0.007 * H))
-    pct_label_font_size = max(6, int(0.007 * H))
+    title_font = get_font(int(0.045 * H))
+    subtitle_font = get_font(int(0.022 * H))
+    footer_font = get_font(int(0.017 * H))
+    legend_font_size = max(6, int(0.008 * pt_H))
+    value_label_font_size = max(6, int(0.007 * pt_H))
+    pct_label_font_size = max(6, int(0.007 * pt_H))
 
     canvas = template.copy()
     draw = ImageDraw.Draw(canvas)
 
     # Title / subtitle
     if title:
-        for dx, dy in [(0, 0), (1, 0), (0, 1)]:
+        shadow = max(1, round(scale))  # faux-bold offset; at least 1px at draft/preview
+        for dx, dy in [(0, 0), (shadow, 0), (0, shadow)]:
             draw.text(
                 (left_margin + dx, title_y + dy),
                 title,
@@ -247,107 +183,133 @@ def _render_pine_poster_pie_impl(
         )
 
     # --- Matplotlib figure for pie ---
-    fig_w_inches = chart_width / dpi
-    fig_h_inches = chart_height / dpi
-    fig = plt.figure(figsize=(fig_w_inches, fig_h_inches), dpi=dpi)
+    fig = new_chart_figure(chart_width, chart_height, dpi)
     ax = fig.add_subplot(111)
     fig.patch.set_alpha(0.0)
     ax.set_aspect("equal")
     ax.set_facecolor((1, 1, 1, 0))
 
     # ---------------- PIE: larger & thinner borders ----------------
-    wedges, _texts = ax.pie(
+    pie_radius = 1.75  # big pie
+    wedges = _pie_wedges(
         values,
-        labels=None,
-        colors=colors_rgb,
+        colors_rgb,
+        radius=pie_radius,
         startangle=90,
-        radius=1.75,  # big pie
-        wedgeprops={
-            "linewidth": 0.3,
-            "edgecolor": "black",
-        },
+        linewidth=0.3,
+        edgecolor="black",
     )
+    # One collection instead of a patch per slice; the layout sees the
+    # pie's outline as a single circle rather than measuring every wedge.
+    wedge_coll = PatchCollection(
+        wedges, match_original=True, joinstyle="miter", capstyle="butt", clip_on=False
+    )
+    wedge_coll.set_in_layout(False)
+    ax.add_collection(wedge_coll, autolim=False)
+    ax.add_patch(Circle((0, 0), pie_radius, fill=False, linewidth=0, clip_on=False))
+    ax.set_frame_on(False)
 
     total = values.sum()
+    shares = values / total if total > 0 else np.zeros_like(values)
+    mid_angles = np.array([0.5 * (w.theta1 + w.theta2) for w in wedges])
 
     # --- label geometry parameters ---
     r_line_start = 1.5
     r_label_radius = 1.69
     min_vertical_gap = 0.11
 
-    right_labels = []
-    left_labels = []
-
-    for wedge, val in zip(wedges, values):
-        theta = 0.5 * (wedge.theta1 + wedge.theta2)
-        theta_rad = math.radians(theta)
-        x_dir = math.cos(theta_rad)
-        y_dir = math.sin(theta_rad)
-
-        side = "right" if x_dir >= 0 else "left"
-
-        # base label position
-        y_label_base = r_label_radius * y_dir
-        x_label_base = r_label_radius * (1 if side == "right" else -1)
-
-        label_dict = {
-            "wedge": wedge,
-            "value": val,
-            "theta_rad": theta_rad,
-            "x_dir": x_dir,
-            "y_dir": y_dir,
-            "side": side,
-            "x_label_base": x_label_base,
-            "y_label_base": y_label_base,
-        }
-
-        if side == "right":
-            right_labels.append(label_dict)
-        else:
-            left_labels.append(label_dict)
-
-    # Spread vertically per side to reduce overlap
-    right_labels = _spread_labels(right_labels, min_gap=min_vertical_gap)
-    left_labels = _spread_labels(left_labels, min_gap=min_vertical_gap)
-    all_labels = right_labels + left_labels
-
-    # --- draw leader lines + bold value labels at adjusted positions ---
-    for lab in all_labels:
-        val = lab["value"]
-        x_dir = lab["x_dir"]
-        y_dir = lab["y_dir"]
-        side = lab["side"]
-        y_label = lab["y_label"]
-        x_label = lab["x_label_base"]
-
-        # line starts at slice edge
-        x0 = r_line_start * x_dir
-        y0 = r_line_start * y_dir
-
-        # elbow slightly inward horizontally
-        x_mid = x_label * 0.85
-        y_mid = y_label
-
-        x1 = x_label
-        y1 = y_label
-
-        # polyline: wedge -> elbow -> label
-        ax.plot(
-            [x0, x_mid, x1],
-            [y0, y_mid, y1],
-            linewidth=0.6,
-            color="black",
+    # --- expanded limits so lines & labels don't get clipped ---
+    ax.set_xlim(-1.7, 2.0)   # extra room on right for labels
+    ax.set_ylim(-1.9, 1.9)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+    # Legend slightly to the right; long legends list the largest slices and
+    # summarize the rest so it always fits the chart height
+    legend_idx, legend_cols, n_more = legend_entries(
+        shares, legend_font_size, chart_height * 72 / dpi
+    )
+    legend_handles = [wedges[i] for i in legend_idx]
+    legend_labels = [labels[i] for i in legend_idx]
+    if n_more:
+        legend_handles.append(Patch(facecolor="none", edgecolor="none"))
+        legend_labels.append(f"+{n_more} more")
+
+    prop = FontProperties(weight="bold", size=legend_font_size)
+    leg = ax.legend(
+        legend_handles,
+        legend_labels,
+        loc="center left",
+        bbox_to_anchor=(1.20, 0.5),
+        ncol=legend_cols,
+        frameon=True,
+        fancybox=True,
+        framealpha=0.35,
+        prop=prop,
+        labelcolor="black",
+        borderpad=LEGEND_BORDERPAD,
+        labelspacing=LEGEND_LABELSPACING,
+        handlelength=1.4,
+        handletextpad=0.5,
+    )
+    leg.get_frame().set_edgecolor((0, 0, 0, 0.15))
+    leg.get_frame().set_linewidth(0.6)
+    leg.get_frame().set_facecolor((1, 1, 1, 0.35))
+
+    # --- value labels: solved per side in one pass, bounded to the axes ---
+    value_texts = [_format_compact_number(v) for v in values]
+    text_h = max(text_extent(t, value_label_font_size)[1] for t in value_texts)
+
+    # Place the pie + legend first, so label spacing follows the real scale
+    # (a wide legend shrinks the pie) rather than a fixed data gap.
+    fig.tight_layout(pad=0.2)
+    ax.apply_aspect()
+    pt_per_data = (ax.transData.transform((0, 1))[1] - ax.transData.transform((0, 0))[1]) * 72 / dpi
+    text_h_data = text_h / pt_per_data if pt_per_data > 0 else 0.0
+    gap = max(min_vertical_gap, 1.15 * text_h_data)
+    y_lo, y_hi = ax.get_ylim()
+
+    label_idx, label_side, label_y = layout_leader_labels(
+        mid_angles, shares, r_label_radius, gap,
+        y_lo + 0.5 * text_h_data, y_hi - 0.5 * text_h_data,
+    )
+
+    theta_rad = np.radians(mid_angles[label_idx])
+    x_dir = np.cos(theta_rad)
+    y_dir = np.sin(theta_rad)
+    x_label = r_label_radius * label_side
+
+    # polylines: wedge edge -> elbow slightly inward horizontally -> label,
+    # all leaders as one collection
+    leaders = np.stack(
+        [
+            np.column_stack([r_line_start * x_dir, r_line_start * y_dir]),
+            np.column_stack([x_label * 0.85, label_y]),
+            np.column_stack([x_label, label_y]),
+        ],
+        axis=1,
+    )
+    ax.add_collection(
+        LineCollection(
+            leaders,
+            linewidths=0.6,
+            colors="black",
             alpha=0.9,
-        )
+            capstyle="projecting",
+            joinstyle="round",
+        ),
+        autolim=False,
+    )
 
-        txt_val = _format_compact_number(val)
-        ha = "left" if side == "right" else "right"
-        text_offset = 0.02 if side == "right" else -0.02
+    # --- bold value labels at the solved positions ---
+    for i, side, x1, y1 in zip(label_idx, label_side, x_label, label_y):
+        ha = "left" if side > 0 else "right"
+        text_offset = 0.02 if side > 0 else -0.02
 
         ax.text(
             x1 + text_offset,
             y1,
-            txt_val,
+            value_texts[i],
             ha=ha,
             va="center",
             fontsize=value_label_font_size,
@@ -358,22 +320,13 @@ def _render_pine_poster_pie_impl(
     # --- percentage labels on slices >= 5% (inside pie) ---
     # Disabled if we have a center image (to keep things clean)
     if center_image is None:
-        for wedge, val in zip(wedges, values):
-            pct = (val / total) * 100 if total > 0 else 0
-            if pct < 5:
-                continue
-
-            theta = 0.5 * (wedge.theta1 + wedge.theta2)
-            theta_rad = math.radians(theta)
-
-            r_pct = 0.82
-            x_pct = r_pct * math.cos(theta_rad)
-            y_pct = r_pct * math.sin(theta_rad)
-
+        r_pct = 0.82
+        for i in np.flatnonzero(shares >= 0.05):
+            theta = math.radians(mid_angles[i])
             ax.text(
-                x_pct,
-                y_pct,
-                f"{pct:.1f}%",
+                r_pct * math.cos(theta),
+                r_pct * math.sin(theta),
+                f"{shares[i] * 100:.1f}%",
                 ha="center",
                 va="center",
                 fontsize=pct_label_font_size,
@@ -381,35 +334,8 @@ def _render_pine_poster_pie_impl(
                 color="#111111",
             )
 
-    # --- expanded limits so lines & labels don't get clipped ---
-    ax.set_xlim(-1.7, 2.0)   # extra room on right for labels
-    ax.set_ylim(-1.9, 1.9)
-
-    # Legend slightly to the right
-    prop = FontProperties(weight="bold", size=legend_font_size)
-    leg = ax.legend(
-        wedges,
-        labels,
-        loc="center left",
-        bbox_to_anchor=(1.20, 0.5),
-        frameon=True,
-        fancybox=True,
-        framealpha=0.35,
-        prop=prop,
-        labelcolor="black",
-        borderpad=0.35,
-        handlelength=1.4,
-        handletextpad=0.5,
-    )
-    leg.get_frame().set_edgecolor((0, 0, 0, 0.15))
-    leg.get_frame().set_linewidth(0.6)
-    leg.get_frame().set_facecolor((1, 1, 1, 0.35))
-
-    ax.set_xticks([])
-    ax.set_yticks([])
-
     # ---- compute true pie center in pixels (axes bbox) ----
-    plt.tight_layout(pad=0.2)
+    fig.tight_layout(pad=0.2)
     bbox = ax.get_position()  # in figure fraction coords (0..1 from bottom-left)
     center_x_frac = 0.5 * (bbox.x0 + bbox.x1)
     center_y_frac = 0.5 * (bbox.y0 + bbox.y1)
@@ -420,33 +346,23 @@ def _render_pine_poster_pie_impl(
     pie_center_y_px_from_bottom = center_y_frac * chart_height
     pie_center_y_px = chart_height - pie_center_y_px_from_bottom
 
-    tmp_chart_path = TMP_DIR / "_tmp_chart_pie.png"
-    fig.savefig(tmp_chart_path, transparent=True, dpi=dpi)
-    plt.close(fig)
-
     # --- composite on template ---
-    chart_img = Image.open(tmp_chart_path).convert("RGBA")
-    chart_img = chart_img.resize((chart_width, chart_height), Image.Resampling.LANCZOS)
+    chart_img = figure_to_image(fig, chart_width, chart_height)
 
     # --- optional center image overlay (circle crop) ---
-    center_img = _load_center_image(center_image)
-    if center_img is not None:
-        # size of circular cutout as fraction of chart
-        diameter = int(min(chart_width, chart_height) * 0.45)
-        if diameter > 0:
-            center_img = center_img.resize((diameter, diameter), Image.Resampling.LANCZOS)
+    # size of circular cutout as fraction of chart; resized image and mask
+    # come ready-made from the watermark cache
+    diameter = center_diameter(chart_width, chart_height, "pie")
+    watermark = center_watermark(center_image, diameter, CENTER_WATERMARKS["pie"][1])
+    if watermark is not None:
+        center_img, mask = watermark
 
-            # circular mask
-            mask = Image.new("L", (diameter, diameter), 0)
-            mask_draw = ImageDraw.Draw(mask)
-            mask_draw.ellipse((0, 0, diameter, diameter), fill=255)
+        # center coordinates at actual pie center
+        cx = int(pie_center_x_px) - int(30 * scale)
+        cy = int(pie_center_y_px)
+        top_left = (cx - diameter // 2, cy - diameter // 2)
 
-            # center coordinates at actual pie center
-            cx = int(pie_center_x_px) - 30
-            cy = int(pie_center_y_px)
-            top_left = (cx - diameter // 2, cy - diameter // 2)
-
-            chart_img.paste(center_img, top_left, mask)
+        chart_img.paste(center_img, top_left, mask)
 
     # now paste chart_img onto the main canvas
     canvas.alpha_composite(chart_img, (chart_left, chart_top))
@@ -455,22 +371,20 @@ def _render_pine_poster_pie_impl(
     if date_str is None:
         date_str = datetime.now().strftime("%B %d, %Y")
     draw.text(
-        (footer_value_x - 134, date_y + 69),
+        (footer_value_x - int(134 * scale), date_y + int(69 * scale)),
         date_str,
         fill=(0, 0, 0, 255),
         font=footer_font,
     )
     if note_value:
         draw.text(
-            (footer_value_x - 134, note_y + 63),
+            (footer_value_x - int(134 * scale), note_y + int(63 * scale)),
             note_value,
             fill=(0, 0, 0, 255),
             font=footer_font,
         )
 
-    canvas.save(out_path)
-    print("✅ Saved:", out_path)
-    return out_path
+    return encode_poster(canvas, "pie", quality, output)
 
 
 def render_pine_poster_pie(
@@ -481,6 +395,8 @@ def render_pine_poster_pie(
     values,
     colors_hex=None,
     template_name: str = DEFAULT_TEMPLATE_NAME,
+    quality: str = DEFAULT_QUALITY,
+    output=None,
     date_str=None,
     center_image=None,
 ):
@@ -490,12 +406,13 @@ def render_pine_poster_pie(
         "event": "render_pie_start",
         "label_count": len(labels) if labels is not None else 0,
         "template_name": template_name,
+        "quality": quality,
         "has_center_image": bool(center_image),
     }
     logger.info("Rendering pie poster", extra=render_context)
 
     try:
-        out_path = _render_pine_poster_pie_impl(
+        result = _render_pine_poster_pie_impl(
             title=title,
             subtitle=subtitle,
             note_value=note_value,
@@ -503,14 +420,16 @@ def render_pine_poster_pie(
             values=values,
             colors_hex=colors_hex,
             template_name=template_name,
+            quality=quality,
+            output=output,
             date_str=date_str,
             center_image=center_image,
         )
         logger.info(
             "Pie poster rendered",
-            extra={**render_context, "event": "render_pie_success", "output_path": str(out_path)},
+            extra={**render_context, "event": "render_pie_success", "image_bytes": len(result.image_bytes)},
         )
-        return out_path
+        return result
     except Exception:
         logger.exception(
             "Pie poster render failed",
@@ -531,10 +450,9 @@ if __name__ == "__main__":
         labels=labels,
         values=values,
         colors_hex=["#1C5C3D", "#D97706", "#2563EB", "#6B7280", "#10B981", "#F97316"],
-        out_path="pine_demo_pie.png",
         date_str=None,
         # example:
         # center_image="logo.png",
         #center_image="https://pbs.twimg.com/profile_images/1986462619956379648/9gKvkbln_400x400.jpg",
         center_image=None,
-    )
+    ).save("pine_demo_pie.png")
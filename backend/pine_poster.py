@@ -5,18 +5,19 @@ from graph_datetime import render_pine_poster_dual
 from graph_piechart import render_pine_poster_pie
 from pathlib import Path
 
+from poster_fold import OTHER_LABEL, fold_categories, fold_series, remap_highlight_points
+from poster_raster import DEFAULT_QUALITY
+
 
 # ---------------------- File Helpers  ----------------------
 BASE_DIR = Path(__file__).resolve().parent
 GRAPHS_DIR = BASE_DIR / "graphs"
 TEMPLATE_DIR = GRAPHS_DIR / "templates"
-TMP_DIR = GRAPHS_DIR / "tmp"
 UPLOADS_DIR = BASE_DIR / "uploads"
 CENTER_UPLOAD_DIR = UPLOADS_DIR / "center"
 LABEL_UPLOAD_DIR = UPLOADS_DIR / "labels"
 
 GRAPHS_DIR.mkdir(parents=True, exist_ok=True)
-TMP_DIR.mkdir(parents=True, exist_ok=True)
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 CENTER_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 LABEL_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -33,8 +34,13 @@ def render_pine_poster(
     subtitle="",
     note_value="",
     template_name: str = DEFAULT_TEMPLATE_NAME,
+    quality: str = DEFAULT_QUALITY,
+    output=None,               # encoder settings (poster_output); None = tier defaults
     date_str=None,
     colors_hex=None,
+    # all types: keep the top_n largest categories / left series, sum the rest
+    top_n=None,
+    other_label=OTHER_LABEL,
     # pie + bar
     labels=None,
     values=None,
@@ -60,6 +66,9 @@ def render_pine_poster(
     highlight_points=None,
     time_range="all",
     time_bucket="none",
+    bucket_agg_left="sum",     # per-bucket aggregation (or {series: agg})
+    bucket_agg_right="sum",
+    max_points=None,           # None = ~2 per chart pixel, 0 = draw every point
 ):
     """
     Unified Pine poster entrypoint.
@@ -74,6 +83,8 @@ def render_pine_poster(
       - orientation          (for bar)
       - left_series_type     (for dual left axis)
       - right_series_type    (for dual right axis)
+      - top_n / other_label  (fold the long tail into one "Other" entry:
+                              pie slices, bars, or dual left series)
     """
 
     pt = str(poster_type).lower().strip()
@@ -82,6 +93,9 @@ def render_pine_poster(
     if pt == "pie":
         if labels is None or values is None:
             raise ValueError("For poster_type='pie', provide labels and values.")
+        labels, values, colors_hex, _ = fold_categories(
+            labels, values, top_n, other_label, colors_hex
+        )
         return render_pine_poster_pie(
             title=title,
             subtitle=subtitle,
@@ -90,6 +104,8 @@ def render_pine_poster(
             values=values,
             colors_hex=colors_hex,
             template_name=template_name,
+            quality=quality,
+            output=output,
             date_str=date_str,
             center_image=center_image,
         )
@@ -98,6 +114,9 @@ def render_pine_poster(
     elif pt == "bar":
         if labels is None or values is None:
             raise ValueError("For poster_type='bar', provide labels and values.")
+        labels, values, colors_hex, label_images = fold_categories(
+            labels, values, top_n, other_label, colors_hex, label_images
+        )
 
         bar_orientation = (orientation or "horizontal").lower()
         if bar_orientation not in ("horizontal", "vertical"):
@@ -111,6 +130,8 @@ def render_pine_poster(
             values=values,
             colors_hex=colors_hex,
             template_name=template_name,
+            quality=quality,
+            output=output,
             date_str=date_str,
             center_image=center_image,
             value_axis_label=value_axis_label,
@@ -122,6 +143,14 @@ def render_pine_poster(
     elif pt == "dual":
         if x_values is None or y_series is None:
             raise ValueError("For poster_type='dual', provide x_values and y_series.")
+        if isinstance(y_series, dict):
+            folded, colors_hex, index_map = fold_series(
+                y_series, top_n, other_label, colors_hex
+            )
+            highlight_points = remap_highlight_points(
+                highlight_points, list(y_series), list(folded), index_map
+            )
+            y_series = folded
 
         # Normalize series type strings mildly, but let the renderer validate further
         left_type = (left_series_type or "line").lower()
@@ -145,12 +174,17 @@ def render_pine_poster(
             log_right=log_right,
             include_zero_right=include_zero_right,
             template_name=template_name,
+            quality=quality,
+            output=output,
             highlight_regions=highlight_regions,
             highlight_points=highlight_points,
             date_str=date_str,
             center_image=center_image,
             time_range=time_range,
             time_bucket=time_bucket,
+            bucket_agg_left=bucket_agg_left,
+            bucket_agg_right=bucket_agg_right,
+            max_points=max_points,
         )
 
     else:
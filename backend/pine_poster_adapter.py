@@ -5,7 +5,10 @@ from pathlib import Path
 from typing import Iterable
 
 from poster_schemas import PosterConfig
+from poster_result import RenderResult
 from pine_poster import CENTER_UPLOAD_DIR, LABEL_UPLOAD_DIR, render_pine_poster
+from poster_fetch import remote_fetcher
+from poster_images import discard_avatar, discard_center_image
 
 
 logger = logging.getLogger(__name__)
@@ -59,9 +62,19 @@ def _safe_unlink(path_str: str | None, allowed_root: Path, event_prefix: str) ->
     return False
 
 
+def _is_under(path_str: str | None, allowed_root: Path) -> bool:
+    try:
+        return bool(path_str) and allowed_root in Path(path_str).resolve().parents
+    except (TypeError, ValueError):
+        return False
+
+
 def _cleanup_center_image(center_image: str | None) -> bool:
     """Attempt to delete a previously uploaded center image."""
 
+    if _is_under(center_image, CENTER_UPLOAD_DIR):
+        # resized watermarks first: they are keyed by the source's content hash
+        discard_center_image(center_image)
     return _safe_unlink(center_image, CENTER_UPLOAD_DIR, "center")
 
 
@@ -70,6 +83,9 @@ def _cleanup_label_images(label_images: Iterable[str | None] | None) -> int:
 
     deleted = 0
     for li in label_images or []:
+        if _is_under(li, LABEL_UPLOAD_DIR):
+            # derived thumbnail first: its key is the source's content hash
+            discard_avatar(li)
         if _safe_unlink(li, LABEL_UPLOAD_DIR, "label"):
             deleted += 1
 
@@ -94,36 +110,47 @@ def cleanup_uploads(
     }
 
 
-def render_pine_poster_from_config(config: PosterConfig) -> Path:
+def render_pine_poster_from_config(config: PosterConfig) -> RenderResult:
     """
-    Adapter from typed PosterConfig (Pydantic) -> actual PNG path.
-    Returns an absolute Path to the output image.
-
-    The concrete output filename is owned by the underlying chart helpers;
-    we just pass configuration and return whatever Path they give back.
+    Adapter from typed PosterConfig (Pydantic) -> rendered poster.
+    Returns an in-memory RenderResult (encoded bytes + metadata).
+
+    The poster itself never touches disk, so concurrent renders (FastAPI
+    runs sync endpoints in a threadpool) each get their own independent
+    output. Input assets are cached on disk and shared between renders:
+    remote images under uploads/remote (poster_fetch), circle-cropped
+    avatar masters under uploads/avatars and resized center watermarks
+    under uploads/center_cache (poster_images). Those writes are atomic.
     """
 
+    # Remote center/label images download in the background while the
+    # renderer sets up and plots the chart; the renderer's fetch joins them.
+    remote_fetcher.prefetch([config.center_image, *(getattr(config, "label_images", None) or [])])
+
     common_kwargs = {
         "poster_type": config.poster_type,
         "title": config.title,
         "subtitle": config.subtitle or "",
         "note_value": config.note_value or "",
         "template_name": config.template_name or "main",
+        "quality": config.quality,
+        "output": config.output.model_dump() if config.output else None,
         "date_str": config.date_str,
         "colors_hex": getattr(config, "colors_hex", None),
         "center_image": config.center_image,
+        "top_n": config.top_n,
+        "other_label": config.other_label,
     }
 
     if config.poster_type == "pie":
-        out = render_pine_poster(
+        return render_pine_poster(
             **common_kwargs,
             labels=config.labels,
             values=config.values,
         )
-        return Path(out)
 
     if config.poster_type == "bar":
-        out = render_pine_poster(
+        return render_pine_poster(
             **common_kwargs,
             labels=config.labels,
             values=config.values,
@@ -131,7 +158,6 @@ def render_pine_poster_from_config(config: PosterConfig) -> Path:
             label_images=config.label_images,
             orientation=config.orientation,
         )
-        return Path(out)
 
     if config.poster_type == "dual":
         # Convert highlights to plain dicts because the dual helper
@@ -147,7 +173,7 @@ def render_pine_poster_from_config(config: PosterConfig) -> Path:
             else None
         )
 
-        out = render_pine_poster(
+        return render_pine_poster(
             **common_kwargs,
             x_values=config.x_values,
             y_series=config.y_series,
@@ -165,8 +191,10 @@ def render_pine_poster_from_config(config: PosterConfig) -> Path:
             highlight_points=highlight_points,
             time_range=config.time_range,
             time_bucket=config.time_bucket,
+            bucket_agg_left=config.bucket_agg_left,
+            bucket_agg_right=config.bucket_agg_right,
+            max_points=config.max_points,
         )
-        return Path(out)
 
     # This should be unreachable because PosterConfig is a union of the three.
     raise ValueError(f"Unsupported poster_type: {config.poster_type}")
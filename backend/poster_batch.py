@@ -0,0 +1,156 @@
+# poster_batch.py
+
+import json
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator
+
+from poster_executor import RenderExecutor, RenderQueueFull, env_int
+from poster_fetch import is_remote, remote_fetcher
+from poster_images import preload_center_image, prepare_avatar
+from poster_output import EXTENSIONS
+from poster_result import RenderResult
+from poster_schemas import PosterConfig
+
+
+# Report packs are 40-80 posters; anything much larger belongs in a job.
+BATCH_MAX_ITEMS = 200
+# A batch waits (instead of failing) while interactive renders hold the queue.
+QUEUE_FULL_RETRY_SECONDS = 0.25
+MANIFEST_NAME = "manifest.json"
+
+
+logger = logging.getLogger(__name__)
+
+# Batches get their own worker pool (all cores but one by default), so a
+# report pack renders in parallel without waiting behind queued jobs or
+# holding the workers interactive renders and previews use.
+_batch_workers = env_int("POSTER_BATCH_WORKERS", max(1, (os.cpu_count() or 1) - 1))
+batch_executor = RenderExecutor(workers=_batch_workers, queue_depth=max(1, _batch_workers) * 2)
+
+
+class _ZipSink:
+    """Write-only stream for zipfile that hands out what has been written so far."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def render_waiting(config: PosterConfig, render: Callable[[PosterConfig], RenderResult]) -> RenderResult:
+    """render(config), retrying while the executor's queue is full instead of failing."""
+    while True:
+        try:
+            return render(config)
+        except RenderQueueFull:
+            time.sleep(QUEUE_FULL_RETRY_SECONDS)
+
+
+def warm_shared_assets(configs: list[PosterConfig]) -> None:
+    """
+    Fetch / pre-process every distinct image the batch references once, up
+    front, so parallel renders of posters sharing a logo or avatar don't
+    each download or resize it.
+    """
+    centers = {c.center_image for c in configs if c.center_image}
+    labels = {ref for c in configs for ref in (getattr(c, "label_images", None) or []) if ref}
+    for fut in remote_fetcher.prefetch([ref for ref in centers | labels if is_remote(ref)]):
+        fut.result()
+    for ref in labels:
+        prepare_avatar(ref)
+    for ref in centers:
+        preload_center_image(ref)
+
+
+def stream_batch_zip(
+    items: list[tuple[PosterConfig, str]],
+    get_or_render: Callable[[str, Callable[[], RenderResult]], tuple[RenderResult, bool]],
+    render: Callable[[PosterConfig], RenderResult] = batch_executor.render,
+    concurrency: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> Iterator[bytes]:
+    """
+    Render (config, cache_key) pairs in parallel and yield a ZIP archive
+    incrementally: each poster's entry is emitted as soon as it finishes.
+
+    Identical configs (same cache key) render once and are written under
+    every index that asked for them. A failing item doesn't stop the batch;
+    the trailing manifest.json lists per-item file, cache key, cache hit,
+    timing and error. `on_progress(done, total)` is called as unique
+    renders finish (or fail).
+    """
+    # Default: one render in flight per batch worker.
+    concurrency = concurrency or max(1, batch_executor.workers)
+    by_key: dict[str, list[int]] = {}
+    for index, (_config, key) in enumerate(items):
+        by_key.setdefault(key, []).append(index)
+
+    manifest: list[dict] = [{"index": i, "cache_key": key} for i, (_c, key) in enumerate(items)]
+    started = time.perf_counter()
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED)
+
+    def run(key: str) -> tuple[RenderResult, bool, float]:
+        config = items[by_key[key][0]][0]
+        t0 = time.perf_counter()
+        result, cached = get_or_render(key, lambda: render_waiting(config, render))
+        return result, cached, time.perf_counter() - t0
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="poster-batch")
+    try:
+        warm_shared_assets([config for config, _key in items])
+        pending = {pool.submit(run, key): key for key in by_key}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                key = pending.pop(fut)
+                if on_progress is not None:
+                    on_progress(len(by_key) - len(pending), len(by_key))
+                try:
+                    result, cached, seconds = fut.result()
+                except Exception as exc:
+                    logger.warning(
+                        "Batch item render failed",
+                        extra={"event": "render_batch_item_error", "cache_key": key, "error": str(exc)},
+                    )
+                    for index in by_key[key]:
+                        manifest[index]["error"] = str(exc)
+                    continue
+
+                for index in by_key[key]:
+                    name = f"{index + 1:03d}_{result.poster_type}.{EXTENSIONS[result.media_type]}"
+                    archive.writestr(name, result.image_bytes)
+                    manifest[index].update(
+                        file=name, cached=cached, render_ms=round(seconds * 1000, 1)
+                    )
+                yield sink.drain()
+
+        summary = {
+            "items": manifest,
+            "unique_renders": len(by_key),
+            "failed": sum("error" in entry for entry in manifest),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        archive.writestr(MANIFEST_NAME, json.dumps(summary, indent=2))
+        archive.close()
+        yield sink.drain()
+        logger.info(
+            "Batch rendered",
+            extra={"event": "render_batch_done", **{k: v for k, v in summary.items() if k != "items"}},
+        )
+    finally:
+        # client went away (or we're done): drop renders that haven't started
+        pool.shutdown(wait=False, cancel_futures=True)
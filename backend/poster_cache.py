@@ -0,0 +1,316 @@
+# poster_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from poster_fetch import is_remote, remote_fetcher
+from poster_result import RenderResult
+from poster_schemas import PosterConfig
+from poster_templates import resolve_template_path
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when renderer output changes so stale cached posters are not served.
+CACHE_VERSION = 2
+
+FOOTER_DATE_FORMAT = "%B %d, %Y"
+
+# Local asset digests memoized per process (LRU by path).
+DIGEST_MEMO_SIZE = 1024
+
+
+# ---------------------- key building ----------------------
+def resolve_render_defaults(config: PosterConfig) -> PosterConfig:
+    """
+    Fill in defaults that renderers would otherwise resolve at render time.
+
+    date_str=None means "today" inside the renderers; pinning it here makes
+    it part of the cache key, so a cached poster never shows a stale date.
+    """
+    if config.date_str is None:
+        today = datetime.now().strftime(FOOTER_DATE_FORMAT)
+        return config.model_copy(update={"date_str": today})
+    return config
+
+
+_digest_lock = threading.Lock()
+_digest_memo: OrderedDict[str, tuple[tuple[int, int], str]] = OrderedDict()
+
+
+def file_digest(path_str: str | None) -> str | None:
+    """
+    Content hash of an asset reference.
+
+    Local files are hashed by content (memoized on mtime/size so repeat
+    renders don't re-read them). URLs are hashed by the content the remote
+    fetcher currently holds for them (revalidated once its fresh window
+    passes), so a poster is re-rendered when the image behind a URL changes.
+    """
+    if not path_str:
+        return None
+    if is_remote(path_str):
+        digest = remote_fetcher.digest(path_str)
+        return "url:" + digest if digest is not None else "missing:" + path_str
+
+    try:
+        st = os.stat(path_str)
+    except OSError:
+        return "missing:" + path_str
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _digest_lock:
+        memo = _digest_memo.get(path_str)
+        if memo is not None and memo[0] == stamp:
+            _digest_memo.move_to_end(path_str)
+            return memo[1]
+
+    h = hashlib.sha256()
+    with open(path_str, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[path_str] = (stamp, digest)
+        _digest_memo.move_to_end(path_str)
+        while len(_digest_memo) > DIGEST_MEMO_SIZE:
+            _digest_memo.popitem(last=False)
+    return digest
+
+
+def render_cache_key(config: PosterConfig) -> str:
+    """
+    Canonical content hash of a (defaults-resolved) config plus the template
+    file and every referenced image asset.
+    """
+    label_images = getattr(config, "label_images", None) or []
+    # fetch every remote image concurrently, then digest from the warm cache
+    wait(remote_fetcher.prefetch([config.center_image, *label_images]))
+    payload = {
+        "v": CACHE_VERSION,
+        "config": config.model_dump(mode="json"),
+        "template": file_digest(str(resolve_template_path(config.template_name))),
+        "center_image": file_digest(config.center_image),
+        "label_images": [file_digest(li) for li in label_images],
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ---------------------- cache ----------------------
+class RenderCache:
+    """
+    Two-tier cache of RenderResults keyed by render_cache_key().
+
+    - memory tier: LRU bounded by total image bytes
+    - disk tier (optional): <key>.bin + <key>.json under `disk_dir`, bounded
+      by total bytes, evicting least-recently-used files (mtime is touched
+      on every hit)
+
+    Concurrent misses for the same key are coalesced: one caller renders,
+    the others wait for its result.
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        disk_dir: Path | None = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.memory_max_bytes = max(0, memory_max_bytes)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = max(0, disk_max_bytes)
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, RenderResult] = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: dict[str, Future] = {}
+
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = 0
+
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(
+                p.stat().st_size for p in self.disk_dir.glob("*.bin") if p.is_file()
+            )
+
+    @classmethod
+    def from_env(cls) -> "RenderCache":
+        disk_dir = os.environ.get("POSTER_CACHE_DIR") or None
+        return cls(
+            memory_max_bytes=int(os.environ.get("POSTER_CACHE_MEMORY_MB", "128")) << 20,
+            disk_dir=Path(disk_dir) if disk_dir else None,
+            disk_max_bytes=int(os.environ.get("POSTER_CACHE_DISK_MB", "1024")) << 20,
+        )
+
+    # ---- memory tier ----
+    def _memory_get(self, key: str) -> RenderResult | None:
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+            return result
+
+    def _memory_put(self, key: str, result: RenderResult) -> None:
+        size = len(result.image_bytes)
+        if size > self.memory_max_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old.image_bytes)
+            self._memory[key] = result
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.image_bytes)
+
+    # ---- disk tier ----
+    def _disk_paths(self, key: str) -> tuple[Path, Path]:
+        return self.disk_dir / f"{key}.bin", self.disk_dir / f"{key}.json"
+
+    def _disk_get(self, key: str) -> RenderResult | None:
+        if self.disk_dir is None:
+            return None
+        bin_path, meta_path = self._disk_paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            data = bin_path.read_bytes()
+            os.utime(bin_path)
+        except (OSError, ValueError):
+            return None
+        return RenderResult(image_bytes=data, **meta)
+
+    def _disk_put(self, key: str, result: RenderResult) -> None:
+        if self.disk_dir is None or len(result.image_bytes) > self.disk_max_bytes:
+            return
+        bin_path, meta_path = self._disk_paths(key)
+        meta = {
+            "media_type": result.media_type,
+            "width": result.width,
+            "height": result.height,
+            "poster_type": result.poster_type,
+        }
+        try:
+            existed = bin_path.exists()
+            tmp = bin_path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(result.image_bytes)
+            meta_path.write_text(json.dumps(meta))
+            os.replace(tmp, bin_path)
+        except OSError as exc:
+            logger.warning(
+                "Failed to write render cache entry",
+                extra={"event": "render_cache_disk_write_failed", "key": key, "error": str(exc)},
+            )
+            return
+
+        if not existed:
+            with self._disk_lock:
+                self._disk_bytes += len(result.image_bytes)
+                over = self._disk_bytes > self.disk_max_bytes
+            if over:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        with self._disk_lock:
+            entries = []
+            for p in self.disk_dir.glob("*.bin"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, p in entries:
+                if total <= self.disk_max_bytes:
+                    break
+                p.unlink(missing_ok=True)
+                p.with_suffix(".json").unlink(missing_ok=True)
+                total -= size
+            self._disk_bytes = total
+
+    # ---- public API ----
+    def get(self, key: str) -> RenderResult | None:
+        result = self._memory_get(key)
+        if result is not None:
+            with self._lock:
+                self._hits_memory += 1
+            return result
+
+        result = self._disk_get(key)
+        if result is not None:
+            self._memory_put(key, result)
+            with self._lock:
+                self._hits_disk += 1
+        return result
+
+    def put(self, key: str, result: RenderResult) -> None:
+        self._memory_put(key, result)
+        self._disk_put(key, result)
+
+    def get_or_render(
+        self, key: str, render: Callable[[], RenderResult]
+    ) -> tuple[RenderResult, bool]:
+        """Return (result, cache_hit), rendering at most once per key at a time."""
+        result = self.get(key)
+        if result is not None:
+            return result, True
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._inflight[key] = pending
+                self._misses += 1
+
+        if not owner:
+            return pending.result(), True
+
+        try:
+            result = render()
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        else:
+            self.put(key, result)
+            pending.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.memory_max_bytes,
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+            }
+        stats["disk_enabled"] = self.disk_dir is not None
+        if self.disk_dir is not None:
+            with self._disk_lock:
+                stats["disk_bytes"] = self._disk_bytes
+            stats["disk_max_bytes"] = self.disk_max_bytes
+        return stats
+
+
+render_cache = RenderCache.from_env()
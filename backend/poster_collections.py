@@ -0,0 +1,64 @@
+# poster_collections.py
+
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+
+# Dense charts draw one artist per series instead of one patch per sample:
+# Agg renders a PolyCollection in a single draw_path_collection call, so draw
+# time follows the number of series, not the number of points. Geometry and
+# styling match the ax.bar / ax.axvspan rectangles they replace.
+
+
+def _rect_verts(x0, x1, y0, y1) -> np.ndarray:
+    """(n, 4, 2) corner array for n axis-aligned rectangles."""
+    x0, x1, y0, y1 = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (x0, x1, y0, y1))
+    )
+    return np.stack(
+        [np.stack([x0, y0], -1), np.stack([x0, y1], -1),
+         np.stack([x1, y1], -1), np.stack([x1, y0], -1)],
+        axis=-2,
+    )
+
+
+def add_bars(ax, x, height, width, bottom=0.0, align="center", color=None,
+             alpha=None, label=None, antialiased=True) -> PolyCollection:
+    """
+    Drop-in for ax.bar(x, height, width, bottom, align, color, alpha, label,
+    antialiased) that draws every bar as one PolyCollection.
+    """
+    x = np.asarray(x, dtype=float)
+    width = np.asarray(width, dtype=float)
+    left = x - width / 2.0 if align == "center" else x
+    bottom = np.asarray(bottom, dtype=float)
+
+    coll = PolyCollection(
+        _rect_verts(left, left + width, bottom, bottom + np.asarray(height, dtype=float)),
+        facecolors=[color],
+        edgecolors="none",
+        alpha=alpha,
+        antialiaseds=antialiased,
+        label=label,
+    )
+    # same stacking order and sticky zero baseline as bar patches
+    coll.set_zorder(1)
+    coll.sticky_edges.y.append(0)
+    ax.add_collection(coll)
+    return coll
+
+
+def add_vspans(ax, starts, ends, **kwargs) -> PolyCollection:
+    """
+    Drop-in for one ax.axvspan(start, end, **kwargs) per band: full-height
+    bands in x data coordinates, drawn as a single PolyCollection. Style
+    kwargs use the PolyCollection spelling (facecolors, edgecolors,
+    linewidths, zorder).
+    """
+    coll = PolyCollection(
+        _rect_verts(starts, ends, 0.0, 1.0),
+        transform=ax.get_xaxis_transform(which="grid"),
+        **kwargs,
+    )
+    ax.add_collection(coll, autolim=False)
+    return coll
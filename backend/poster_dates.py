@@ -0,0 +1,240 @@
+# poster_dates.py
+
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+from dateutil import parser as dateparser
+
+
+# Parsed x columns kept per process. The editor resends the same x_values on
+# every keystroke, so a handful of entries covers the hot path.
+X_CACHE_SIZE = 8
+
+DATETIME_UNIT = "datetime64[us]"
+
+# Substrings that mark a string x value as a date rather than a number.
+DATE_TOKENS = ("-", "/", "T", ":")
+
+# Homogeneous column formats numpy can parse in one vectorized call.
+_ISO = r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?"
+_OFFSET_RE = re.compile(r"[+-]\d{2}:\d{2}$")
+
+# Integer columns of exactly 10 (seconds) or 13 (milliseconds) digits are
+# read as Unix epochs when every value falls in this window; anything else
+# numeric stays a plain numeric axis (block heights, slots, ...).
+EPOCH_MIN = datetime(2001, 9, 9, tzinfo=timezone.utc)
+EPOCH_MAX = datetime(2100, 1, 1, tzinfo=timezone.utc)
+_EPOCH_UNITS = {10: "s", 13: "ms"}
+
+
+def to_naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _column_regex(value_pattern: str) -> re.Pattern:
+    # One pass of the regex engine over the newline-joined column
+    return re.compile(rf"(?:{value_pattern}\n)*{value_pattern}")
+
+
+_ISO_COLUMN = _column_regex(_ISO)
+_ISO_Z_COLUMN = _column_regex(_ISO + "Z")
+_EPOCH_COLUMNS = {digits: _column_regex(rf"\d{{{digits}}}") for digits in _EPOCH_UNITS}
+
+
+# ---------------------- fast paths ----------------------
+def _iso_column(joined: str) -> np.ndarray | None:
+    """Whole-column ISO-8601 parse (naive, all-"Z" or one shared offset)."""
+    if _ISO_COLUMN.fullmatch(joined):
+        return np.array(joined.split("\n")).astype(DATETIME_UNIT)
+
+    if _ISO_Z_COLUMN.fullmatch(joined):
+        return np.array(joined.replace("Z", "").split("\n")).astype(DATETIME_UNIT)
+
+    m = _OFFSET_RE.search(joined)
+    if m is not None:
+        offset = m.group()
+        if _column_regex(_ISO + re.escape(offset)).fullmatch(joined):
+            values = joined.replace(offset, "").split("\n")
+            sign = 1 if offset[0] == "+" else -1
+            shift = np.timedelta64(sign * (int(offset[1:3]) * 60 + int(offset[4:6])), "m")
+            return np.array(values).astype(DATETIME_UNIT) - shift
+    return None
+
+
+def _epoch_column(joined: str) -> np.ndarray | None:
+    """Whole-column Unix epoch (seconds or milliseconds) parse."""
+    digits = joined.find("\n") if "\n" in joined else len(joined)
+    unit = _EPOCH_UNITS.get(digits)
+    if unit is None or not _EPOCH_COLUMNS[digits].fullmatch(joined):
+        return None
+
+    out = np.array(joined.split("\n"), dtype=np.int64).astype(f"datetime64[{unit}]")
+    lo = np.datetime64(to_naive_utc(EPOCH_MIN), unit)
+    hi = np.datetime64(to_naive_utc(EPOCH_MAX), unit)
+    if out.min() < lo or out.max() >= hi:
+        return None
+    return out.astype(DATETIME_UNIT)
+
+
+# ---------------------- slow path ----------------------
+_ISO_VALUE = re.compile(_ISO)
+
+
+def _parse_one(value) -> np.datetime64:
+    if isinstance(value, np.datetime64):
+        return value.astype(DATETIME_UNIT)
+    if isinstance(value, datetime):
+        return np.datetime64(to_naive_utc(value), "us")
+    text = str(value)
+    if _ISO_VALUE.fullmatch(text):
+        return np.datetime64(text, "us")
+    dt = dateparser.parse(text)
+    if not isinstance(dt, datetime):
+        raise ValueError("x_values entries must be datetime-like or numeric")
+    return np.datetime64(to_naive_utc(dt), "us")
+
+
+def _parse_datetimes(values: list, joined: str | None) -> np.ndarray:
+    if joined is not None:
+        fast = _iso_column(joined)
+        if fast is not None:
+            return fast
+    # Mixed/odd column: numpy per ISO element, dateutil only for the rest
+    out = np.empty(len(values), dtype=DATETIME_UNIT)
+    for i, value in enumerate(values):
+        out[i] = _parse_one(value)
+    return out
+
+
+def _join_column(values: list) -> str | None:
+    """Newline-joined column for the one-pass fast paths, or None if not all plain strings."""
+    try:
+        joined = "\n".join(values)
+    except TypeError:
+        return None  # not all strings: no fast path, no caching
+    if joined.count("\n") != max(0, len(values) - 1):
+        return None  # a value contains a newline; the joined form is ambiguous
+    return joined
+
+
+def _looks_like_datetime(values: list, joined: str | None) -> bool:
+    if joined is not None:
+        return any(tok in joined for tok in DATE_TOKENS)
+    for xv in values:
+        if isinstance(xv, (datetime, np.datetime64)):
+            return True
+        if isinstance(xv, str) and any(tok in xv for tok in DATE_TOKENS):
+            return True
+        # Also treat pandas/NumPy datetime64 by string inspection
+        if hasattr(xv, "dtype") and "datetime" in str(getattr(xv, "dtype", "")):
+            return True
+    return False
+
+
+def _classify(values: list, joined: str | None) -> tuple[np.ndarray, bool]:
+    if _looks_like_datetime(values, joined):
+        try:
+            return _parse_datetimes(values, joined), True
+        except Exception as exc:
+            raise ValueError(
+                "x_values must be parseable datetimes for time-series charts"
+            ) from exc
+
+    if joined is not None:
+        epoch = _epoch_column(joined)
+        if epoch is not None:
+            return epoch, True
+
+    try:
+        return np.asarray(values, dtype=float), False
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        return _parse_datetimes(values, joined), True
+    except Exception as exc:
+        raise ValueError(
+            "x_values must be parseable datetimes or numeric values"
+        ) from exc
+
+
+# ---------------------- bucketing ----------------------
+# time_bucket -> calendar months per bucket (quarters start Jan/Apr/Jul/Oct,
+# halves Jan/Jul; month index 0 is January 1970, so plain modulo aligns them)
+_MONTH_BUCKETS = {"30d": 1, "90d": 3, "180d": 6, "1y": 12}
+
+
+def bucket_starts(xs: np.ndarray, time_bucket: str) -> np.ndarray | None:
+    """
+    Floor every datetime64 in `xs` to the start of its calendar bucket
+    (weeks start Monday). Returns None when `time_bucket` means no bucketing.
+    """
+    bucket = (time_bucket or "none").lower()
+
+    if bucket == "7d":
+        days = xs.astype("datetime64[D]")
+        # 1970-01-01 was a Thursday: shift so Monday == 0
+        weekday = (days.view(np.int64) + 3) % 7
+        return (days - weekday.astype("timedelta64[D]")).astype(DATETIME_UNIT)
+
+    step = _MONTH_BUCKETS.get(bucket)
+    if step is None:
+        return None
+    months = xs.astype("datetime64[M]").view(np.int64)
+    return (months - months % step).astype("datetime64[M]").astype(DATETIME_UNIT)
+
+
+# ---------------------- public API ----------------------
+_cache: OrderedDict[str, tuple[np.ndarray, bool]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_x_values(x_values) -> tuple[np.ndarray, bool]:
+    """
+    Parse an x column in one go.
+
+    Returns (datetime64[us] array of naive UTC times, True) for time series or
+    (float64 array, False) for numeric x. Homogeneous ISO-8601 / date-only /
+    epoch columns are converted with a single vectorized call; dateutil only
+    sees values numpy can't read. String columns are memoized (LRU), and the
+    returned arrays are read-only because they are shared between renders.
+    """
+    if isinstance(x_values, np.ndarray) and x_values.dtype.kind == "M":
+        return x_values.astype(DATETIME_UNIT), True
+    if isinstance(x_values, np.ndarray) and x_values.dtype.kind in "iuf":
+        return x_values.astype(float), False
+
+    values = list(x_values)
+    joined = _join_column(values)
+
+    if joined is not None:
+        with _cache_lock:
+            hit = _cache.get(joined)
+            if hit is not None:
+                _cache.move_to_end(joined)
+                return hit
+
+    parsed, is_date = _classify(values, joined)
+    parsed.flags.writeable = False
+
+    if joined is not None:
+        with _cache_lock:
+            _cache[joined] = (parsed, is_date)
+            while len(_cache) > X_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return parsed, is_date
+
+
+def to_datetime64(values) -> np.ndarray:
+    """
+    Parse datetime-like values (strings, datetimes) to naive-UTC
+    datetime64[us], with the same fast paths as parse_x_values but no
+    numeric detection and no caching (highlight x values, region bounds).
+    """
+    values = list(values)
+    return _parse_datetimes(values, _join_column(values))
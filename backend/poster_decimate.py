@@ -0,0 +1,110 @@
+# poster_decimate.py
+
+import numpy as np
+
+
+# Default point budget when a config doesn't set max_points: two samples per
+# horizontal pixel of the chart box (one min/max pair per pixel column).
+POINTS_PER_PIXEL = 2
+
+
+def point_budget(chart_width_px: int, max_points: int | None = None) -> int:
+    """
+    Number of samples worth drawing on a chart `chart_width_px` wide.
+
+    max_points=None -> pixel-aware default; 0 -> no decimation (returns 0).
+    """
+    if max_points is None:
+        return max(3, POINTS_PER_PIXEL * int(chart_width_px))
+    if max_points <= 0:
+        return 0
+    return max(3, int(max_points))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` samples that best
+    preserve the visual shape of the line (x, y). First and last samples are
+    always kept. Returns every index when no reduction is needed.
+
+    The loop runs once per output bucket (bounded by the budget, not the
+    input); each step is a NumPy reduction over that bucket.
+    """
+    n = len(y)
+    if n_out <= 0 or n_out >= n or n < 3:
+        return np.arange(n)
+    n_out = max(3, n_out)
+
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    # n_out - 2 buckets over the interior points [1, n - 1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    out = np.empty(n_out, dtype=np.intp)
+    out[0] = 0
+    out[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (the last bucket looks at the final point)
+        nlo = hi
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(rows: np.ndarray, n_buckets: int, keep_min: bool = True) -> np.ndarray:
+    """
+    Min/max envelope: for each of `n_buckets` equal-count buckets keep the
+    index of the minimum and maximum of every row of `rows` (shape k x n),
+    plus the first and last sample. All rows share the returned indices, so
+    stacked layers stay aligned.
+
+    keep_min=False keeps only the maxima, for bars: drawn from the baseline,
+    the tallest bar of a pixel column hides every other bar in it.
+    """
+    rows = np.atleast_2d(np.asarray(rows, dtype=float))
+    n = rows.shape[1]
+    if n_buckets <= 0 or 2 * n_buckets >= n:
+        return np.arange(n)
+
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.intp)[:-1]
+    bucket_of = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+
+    keep = [np.array([0, n - 1], dtype=np.intp)]
+    for row in np.nan_to_num(rows):
+        for reduce in ((np.minimum, np.maximum) if keep_min else (np.maximum,)):
+            extreme = reduce.reduceat(row, starts)
+            hits = np.flatnonzero(row == extreme[bucket_of])
+            # first hit per bucket
+            _, first = np.unique(bucket_of[hits], return_index=True)
+            keep.append(hits[first])
+    return np.unique(np.concatenate(keep))
+
+
+def tiled_bar_edges(x: np.ndarray, end_width: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Left edges and widths for bars at decimated positions `x` that tile the
+    axis without gaps or overlap: each bar spans the midpoints to its
+    neighbours (the outer bars extend end_width / 2 past the end samples).
+    Use with ax.bar(..., align="edge").
+    """
+    x = np.asarray(x, dtype=float)
+    mids = (x[1:] + x[:-1]) / 2.0
+    left = np.concatenate(([x[0] - end_width / 2.0], mids))
+    right = np.concatenate((mids, [x[-1] + end_width / 2.0]))
+    return left, right - left
+
+
+def with_required(indices: np.ndarray, required) -> np.ndarray:
+    """Merge must-keep sample indices (e.g. highlighted points) into `indices`."""
+    if not required:
+        return indices
+    return np.union1d(indices, np.asarray(list(required), dtype=np.intp))
@@ -0,0 +1,279 @@
+# poster_executor.py
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import UnidentifiedImageError
+
+from poster_fetch import RemoteAssetError
+from poster_result import RenderResult
+from poster_schemas import PosterConfig
+from pine_poster_adapter import render_pine_poster_from_config
+
+
+logger = logging.getLogger(__name__)
+
+# Modules every worker needs; imported once in the fork server (where
+# available) so each worker starts with matplotlib and the renderers loaded.
+PRELOAD_MODULES = ["pine_poster_adapter"]
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when the render executor is already at its configured queue depth."""
+
+
+class RenderWorkerError(RuntimeError):
+    """Raised when a render worker died mid-render (the pool is restarted)."""
+
+
+# What a bad config raises while keying or rendering (invalid values, a
+# missing, unreadable or unreachable image); anything else is a server fault.
+CONFIG_ERRORS = (ValueError, FileNotFoundError, UnidentifiedImageError, RemoteAssetError)
+
+
+def env_int(name: str, default: int) -> int:
+    """Integer setting from the environment; unset, blank or invalid gives `default`."""
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning(
+            "Ignoring invalid integer setting",
+            extra={"event": "render_executor_bad_setting", "name": name, "value": raw},
+        )
+        return default
+
+
+# ---------------------- worker side ----------------------
+def _warm_worker():
+    """Process initializer: pay matplotlib/font/template start-up cost before the first job."""
+    from poster_fonts import face_path
+    from poster_raster import WARM_SCALES, _ensure_chart_rc
+    from poster_templates import preload_templates
+
+    _ensure_chart_rc()
+    face_path()
+    preload_templates(WARM_SCALES)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render_job(config: PosterConfig) -> tuple[RenderResult, float]:
+    # timed in the worker, so busy time excludes waiting for a free worker
+    started = time.perf_counter()
+    result = render_pine_poster_from_config(config)
+    return result, time.perf_counter() - started
+
+
+# ---------------------- executor ----------------------
+class RenderExecutor:
+    """
+    Pool of pre-started worker processes that run render_pine_poster_from_config.
+
+    - workers:              number of worker processes (0 renders in-process)
+    - queue_depth:          max renders admitted at once (running + waiting);
+                            further requests raise RenderQueueFull
+    - max_tasks_per_worker: recycle a worker after this many renders
+                            (0 = never), bounding leaks/fragmentation
+    - degrade_preview_at:   once this many renders are in flight, "preview"
+                            requests are served at "draft" quality (0 = never)
+
+    Callers use the blocking render(); concurrency comes from the calling
+    threads (FastAPI's threadpool for sync endpoints).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_depth: int,
+        max_tasks_per_worker: int = 0,
+        degrade_preview_at: int = 0,
+    ):
+        self.workers = max(0, workers)
+        self.queue_depth = max(1, queue_depth)
+        self.max_tasks_per_worker = max(0, max_tasks_per_worker)
+        self.degrade_preview_at = max(0, degrade_preview_at)
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._degraded = 0
+        self._busy_seconds = 0.0
+        self._started_at: float | None = None
+
+    @classmethod
+    def from_env(cls) -> "RenderExecutor":
+        workers = env_int("POSTER_RENDER_WORKERS", os.cpu_count() or 1)
+        return cls(
+            workers=workers,
+            queue_depth=env_int("POSTER_RENDER_QUEUE_DEPTH", max(1, workers) * 4),
+            max_tasks_per_worker=env_int("POSTER_RENDER_MAX_TASKS_PER_WORKER", 200),
+            degrade_preview_at=env_int("POSTER_PREVIEW_DEGRADE_AT", 0),
+        )
+
+    # ---- lifecycle ----
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # max_tasks_per_child is incompatible with plain fork; prefer a fork
+        # server that has the renderers preloaded, fall back to spawn.
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("forkserver")
+            ctx.set_forkserver_preload(PRELOAD_MODULES)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_warm_worker,
+            max_tasks_per_child=self.max_tasks_per_worker or None,
+        )
+
+    def start(self) -> None:
+        """Start and warm all workers so the first requests don't pay start-up cost."""
+        self._started_at = time.monotonic()
+        if self.workers == 0:
+            logger.info(
+                "Render executor running in-process",
+                extra={"event": "render_executor_inline", "queue_depth": self.queue_depth},
+            )
+            return
+
+        with self._pool_lock:
+            if self._pool is not None:
+                return
+            self._pool = self._new_pool()
+            pool = self._pool
+
+        # Workers spawn on demand; submitting one ping per worker back-to-back
+        # starts all of them (none is idle yet when the next ping arrives).
+        pings = [pool.submit(_ping) for _ in range(self.workers)]
+        pids = {p.result() for p in pings}
+        logger.info(
+            "Render executor started",
+            extra={
+                "event": "render_executor_started",
+                "workers": self.workers,
+                "worker_pids": sorted(pids),
+                "queue_depth": self.queue_depth,
+                "max_tasks_per_worker": self.max_tasks_per_worker,
+            },
+        )
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            logger.info("Render executor stopped", extra={"event": "render_executor_stopped"})
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Render worker pool restarted", extra={"event": "render_executor_restarted"})
+
+    # ---- rendering ----
+    def adapt_quality(self, quality: str) -> str:
+        """
+        Load-adaptive quality: downgrade "preview" to "draft" while the pool
+        is saturated, so interactive edits stay responsive under load.
+        Explicit "standard"/"export" requests are never downgraded.
+        """
+        if quality != "preview" or not self.degrade_preview_at:
+            return quality
+        with self._stats_lock:
+            if self._in_flight < self.degrade_preview_at:
+                return quality
+            self._degraded += 1
+        return "draft"
+
+    def render(self, config: PosterConfig) -> RenderResult:
+        """Render `config` on a worker (or in-process when workers == 0)."""
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise RenderQueueFull(
+                f"Render queue is full ({self.queue_depth} renders in flight); retry shortly"
+            )
+
+        with self._stats_lock:
+            self._in_flight += 1
+        ok = False
+        try:
+            result, elapsed = self._run(config)
+            ok = True
+            return result
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+                if ok:
+                    self._busy_seconds += elapsed
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            self._slots.release()
+
+    def _run(self, config: PosterConfig) -> tuple[RenderResult, float]:
+        with self._pool_lock:
+            pool = self._pool
+        if pool is None:
+            return _render_job(config)
+
+        try:
+            return pool.submit(_render_job, config).result()
+        except BrokenProcessPool as exc:
+            self._restart_pool(pool)
+            raise RenderWorkerError("Render worker crashed; please retry") from exc
+
+    # ---- reporting ----
+    def stats(self) -> dict:
+        with self._stats_lock:
+            in_flight = self._in_flight
+            completed = self._completed
+            failed = self._failed
+            rejected = self._rejected
+            degraded = self._degraded
+            busy_seconds = self._busy_seconds
+
+        capacity = self.workers or 1
+        busy = min(in_flight, capacity)
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+
+        return {
+            "mode": "process_pool" if self._pool is not None else "in_process",
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "degrade_preview_at": self.degrade_preview_at,
+            "in_flight": in_flight,
+            "busy_workers": busy,
+            "queued": in_flight - busy,
+            "utilization": busy / capacity,
+            "avg_utilization": (
+                min(1.0, busy_seconds / (uptime * capacity)) if uptime > 0 else 0.0
+            ),
+            "completed": completed,
+            "failed": failed,
+            "rejected": rejected,
+            "degraded_previews": degraded,
+        }
+
+
+render_executor = RenderExecutor.from_env()
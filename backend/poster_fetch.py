@@ -0,0 +1,418 @@
+# poster_fetch.py
+
+import hashlib
+import http.client
+import json
+import logging
+import os
+import ssl
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+
+# ---------------------- File Helpers  ----------------------
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_FETCH_CACHE_DIR = BASE_DIR / "uploads" / "remote"
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 3
+READ_CHUNK = 64 << 10
+USER_AGENT = "pine-poster-fetch/1"
+# Errors that mean a pooled keep-alive connection was closed under us
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteAssetError(RuntimeError):
+    """Raised when a remote image can't be fetched (and no cached copy exists)."""
+
+
+def is_remote(ref) -> bool:
+    return isinstance(ref, str) and ref.startswith(("http://", "https://"))
+
+
+# ---------------------- fetcher ----------------------
+class RemoteFetcher:
+    """
+    Fetcher for http(s) label / center images.
+
+    - connections:  keep-alive pool per (scheme, host, port), at most
+                    `pool_size` idle connections kept per host
+    - limits:       `timeout` per socket operation, `deadline` for the whole
+                    fetch (redirects included), bodies over `max_bytes` rejected
+    - disk cache:   <sha256(url)>.bin + .json (ETag / Last-Modified) under
+                    `cache_dir`; served without a request for `fresh_seconds`,
+                    then revalidated with If-None-Match / If-Modified-Since.
+                    A failed refresh falls back to the cached copy. Bounded
+                    by `cache_max_bytes` (least recently used evicted first;
+                    mtime is touched on every use), and entries unused for
+                    `cache_max_age` seconds are dropped.
+
+    Concurrent fetches of one URL are coalesced, and prefetch() starts
+    fetches on a small thread pool so they overlap with chart plotting.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = DEFAULT_FETCH_CACHE_DIR,
+        timeout: float = 5.0,
+        deadline: float = 15.0,
+        max_bytes: int = 10 << 20,
+        fresh_seconds: float = 300.0,
+        pool_size: int = 4,
+        prefetch_workers: int = 8,
+        cache_max_bytes: int = 256 << 20,
+        cache_max_age: float = 30 * 86400,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.pool_size = max(0, pool_size)
+        self.prefetch_workers = max(1, prefetch_workers)
+        self.cache_max_bytes = max(0, cache_max_bytes)
+        self.cache_max_age = cache_max_age
+
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._inflight: dict[str, Future] = {}
+        # created on first prefetch, so importing in the fork server starts no threads
+        self._prefetch_pool: ThreadPoolExecutor | None = None
+        self._ssl_context: ssl.SSLContext | None = None
+        # disk tier size, measured on the first write; age sweep at most hourly
+        self._cache_lock = threading.Lock()
+        self._cache_bytes: int | None = None
+        self._swept_at = 0.0
+
+        self._hits_fresh = 0
+        self._revalidated = 0
+        self._downloaded = 0
+        self._stale_served = 0
+        self._errors = 0
+
+    @classmethod
+    def from_env(cls) -> "RemoteFetcher":
+        cache_dir = os.environ.get("POSTER_FETCH_CACHE_DIR") or DEFAULT_FETCH_CACHE_DIR
+        return cls(
+            cache_dir=Path(cache_dir),
+            timeout=float(os.environ.get("POSTER_FETCH_TIMEOUT", "5")),
+            deadline=float(os.environ.get("POSTER_FETCH_DEADLINE", "15")),
+            max_bytes=int(os.environ.get("POSTER_FETCH_MAX_MB", "10")) << 20,
+            fresh_seconds=float(os.environ.get("POSTER_FETCH_FRESH_SECONDS", "300")),
+            cache_max_bytes=int(os.environ.get("POSTER_FETCH_CACHE_MB", "256")) << 20,
+            cache_max_age=float(os.environ.get("POSTER_FETCH_CACHE_MAX_AGE_DAYS", "30")) * 86400,
+        )
+
+    # ---- connection pool ----
+    def _connect(self, scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _acquire(self, origin: tuple[str, str, int]) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(origin)
+            if idle:
+                return idle.pop(), True
+        return self._connect(*origin), False
+
+    def _release(self, origin: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    # ---- one HTTP exchange ----
+    def _request(self, url: str, headers: dict, expires_at: float):
+        """GET `url` once: (status, response headers, body)."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise RemoteAssetError(f"Unsupported image URL: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        origin = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        headers = {"User-Agent": USER_AGENT, "Accept": "image/*", **headers}
+        for attempt in range(2):
+            conn, reused = self._acquire(origin)
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                body = self._read_body(resp, expires_at)
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                # an idle keep-alive connection may have been closed by the
+                # server: retry once on a fresh one
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(origin, conn)
+            return resp.status, resp.headers, body
+        raise AssertionError("unreachable")
+
+    def _read_body(self, resp: http.client.HTTPResponse, expires_at: float) -> bytes:
+        length = resp.getheader("Content-Length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            raise RemoteAssetError(f"Image is larger than {self.max_bytes} bytes")
+
+        chunks, total = [], 0
+        while True:
+            if time.monotonic() > expires_at:
+                raise RemoteAssetError("Image download exceeded its deadline")
+            chunk = resp.read(READ_CHUNK)
+            if not chunk:
+                return b"".join(chunks)
+            total += len(chunk)
+            if total > self.max_bytes:
+                raise RemoteAssetError(f"Image is larger than {self.max_bytes} bytes")
+            chunks.append(chunk)
+
+    # ---- disk cache ----
+    def _cache_paths(self, url: str) -> tuple[Path, Path] | None:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+
+    def _cache_get(self, url: str) -> tuple[bytes, dict] | None:
+        paths = self._cache_paths(url)
+        if paths is None:
+            return None
+        try:
+            meta = json.loads(paths[1].read_text())
+            body = paths[0].read_bytes()
+            os.utime(paths[0])
+        except (OSError, ValueError):
+            return None
+        return body, meta
+
+    def _cache_put(self, url: str, body: bytes | None, meta: dict) -> None:
+        paths = self._cache_paths(url)
+        if paths is None:
+            return
+        bin_path, meta_path = paths
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            if body is not None:
+                old_size = bin_path.stat().st_size if bin_path.exists() else 0
+                tmp = bin_path.with_suffix(suffix)
+                tmp.write_bytes(body)
+                os.replace(tmp, bin_path)
+            tmp = meta_path.with_suffix(suffix)
+            tmp.write_text(json.dumps(meta))
+            os.replace(tmp, meta_path)
+        except OSError as exc:
+            logger.warning(
+                "Failed to write remote image cache entry",
+                extra={"event": "remote_fetch_cache_write_failed", "url": url, "error": str(exc)},
+            )
+            return
+        if body is not None:
+            self._account(len(body) - old_size)
+
+    def _account(self, delta: int) -> None:
+        with self._cache_lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = sum(
+                    p.stat().st_size for p in self.cache_dir.glob("*.bin") if p.is_file()
+                )
+            else:
+                self._cache_bytes += delta
+            due = (
+                self._cache_bytes > self.cache_max_bytes
+                or time.time() - self._swept_at > min(3600.0, self.cache_max_age)
+            )
+        if due:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop entries unused for cache_max_age, then LRU down to cache_max_bytes."""
+        with self._cache_lock:
+            now = time.time()
+            entries = []
+            for p in self.cache_dir.glob("*.bin"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for mtime, size, p in entries:
+                if total <= self.cache_max_bytes and now - mtime <= self.cache_max_age:
+                    break
+                p.unlink(missing_ok=True)
+                p.with_suffix(".json").unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            self._cache_bytes = total
+            self._swept_at = now
+        if removed:
+            logger.info(
+                "Evicted remote image cache entries",
+                extra={"event": "remote_fetch_cache_evicted", "removed": removed, "bytes": total},
+            )
+
+    # ---- fetch ----
+    def _download(self, url: str) -> bytes:
+        cached = self._cache_get(url)
+        now = time.time()
+        if cached is not None and now - cached[1].get("checked_at", 0) < self.fresh_seconds:
+            with self._lock:
+                self._hits_fresh += 1
+            return cached[0]
+
+        headers = {}
+        if cached is not None:
+            if cached[1].get("etag"):
+                headers["If-None-Match"] = cached[1]["etag"]
+            if cached[1].get("last_modified"):
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+
+        expires_at = time.monotonic() + self.deadline
+        target = url
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, resp_headers, body = self._request(target, headers, expires_at)
+                if status not in REDIRECT_STATUSES or not resp_headers.get("Location"):
+                    break
+                target = urljoin(target, resp_headers["Location"])
+            else:
+                raise RemoteAssetError(f"Too many redirects for {url}")
+
+            if status == 304 and cached is not None:
+                self._cache_put(url, None, {**cached[1], "checked_at": now})
+                with self._lock:
+                    self._revalidated += 1
+                return cached[0]
+            if status != 200:
+                raise RemoteAssetError(f"HTTP {status} for {url}")
+        except (OSError, http.client.HTTPException, RemoteAssetError) as exc:
+            with self._lock:
+                self._errors += 1
+            if cached is not None:
+                with self._lock:
+                    self._stale_served += 1
+                logger.warning(
+                    "Remote image refresh failed; serving cached copy",
+                    extra={"event": "remote_fetch_stale", "url": url, "error": str(exc)},
+                )
+                return cached[0]
+            if isinstance(exc, RemoteAssetError):
+                raise
+            raise RemoteAssetError(f"Could not fetch {url}: {exc}") from exc
+
+        self._cache_put(url, body, {
+            "etag": resp_headers.get("ETag"),
+            "last_modified": resp_headers.get("Last-Modified"),
+            "checked_at": now,
+        })
+        with self._lock:
+            self._downloaded += 1
+        return body
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Image bytes for `url`; raises RemoteAssetError. Waits for an
+        in-flight fetch of the same URL instead of starting another one.
+        """
+        with self._lock:
+            pending = self._inflight.get(url)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._inflight[url] = pending
+        if not owner:
+            return pending.result()
+
+        try:
+            body = self._download(url)
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        else:
+            pending.set_result(body)
+            return body
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def digest(self, url: str) -> str | None:
+        """
+        sha256 of the image currently behind `url` (same freshness and
+        revalidation as fetch), or None when it can't be fetched. Render
+        cache keys use it, so a changed image yields a new key.
+        """
+        try:
+            return hashlib.sha256(self.fetch(url)).hexdigest()
+        except RemoteAssetError:
+            return None
+
+    def _fetch_quietly(self, url: str) -> None:
+        try:
+            self.fetch(url)
+        except Exception as exc:
+            # the render's own fetch logs/handles it; this only warms the cache
+            logger.info(
+                "Remote image prefetch failed",
+                extra={"event": "remote_prefetch_failed", "url": url, "error": str(exc)},
+            )
+
+    def prefetch(self, refs) -> list[Future]:
+        """Start background fetches for every http(s) entry in `refs`."""
+        urls = list(dict.fromkeys(ref for ref in refs if is_remote(ref)))
+        if not urls:
+            return []
+        with self._lock:
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ThreadPoolExecutor(
+                    max_workers=self.prefetch_workers, thread_name_prefix="poster-fetch"
+                )
+            pool = self._prefetch_pool
+        return [pool.submit(self._fetch_quietly, url) for url in urls]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits_fresh": self._hits_fresh,
+                "revalidated": self._revalidated,
+                "downloaded": self._downloaded,
+                "stale_served": self._stale_served,
+                "errors": self._errors,
+                "idle_connections": sum(len(c) for c in self._idle.values()),
+                "cache_bytes": self._cache_bytes,
+            }
+
+
+remote_fetcher = RemoteFetcher.from_env()
@@ -0,0 +1,110 @@
+# poster_fold.py
+
+import numpy as np
+
+
+# Top-N folding: keep the N largest categories / series and sum the rest
+# into a single "Other" entry, so posters stay readable for query results
+# with hundreds of tokens or venues. Kept entries stay in their original
+# order; "Other" is appended last. An existing entry already named like the
+# Other label is always folded into it.
+OTHER_LABEL = "Other"
+OTHER_COLOR_HEX = "#9CA3AF"
+
+
+def _fold_plan(names: list, weights: np.ndarray, top_n, other_label: str):
+    """
+    (kept indices, folded indices) for a fold, or None when folding would
+    merge fewer than two entries (nothing to gain over the original).
+    """
+    if not top_n:
+        return None
+
+    names = np.asarray(names, dtype=object)
+    candidates = np.flatnonzero(names != other_label)
+    if candidates.size > top_n:
+        # O(n) selection of the N largest; sorted back into input order
+        top = np.argpartition(-weights[candidates], top_n - 1)[:top_n]
+        kept = np.sort(candidates[top])
+    else:
+        kept = candidates
+
+    folded = np.setdiff1d(np.arange(len(names)), kept)
+    if folded.size < 2:
+        return None
+    return kept, folded
+
+
+def _fold_colors(colors_hex, n: int, kept: np.ndarray):
+    if colors_hex is None or isinstance(colors_hex, str):
+        return colors_hex
+    if len(colors_hex) != n:
+        raise ValueError(f"colors_hex must have {n} entries.")
+    return [colors_hex[i] for i in kept] + [OTHER_COLOR_HEX]
+
+
+def fold_categories(labels, values, top_n, other_label=OTHER_LABEL,
+                    colors_hex=None, label_images=None):
+    """
+    Fold pie/bar categories beyond the `top_n` largest values into one
+    `other_label` entry. colors_hex and label_images stay aligned with the
+    labels (Other gets OTHER_COLOR_HEX when a palette is given, and no image).
+
+    Returns (labels, values, colors_hex, label_images); the inputs are
+    returned untouched when there is nothing to fold.
+    """
+    other_label = other_label or OTHER_LABEL
+    weights = np.asarray(values, dtype=float)
+    plan = _fold_plan(labels, weights, top_n, other_label)
+    if plan is None:
+        return labels, values, colors_hex, label_images
+    kept, folded = plan
+
+    out_labels = [labels[i] for i in kept] + [other_label]
+    out_values = [values[i] for i in kept] + [float(weights[folded].sum())]
+    out_colors = _fold_colors(colors_hex, len(labels), kept)
+    out_images = None
+    if label_images is not None:
+        out_images = [label_images[i] for i in kept] + [None]
+    return out_labels, out_values, out_colors, out_images
+
+
+def fold_series(y_series: dict, top_n, other_label=OTHER_LABEL, colors_hex=None):
+    """
+    Fold dual-axis left series beyond the `top_n` largest totals into one
+    `other_label` series (element-wise sum).
+
+    Returns (y_series, colors_hex, index_map) where index_map[i] is the new
+    position of original series i, so highlight references can follow; the
+    inputs are returned untouched (index_map None) when there is nothing to fold.
+    """
+    other_label = other_label or OTHER_LABEL
+    names = list(y_series)
+    rows = np.array([y_series[k] for k in names], dtype=float).reshape(len(names), -1)
+    plan = _fold_plan(names, rows.sum(axis=1), top_n, other_label)
+    if plan is None:
+        return y_series, colors_hex, None
+    kept, folded = plan
+
+    out = {names[i]: y_series[names[i]] for i in kept}
+    out[other_label] = rows[folded].sum(axis=0).tolist()
+
+    index_map = np.full(len(names), len(kept), dtype=int)
+    index_map[kept] = np.arange(len(kept))
+    return out, _fold_colors(colors_hex, len(names), kept), index_map.tolist()
+
+
+def remap_highlight_points(points, old_names: list, new_names: list, index_map: list):
+    """Point highlight `series` references (name or index) at the folded series."""
+    if not points or index_map is None:
+        return points
+
+    remapped = []
+    for pt in points:
+        key = pt.get("series", 0)
+        if isinstance(key, str) and key in old_names:
+            pt = {**pt, "series": new_names[index_map[old_names.index(key)]]}
+        elif isinstance(key, int) and 0 <= key < len(index_map):
+            pt = {**pt, "series": index_map[key]}
+        remapped.append(pt)
+    return remapped
@@ -0,0 +1,107 @@
+# poster_fonts.py
+
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from matplotlib import font_manager
+from matplotlib.font_manager import FontProperties
+from PIL import ImageFont
+
+
+# ---------------------- File Helpers  ----------------------
+BASE_DIR = Path(__file__).resolve().parent
+# Optional: no fonts ship with the repo. Drop .ttf/.otf files here (e.g.
+# Courier Prime, with its license) to use them without installing them
+# system-wide; otherwise the first installed PREFERRED_MONOSPACE family wins.
+FONT_DIR = BASE_DIR / "fonts"
+FONT_SUFFIXES = (".ttf", ".otf")
+
+# Preferred poster faces, best first. These are font *family* names as
+# matplotlib reports them; "DejaVu Sans Mono" ships with matplotlib, so the
+# list is never empty.
+PREFERRED_MONOSPACE = [
+    "Courier Prime",
+    "Courier New",
+    "DejaVu Sans Mono",
+    "Liberation Mono",
+]
+FALLBACK_MONOSPACE = "DejaVu Sans Mono"
+
+
+logger = logging.getLogger(__name__)
+
+_register_lock = threading.Lock()
+_registered = False
+
+
+def register_fonts() -> None:
+    """Register drop-in font files from FONT_DIR with matplotlib (once per process)."""
+    global _registered
+    if _registered:
+        return
+    with _register_lock:
+        if _registered:
+            return
+        added = []
+        if FONT_DIR.is_dir():
+            for path in sorted(FONT_DIR.iterdir()):
+                if path.suffix.lower() not in FONT_SUFFIXES:
+                    continue
+                try:
+                    font_manager.fontManager.addfont(str(path))
+                    added.append(path.name)
+                except Exception as exc:
+                    logger.warning(
+                        "Could not register drop-in font",
+                        extra={"event": "font_register_failed", "path": str(path), "error": str(exc)},
+                    )
+        _registered = True
+        logger.info("Fonts registered", extra={"event": "fonts_registered", "drop_in": added})
+
+
+@lru_cache(maxsize=1)
+def monospace_families() -> tuple[str, ...]:
+    """
+    Preferred families that are actually installed/registered, best first.
+
+    Used for rcParams["font.monospace"] so findfont never walks missing
+    families (and never logs fallback warnings).
+    """
+    register_fonts()
+    available = {f.name for f in font_manager.fontManager.ttflist}
+    families = tuple(fam for fam in PREFERRED_MONOSPACE if fam in available)
+    return families or (FALLBACK_MONOSPACE,)
+
+
+@lru_cache(maxsize=4)
+def face_path(weight: str = "normal") -> str:
+    """Resolve the font file for PIL text once, using matplotlib's font matching."""
+    return font_manager.findfont(
+        FontProperties(family=list(monospace_families()), weight=weight),
+        fallback_to_default=True,
+    )
+
+
+@lru_cache(maxsize=64)
+def _truetype(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+
+def get_font(size: int, weight: str = "normal") -> ImageFont.FreeTypeFont:
+    """
+    Cached PIL font for poster text (title/subtitle/footer).
+
+    Faces are resolved once per process and ImageFont objects are kept in
+    an LRU keyed by (face, size), so the render hot path does no filesystem
+    probing.
+    """
+    try:
+        return _truetype(face_path(weight), int(size))
+    except OSError:
+        logger.warning(
+            "Falling back to PIL default font",
+            extra={"event": "font_fallback_default", "size": size},
+        )
+        return ImageFont.load_default(size=int(size))
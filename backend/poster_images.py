@@ -0,0 +1,317 @@
+# poster_images.py
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageOps
+
+from poster_cache import file_digest
+from poster_fetch import is_remote, remote_fetcher
+from poster_raster import WARM_SCALES, chart_box
+from poster_templates import DEFAULT_TEMPLATE_NAME, get_template
+
+
+# ---------------------- File Helpers  ----------------------
+BASE_DIR = Path(__file__).resolve().parent
+AVATAR_DIR = BASE_DIR / "uploads" / "avatars"
+CENTER_CACHE_DIR = BASE_DIR / "uploads" / "center_cache"
+
+# Circle-cropped master thumbnails are stored at this size, keyed by the
+# source's content hash. A 20 pt avatar at the export tier (600 dpi) is
+# ~167 px, so every tier downsamples from the master.
+AVATAR_MASTER_PX = 256
+# Sized thumbnails kept per process, keyed by (content hash, pixel size).
+AVATAR_CACHE_SIZE = 256
+# The circle mask is drawn this many times larger and downsampled, so the
+# avatar edge is anti-aliased.
+MASK_SUPERSAMPLE = 4
+
+# Center watermark per renderer: (diameter as a fraction of the chart's
+# shorter side, circular mask opacity).
+CENTER_WATERMARKS = {"pie": (0.45, 255), "bar": (0.4, 155), "dual": (0.4, 155)}
+# Ready-to-paste (image, mask) pairs kept per process.
+CENTER_CACHE_SIZE = 32
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------- decoding ----------------------
+def open_image(ref: str) -> Image.Image:
+    """Lazily opened image for a local path or an http(s) URL (pooled, cached fetch)."""
+    if is_remote(ref):
+        return Image.open(io.BytesIO(remote_fetcher.fetch(ref)))
+    return Image.open(ref)
+
+
+def _open_source(ref: str, min_size: int) -> Image.Image:
+    img = open_image(ref)
+    # JPEG decoders can scale by 1/2..1/8 while decoding: a 12 MP phone
+    # photo never has to be fully decoded for a 256 px thumbnail.
+    img.draft("RGB", (min_size, min_size))
+    return ImageOps.exif_transpose(img).convert("RGBA")
+
+
+@lru_cache(maxsize=16)
+def circle_mask(size: int) -> Image.Image:
+    """Anti-aliased circular "L" mask of `size` x `size` (shared; read-only)."""
+    big = size * MASK_SUPERSAMPLE
+    mask = Image.new("L", (big, big), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, big - 1, big - 1), fill=255)
+    return mask.resize((size, size), Image.Resampling.LANCZOS)
+
+
+def circle_thumbnail(img: Image.Image, size: int) -> Image.Image:
+    """Center-square crop of `img`, resized to `size` px, with a circular alpha."""
+    thumb = ImageOps.fit(img.convert("RGBA"), (size, size), Image.Resampling.LANCZOS)
+    alpha = Image.new("L", (size, size), 0)
+    alpha.paste(thumb.getchannel("A"), mask=circle_mask(size))
+    thumb.putalpha(alpha)
+    return thumb
+
+
+# ---------------------- asset keys ----------------------
+def _asset_key(ref: str | None) -> str | None:
+    digest = file_digest(ref)
+    if digest is None or digest.startswith("missing:"):
+        return None
+    if digest.startswith("url:"):
+        return hashlib.sha256(digest.encode("utf-8")).hexdigest()
+    return digest
+
+
+def _write_png(img: Image.Image, path: Path) -> None:
+    """Atomic write, so concurrent workers never read a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    img.save(tmp, format="PNG")
+    os.replace(tmp, path)
+
+
+# ---------------------- avatars ----------------------
+def _master_path(key: str) -> Path:
+    return AVATAR_DIR / f"{key}.png"
+
+
+def prepare_avatar(ref: str | None) -> Path | None:
+    """
+    Build (once) the circle-cropped master thumbnail for a label image and
+    return its path. Called at upload time; renders fall back to it lazily
+    for older uploads and URLs. Returns None when the source can't be read.
+    """
+    key = _asset_key(ref)
+    if key is None:
+        return None
+    path = _master_path(key)
+    if path.exists():
+        return path
+
+    try:
+        master = circle_thumbnail(_open_source(ref, AVATAR_MASTER_PX), AVATAR_MASTER_PX)
+    except Exception as exc:
+        logger.warning(
+            "Could not build avatar thumbnail",
+            extra={"event": "avatar_prepare_failed", "ref": ref, "error": str(exc)},
+        )
+        return None
+
+    _write_png(master, path)
+    logger.info(
+        "Avatar thumbnail built",
+        extra={"event": "avatar_prepared", "ref": ref, "path": str(path)},
+    )
+    return path
+
+
+_thumbs: OrderedDict[tuple[str, int], Image.Image] = OrderedDict()
+_thumbs_lock = threading.Lock()
+
+
+def discard_avatar(ref: str | None) -> bool:
+    """
+    Drop the derived master (and this process's sized thumbnails) for a
+    label image that is about to be deleted. Call it before removing the
+    source, which the content key is read from; another upload with the
+    same bytes just rebuilds its master on the next render.
+    """
+    key = _asset_key(ref)
+    if key is None:
+        return False
+    with _thumbs_lock:
+        for cached in [k for k in _thumbs if k[0] == key]:
+            del _thumbs[cached]
+    try:
+        _master_path(key).unlink()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def avatar_thumbnail(ref: str | None, size_px: int) -> Image.Image | None:
+    """
+    Circular RGBA avatar for label image `ref`, exactly `size_px` square.
+
+    Thumbnails are cached per process by (content hash, size) and resized
+    from the on-disk master, so a render never decodes the original upload.
+    The returned image is shared and must be treated as read-only.
+    """
+    key = _asset_key(ref)
+    if key is None or size_px <= 0:
+        return None
+
+    with _thumbs_lock:
+        thumb = _thumbs.get((key, size_px))
+        if thumb is not None:
+            _thumbs.move_to_end((key, size_px))
+            return thumb
+
+    path = prepare_avatar(ref)
+    if path is None:
+        return None
+    with Image.open(path) as master:
+        master = master.convert("RGBA")
+    thumb = master if master.width == size_px else master.resize(
+        (size_px, size_px), Image.Resampling.LANCZOS
+    )
+
+    with _thumbs_lock:
+        _thumbs[(key, size_px)] = thumb
+        while len(_thumbs) > AVATAR_CACHE_SIZE:
+            _thumbs.popitem(last=False)
+    return thumb
+
+
+def composite_centered(canvas: Image.Image, img: Image.Image, center: tuple[float, float]) -> None:
+    """
+    Alpha-composite RGBA `img` onto `canvas` in place, centered on pixel
+    coordinates `center` (x right, y down). Parts outside the canvas are
+    dropped.
+    """
+    left = round(center[0] - img.width / 2)
+    top = round(center[1] - img.height / 2)
+    src_left, src_top = max(0, -left), max(0, -top)
+    src_right = min(img.width, canvas.width - left)
+    src_bottom = min(img.height, canvas.height - top)
+    if src_right <= src_left or src_bottom <= src_top:
+        return
+    canvas.alpha_composite(
+        img,
+        dest=(left + src_left, top + src_top),
+        source=(src_left, src_top, src_right, src_bottom),
+    )
+
+
+# ---------------------- center watermark ----------------------
+@lru_cache(maxsize=16)
+def watermark_mask(diameter: int, opacity: int) -> Image.Image:
+    """Circular "L" mask for the center watermark (shared; read-only)."""
+    mask = Image.new("L", (diameter, diameter), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, diameter, diameter), fill=opacity)
+    return mask
+
+
+def center_diameter(chart_width: int, chart_height: int, kind: str) -> int:
+    return int(min(chart_width, chart_height) * CENTER_WATERMARKS[kind][0])
+
+
+def _center_path(key: str, diameter: int) -> Path:
+    return CENTER_CACHE_DIR / f"{key}_{diameter}.png"
+
+
+def _resized_center(ref: str, key: str, diameter: int) -> Image.Image:
+    path = _center_path(key, diameter)
+    try:
+        with Image.open(path) as cached:
+            return cached.convert("RGBA")
+    except FileNotFoundError:
+        pass
+
+    img = open_image(ref).convert("RGBA")
+    img = img.resize((diameter, diameter), Image.Resampling.LANCZOS)
+    _write_png(img, path)
+    return img
+
+
+_centers: OrderedDict[tuple[str, int, int], tuple[Image.Image, Image.Image]] = OrderedDict()
+_centers_lock = threading.Lock()
+
+
+def center_watermark(ref: str | None, diameter: int, opacity: int):
+    """
+    Ready-to-paste (RGBA image, mask) for a center image at `diameter` px,
+    or None when there is no usable image.
+
+    Cached per process by (content hash, diameter, opacity), on top of a
+    disk tier of resized images (shared by the render workers and filled
+    at upload time by preload_center_image). Both images are shared and
+    must be treated as read-only: chart.paste(img, top_left, mask).
+    """
+    key = _asset_key(ref)
+    if key is None or diameter <= 0:
+        return None
+
+    with _centers_lock:
+        hit = _centers.get((key, diameter, opacity))
+        if hit is not None:
+            _centers.move_to_end((key, diameter, opacity))
+            return hit
+
+    try:
+        img = _resized_center(ref, key, diameter)
+    except Exception as exc:
+        logger.warning(
+            "Could not load center image",
+            extra={"event": "center_image_failed", "ref": ref, "error": str(exc)},
+        )
+        return None
+
+    entry = (img, watermark_mask(diameter, opacity))
+    with _centers_lock:
+        _centers[(key, diameter, opacity)] = entry
+        while len(_centers) > CENTER_CACHE_SIZE:
+            _centers.popitem(last=False)
+    return entry
+
+
+def discard_center_image(ref: str | None) -> int:
+    """
+    Drop every resized copy (disk tier and this process's LRU) of a center
+    image that is about to be deleted; call before removing the source.
+    Returns the number of files removed.
+    """
+    key = _asset_key(ref)
+    if key is None:
+        return 0
+    with _centers_lock:
+        for cached in [k for k in _centers if k[0] == key]:
+            del _centers[cached]
+    removed = 0
+    for path in CENTER_CACHE_DIR.glob(f"{key}_*.png"):
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def preload_center_image(ref: str | None, scales=WARM_SCALES) -> int:
+    """
+    Resize a freshly uploaded center image for every renderer at each
+    quality `scales` (default: the warm tiers) into the disk tier, so
+    renders only paste it. Returns the number of sizes prepared.
+    """
+    sizes = set()
+    for scale in scales:
+        width, height = get_template(DEFAULT_TEMPLATE_NAME, scale).size
+        left, top, right, bottom = chart_box(width, height, scale)
+        chart_width, chart_height = right - left, bottom - top
+        for kind, (_fraction, opacity) in CENTER_WATERMARKS.items():
+            sizes.add((center_diameter(chart_width, chart_height, kind), opacity))
+    return sum(center_watermark(ref, d, opacity) is not None for d, opacity in sorted(sizes))
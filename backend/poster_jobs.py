@@ -0,0 +1,357 @@
+# poster_jobs.py
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import TypeAdapter
+
+from poster_batch import render_waiting, stream_batch_zip
+from poster_cache import render_cache, render_cache_key
+from poster_executor import RenderExecutor, env_int
+from poster_schemas import PosterConfig
+
+
+# ---------------------- File Helpers  ----------------------
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_JOBS_DB = BASE_DIR / "data" / "poster_jobs.sqlite3"
+
+# How long idle job threads sleep between queue checks when nothing woke them.
+POLL_SECONDS = 1.0
+# Finished jobs (and their results) are kept this long after completion.
+JOB_RETENTION_SECONDS = 24 * 3600
+# A job interrupted this many times (e.g. it keeps taking the API down) fails
+# instead of being requeued again.
+MAX_ATTEMPTS = 3
+# Running jobs carry their runner's id and a heartbeat refreshed this often;
+# one whose heartbeat is older than STALE_SECONDS lost its process (crash,
+# kill) and is requeued by whichever API process notices first.
+HEARTBEAT_SECONDS = 10.0
+STALE_SECONDS = 3 * HEARTBEAT_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,              -- "render" | "batch"
+    status        TEXT NOT NULL,              -- queued | running | done | failed
+    payload       TEXT NOT NULL,              -- JSON config(s), defaults resolved
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 1,
+    created_at    REAL NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    owner         TEXT,                       -- runner id while running
+    heartbeat_at  REAL,
+    error         TEXT,
+    cache_key     TEXT,
+    media_type    TEXT,
+    result        BLOB
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+"""
+# Columns added after the first release, for databases created before them.
+_MIGRATIONS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+_STATUS_COLUMNS = (
+    "id, kind, status, progress_done, progress_total, created_at, started_at, "
+    "finished_at, attempts, error, cache_key, media_type"
+)
+
+_configs = TypeAdapter(list[PosterConfig])
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------- store ----------------------
+class JobStore:
+    """
+    SQLite-backed job table. Every call opens its own short-lived
+    connection, so the store is safe to share between threads; WAL mode
+    lets status polls read while a worker writes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def open(self) -> None:
+        """Create the database and table if needed (idempotent)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _MIGRATIONS.items():
+                if name not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # autocommit: every statement is its own transaction
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def add(self, kind: str, payload: list[dict], total: int) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, progress_total, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), total, time.time()),
+            )
+        return job_id
+
+    def claim(self, owner: str) -> sqlite3.Row | None:
+        """Atomically move the oldest queued job to running for `owner` and return it."""
+        now = time.time()
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, "
+                "owner = ?, heartbeat_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' "
+                "            ORDER BY created_at LIMIT 1) "
+                "RETURNING id, kind, payload",
+                (now, owner, now),
+            ).fetchone()
+
+    def heartbeat(self, owner: str) -> None:
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                (time.time(), owner),
+            )
+
+    def progress(self, job_id: str, done: int, total: int) -> None:
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET progress_done = ?, progress_total = ? WHERE id = ?",
+                (done, total, job_id),
+            )
+
+    # finish / fail / requeue only touch a job its owner still holds, so a
+    # job requeued as stale is never overwritten by the process that lost it
+    def finish(self, job_id: str, owner: str, media_type: str, result: bytes,
+               cache_key: str | None = None) -> None:
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, media_type = ?, result = ?, "
+                "cache_key = ?, progress_done = progress_total, owner = NULL "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (time.time(), media_type, result, cache_key, job_id, owner),
+            )
+
+    def fail(self, job_id: str, owner: str, error: str) -> None:
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ?, owner = NULL "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (time.time(), error, job_id, owner),
+            )
+
+    def release(self, owner: str, job_id: str | None = None) -> int:
+        """Queue `owner`'s running job (or all of them) again, e.g. at shutdown."""
+        query = (
+            "UPDATE jobs SET status = 'queued', started_at = NULL, progress_done = 0, "
+            "owner = NULL, heartbeat_at = NULL WHERE status = 'running' AND owner = ?"
+        )
+        params: tuple = (owner,)
+        if job_id is not None:
+            query += " AND id = ?"
+            params += (job_id,)
+        with self._connect() as db:
+            return db.execute(query, params).rowcount
+
+    def requeue_stale(self, stale_before: float) -> int:
+        """
+        Running jobs whose heartbeat stopped before `stale_before` belong to
+        a process that died: queue them again (or fail them after
+        MAX_ATTEMPTS). Jobs of live runners keep their heartbeat fresh and
+        are left alone, so several API processes can share one database.
+        """
+        stale = "status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, owner = NULL, "
+                f"error = 'Interrupted too many times' WHERE {stale} AND attempts >= ?",
+                (time.time(), stale_before, MAX_ATTEMPTS),
+            )
+            return db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, progress_done = 0, "
+                f"owner = NULL, heartbeat_at = NULL WHERE {stale}",
+                (stale_before,),
+            ).rowcount
+
+    def purge(self, older_than: float) -> int:
+        with self._connect() as db:
+            return db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (older_than,),
+            ).rowcount
+
+    def get(self, job_id: str) -> dict | None:
+        with self._connect() as db:
+            row = db.execute(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def result(self, job_id: str) -> tuple[str, bytes] | None:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT media_type, result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+            ).fetchone()
+        return (row["media_type"], row["result"]) if row is not None else None
+
+    def counts(self) -> dict:
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+# ---------------------- runner ----------------------
+class JobRunner:
+    """
+    Background threads that drain the job table on a render executor of
+    their own, so long dual series or big batches never take the worker
+    processes (or queue slots) that interactive /poster/render calls use.
+
+    - workers:    job render processes (0 renders in-process)
+    - threads:    jobs run at once
+    """
+
+    def __init__(self, store: JobStore, workers: int = 1, threads: int = 1):
+        self.store = store
+        self.threads = max(1, threads)
+        self.executor = RenderExecutor(workers=workers, queue_depth=max(1, workers) * 2)
+
+        # unique per process start, so a restarted pid is a different owner
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    @classmethod
+    def from_env(cls) -> "JobRunner":
+        return cls(
+            JobStore(Path(os.environ.get("POSTER_JOBS_DB") or DEFAULT_JOBS_DB)),
+            workers=env_int("POSTER_JOB_WORKERS", 1),
+            threads=env_int("POSTER_JOB_THREADS", 1),
+        )
+
+    # ---- submission ----
+    def submit(self, configs: list[PosterConfig], batch: bool) -> str:
+        """Queue one render (or a batch ZIP) and return its job id."""
+        payload = [config.model_dump(mode="json", by_alias=True) for config in configs]
+        job_id = self.store.add("batch" if batch else "render", payload, len(configs))
+        self._wake.set()
+        return job_id
+
+    # ---- lifecycle ----
+    def start(self) -> None:
+        self.store.open()
+        requeued = self.store.requeue_stale(time.time() - STALE_SECONDS)
+        purged = self.store.purge(time.time() - JOB_RETENTION_SECONDS)
+        self.executor.start()
+        self._stop.clear()
+        targets = [(self._loop, f"poster-job-{i}") for i in range(self.threads)]
+        targets.append((self._heartbeat_loop, "poster-job-heartbeat"))
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(
+            "Job runner started",
+            extra={"event": "job_runner_started", "requeued": requeued, "purged": purged,
+                   "threads": self.threads, "owner": self.owner, "db": str(self.store.path)},
+        )
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+        # jobs still running (a thread outlived the join) are queued again
+        # right away rather than waiting to go stale
+        self.store.release(self.owner)
+        self.executor.shutdown()
+
+    # ---- work ----
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self.store.heartbeat(self.owner)
+                # pick up jobs of API processes that died since
+                if self.store.requeue_stale(time.time() - STALE_SECONDS):
+                    self._wake.set()
+            except sqlite3.Error as exc:
+                logger.warning(
+                    "Job heartbeat failed",
+                    extra={"event": "job_heartbeat_failed", "error": str(exc)},
+                )
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            job = self.store.claim(self.owner)
+            if job is None:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._run(job["id"], job["kind"], json.loads(job["payload"]))
+
+    def _run(self, job_id: str, kind: str, payload: list[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            configs = _configs.validate_python(payload)
+            if kind == "batch":
+                items = [(config, render_cache_key(config)) for config in configs]
+                archive = b"".join(stream_batch_zip(
+                    items,
+                    render_cache.get_or_render,
+                    render=self.executor.render,
+                    concurrency=max(1, self.executor.workers),
+                    on_progress=lambda done, total: self.store.progress(job_id, done, total),
+                ))
+                self.store.finish(job_id, self.owner, "application/zip", archive)
+            else:
+                config = configs[0]
+                key = render_cache_key(config)
+                # several job threads can outnumber the executor's slots
+                result, _cached = render_cache.get_or_render(
+                    key, lambda: render_waiting(config, self.executor.render)
+                )
+                self.store.finish(job_id, self.owner, result.media_type, result.image_bytes, key)
+        except Exception as exc:
+            if self._stop.is_set():
+                # the worker pool went away under us at shutdown: run it next start
+                self.store.release(self.owner, job_id)
+                return
+            self.store.fail(job_id, self.owner, str(exc))
+            logger.warning(
+                "Render job failed",
+                extra={"event": "render_job_failed", "job_id": job_id, "error": str(exc)},
+            )
+            return
+        logger.info(
+            "Render job finished",
+            extra={"event": "render_job_done", "job_id": job_id, "kind": kind,
+                   "seconds": round(time.perf_counter() - started, 3)},
+        )
+
+    def stats(self) -> dict:
+        return {"jobs": self.store.counts(), "executor": self.executor.stats()}
+
+
+job_runner = JobRunner.from_env()
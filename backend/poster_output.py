@@ -0,0 +1,79 @@
+# poster_output.py
+
+import io
+
+from PIL import Image
+
+
+MEDIA_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+# File extension per media type (content-addressed /poster/{hash}.{ext} URLs)
+EXTENSIONS = {"image/png": "png", "image/webp": "webp", "image/jpeg": "jpg"}
+
+# Encoder settings when a request only picks the format.
+FORMAT_DEFAULTS = {
+    "png": {"compress_level": 6, "colors": None},
+    "webp": {"quality": 80, "lossless": False, "compress_level": 4, "colors": None},
+    "jpeg": {"quality": 85},
+}
+
+# Per quality tier, measured on the default posters (encode time, size):
+#   preview  RGBA PNG  ~37 ms / 48-75 KiB    256-colour PNG  ~16 ms / 13-17 KiB
+#   export   RGBA PNG ~480-630 ms / 280-415 KiB   256-colour PNG ~180-290 ms / 92-105 KiB
+#            lossless WebP 0.45-3.8 s / 92-164 KiB   lossy WebP q80 0.6-0.7 s / 76-124 KiB
+# Posters are flat-colour graphics, so live-editing tiers use a 256-colour
+# palette PNG (a quarter of the bytes in half the time, worst channel error
+# ~25/255 on anti-aliased edges); standard and export stay lossless RGBA PNG.
+TIER_DEFAULTS = {
+    "draft": {"format": "png", "compress_level": 6, "colors": 256},
+    "preview": {"format": "png", "compress_level": 6, "colors": 256},
+    "standard": {"format": "png", "compress_level": 6, "colors": None},
+    "export": {"format": "png", "compress_level": 6, "colors": None},
+}
+
+
+def resolve_output(quality: str, output: dict | None = None) -> dict:
+    """
+    Effective encoder settings: the tier's defaults (or, when `output` picks
+    another format, that format's defaults) overridden by the non-None
+    fields of `output`.
+    """
+    output = {k: v for k, v in (output or {}).items() if v is not None}
+    base = TIER_DEFAULTS.get(quality, TIER_DEFAULTS["standard"])
+    fmt = output.get("format", base["format"])
+    if fmt != base["format"]:
+        base = {"format": fmt, **FORMAT_DEFAULTS[fmt]}
+    return {**base, **output}
+
+
+def _quantize(img: Image.Image, colors: int) -> Image.Image:
+    # Fast octree handles RGBA; no dithering keeps flat fills flat.
+    return img.quantize(colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+
+def encode_image(img: Image.Image, options: dict) -> tuple[bytes, str]:
+    """Encode `img` with resolved `options` (see resolve_output); returns (bytes, media type)."""
+    fmt = options["format"]
+    buf = io.BytesIO()
+
+    if fmt == "png":
+        if options.get("colors"):
+            img = _quantize(img, options["colors"])
+        img.save(buf, format="PNG", compress_level=options.get("compress_level", 6))
+    elif fmt == "webp":
+        if options.get("colors"):
+            img = _quantize(img, options["colors"]).convert("RGBA")
+        img.save(
+            buf,
+            format="WEBP",
+            lossless=bool(options.get("lossless")),
+            quality=options.get("quality", 80),
+            # WebP effort runs 0-6 (zlib levels 0-9 clamp)
+            method=min(6, options.get("compress_level", 4)),
+        )
+    elif fmt == "jpeg":
+        # Templates are opaque, so dropping alpha loses nothing
+        img.convert("RGB").save(buf, format="JPEG", quality=options.get("quality", 85), optimize=True)
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+    return buf.getvalue(), MEDIA_TYPES[fmt]
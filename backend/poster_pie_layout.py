@@ -0,0 +1,103 @@
+# poster_pie_layout.py
+
+import math
+from functools import lru_cache
+
+import numpy as np
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextToPath
+
+
+# Slices below this share of the total get no leader label (they are a
+# sliver of a pixel column wide); fold them up front with top_n if they
+# matter.
+LABEL_MIN_SHARE = 0.005
+
+# Legend geometry in font sizes, matching the pie legend's matplotlib
+# settings: each row is one text line plus labelspacing, and the frame adds
+# borderpad above and below (measured: 15 rows at 8 pt = 180 pt). Entries
+# spill into up to LEGEND_MAX_COLS columns before the smallest slices are
+# summarized as "+N more". The legend hangs off the right of an
+# equal-aspect pie, so extra columns would run off the chart: one column.
+LEGEND_LABELSPACING = 0.5
+LEGEND_BORDERPAD = 0.35
+LEGEND_MAX_COLS = 1
+
+_text_to_path = TextToPath()
+
+
+@lru_cache(maxsize=4096)
+def text_extent(text: str, size: float, weight: str = "bold") -> tuple[float, float]:
+    """
+    (width, height) of `text` in points, measured from the glyph outlines
+    once per (text, size, weight). The font family comes from the chart rc,
+    which is applied once per process (poster_raster).
+    """
+    prop = FontProperties(size=size, weight=weight)
+    w, h, _descent = _text_to_path.get_text_width_height_descent(text, prop, ismath=False)
+    return w, h
+
+
+def spread_bounded(base: np.ndarray, gap: float, lo: float, hi: float) -> np.ndarray:
+    """
+    Positions for a column of labels that want the ascending heights `base`,
+    at least `gap` apart and within [lo, hi].
+
+    Each label moves up only as far as the labels below force it to (the
+    classic greedy push, solved as one cumulative max), then the column is
+    pulled back under `hi`. Needs len(base) labels to fit: (n - 1) * gap <= hi - lo.
+    """
+    steps = np.arange(base.size) * gap
+    y = steps + np.maximum.accumulate(np.maximum(base, lo) - steps)
+    return np.minimum(y, hi - steps[::-1])
+
+
+def layout_leader_labels(theta_deg, shares, radius: float, gap: float, lo: float, hi: float,
+                         min_share: float = LABEL_MIN_SHARE):
+    """
+    Solve value-label heights for pie wedges with mid-angles `theta_deg`.
+
+    Returns (index, side, y): the wedges that get a label (right side first,
+    each side bottom to top), +1 / -1 for right / left, and the label heights.
+    Slices under `min_share` are skipped, and when a side has more labels
+    than fit between lo and hi only its largest slices keep one.
+    """
+    theta = np.radians(np.asarray(theta_deg, dtype=float))
+    shares = np.asarray(shares, dtype=float)
+    y_dir = np.sin(theta)
+    right = np.cos(theta) >= 0
+    visible = shares >= min_share
+    capacity = int((hi - lo) / gap) + 1
+
+    index, side, y = [], [], []
+    for on_side, sign in ((right, 1), (~right, -1)):
+        idx = np.flatnonzero(visible & on_side)
+        if idx.size > capacity:
+            idx = np.sort(idx[np.argpartition(-shares[idx], capacity - 1)[:capacity]])
+        base = radius * y_dir[idx]
+        order = np.argsort(base, kind="stable")
+        index.append(idx[order])
+        side.append(np.full(idx.size, sign))
+        y.append(spread_bounded(base[order], gap, lo, hi))
+    return np.concatenate(index), np.concatenate(side), np.concatenate(y)
+
+
+def legend_entries(shares, font_size: float, height_pt: float,
+                   max_cols: int = LEGEND_MAX_COLS) -> tuple[np.ndarray, int, int]:
+    """
+    Fit a pie legend into a chart `height_pt` tall.
+
+    Returns (indices of the slices to list, in order; ncol; number of
+    smallest slices summarized as one "+N more" entry).
+    """
+    shares = np.asarray(shares, dtype=float)
+    n = shares.size
+    # rows * (1 + spacing) - spacing + 2 * borderpad font sizes must fit
+    usable = height_pt / font_size - 2 * LEGEND_BORDERPAD + LEGEND_LABELSPACING
+    rows = max(1, int(usable / (1 + LEGEND_LABELSPACING)))
+    if n <= rows * max_cols:
+        return np.arange(n), math.ceil(n / rows), 0
+
+    keep = rows * max_cols - 1
+    idx = np.sort(np.argpartition(-shares, keep - 1)[:keep])
+    return idx, max_cols, n - keep
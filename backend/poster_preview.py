@@ -0,0 +1,218 @@
+# poster_preview.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+
+from poster_executor import CONFIG_ERRORS, RenderQueueFull, RenderWorkerError
+from poster_result import RenderResult
+from poster_schemas import PosterConfig, RenderQuality
+
+
+# Live previews render at this tier unless a message asks for another one.
+PREVIEW_QUALITY: RenderQuality = "preview"
+# A render starts once edits have paused this long...
+PREVIEW_DEBOUNCE_SECONDS = int(os.environ.get("POSTER_PREVIEW_DEBOUNCE_MS", "60")) / 1000
+# ...or, during continuous edits, at most this long after the first one.
+PREVIEW_MAX_WAIT_SECONDS = int(os.environ.get("POSTER_PREVIEW_MAX_WAIT_MS", "250")) / 1000
+QUEUE_FULL_RETRY_SECONDS = 0.1
+
+_config = TypeAdapter(PosterConfig)
+_quality = TypeAdapter(RenderQuality)
+
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewSession:
+    """
+    State for one live-preview WebSocket.
+
+    The client sends `{"seq": n, "config": {...}, "quality"?: ...}` on every
+    edit. Only the newest message is kept: bursts are coalesced by a short
+    debounce, at most one render runs per session, and a render whose
+    config was superseded while it ran is not sent (its result still lands
+    in the render cache). For each shown render the client gets a JSON
+    `frame` header followed by one binary message with the image bytes;
+    `rendering`, `unchanged` and `error` messages carry the same `seq`.
+
+    - prepare:  (config, quality) -> (effective config, cache key)
+    - render:   (config, cache key) -> (RenderResult, cached); blocking
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        prepare: Callable[[PosterConfig, RenderQuality], tuple[PosterConfig, str]],
+        render: Callable[[PosterConfig, str], tuple[RenderResult, bool]],
+        debounce: float = PREVIEW_DEBOUNCE_SECONDS,
+        max_wait: float = PREVIEW_MAX_WAIT_SECONDS,
+    ):
+        self.ws = websocket
+        self._prepare = prepare
+        self._render = render
+        self.debounce = debounce
+        self.max_wait = max(debounce, max_wait)
+
+        self._latest: tuple[int, dict] | None = None
+        self._changed = asyncio.Event()
+        self._last_key: str | None = None
+        # keeps a frame's header and image bytes adjacent on the socket
+        self._send_lock = asyncio.Lock()
+
+        self.received = 0
+        self.rendered = 0
+        self.superseded = 0
+        self.unchanged = 0
+
+    async def _send_error(self, seq: int, exc: Exception) -> None:
+        # same split as the HTTP endpoints: config problems and worker
+        # crashes are the client's to see, anything else stays in the logs
+        if isinstance(exc, CONFIG_ERRORS + (RenderWorkerError,)):
+            detail = str(exc)
+        else:
+            logger.exception(
+                "Preview render failed", extra={"event": "preview_render_failed", "seq": seq}
+            )
+            detail = "Render failed"
+        await self._send({"type": "error", "seq": seq, "detail": detail})
+
+    async def _send(self, *messages: dict | bytes) -> None:
+        async with self._send_lock:
+            for message in messages:
+                if isinstance(message, bytes):
+                    await self.ws.send_bytes(message)
+                else:
+                    await self.ws.send_json(message)
+
+    @property
+    def _latest_seq(self) -> int:
+        return self._latest[0] if self._latest is not None else 0
+
+    # ---- lifecycle ----
+    async def run(self) -> None:
+        """Serve the socket until the client disconnects."""
+        renderer = asyncio.create_task(self._render_loop())
+        try:
+            await self._receive_loop()
+        finally:
+            renderer.cancel()
+            try:
+                await renderer
+            except (asyncio.CancelledError, Exception):
+                pass
+            logger.info(
+                "Preview session closed",
+                extra={"event": "preview_session_closed", "received": self.received,
+                       "rendered": self.rendered, "superseded": self.superseded,
+                       "unchanged": self.unchanged},
+            )
+
+    async def _receive_loop(self) -> None:
+        # WebSocketDisconnect ends the session
+        while True:
+            frame = await self.ws.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000), frame.get("reason"))
+            message = None
+            if frame.get("text") is not None:
+                try:
+                    message = json.loads(frame["text"])
+                except ValueError:
+                    pass
+            else:
+                await self._send({"type": "error", "seq": None, "detail": "Binary frames are not accepted"})
+                continue
+            if not isinstance(message, dict) or "config" not in message:
+                await self._send({"type": "error", "seq": None, "detail": "Expected {seq, config} JSON"})
+                continue
+            seq = message.get("seq")
+            if not isinstance(seq, int) or seq <= self._latest_seq:
+                seq = self._latest_seq + 1
+            self.received += 1
+            self._latest = (seq, message)
+            self._changed.set()
+
+    # ---- rendering ----
+    async def _settle(self) -> tuple[int, dict]:
+        """Wait for the edits to pause (or max_wait) and return the newest message."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            self._changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._changed.wait(), min(self.debounce, remaining))
+            except asyncio.TimeoutError:
+                break
+        return self._latest
+
+    async def _render_loop(self) -> None:
+        while True:
+            await self._changed.wait()
+            seq, message = await self._settle()
+            await self._show(seq, message)
+
+    async def _show(self, seq: int, message: dict) -> None:
+        try:
+            config = _config.validate_python(message["config"])
+            quality = _quality.validate_python(message.get("quality") or PREVIEW_QUALITY)
+            # keying hashes files and may fetch remote images: keep it off the loop
+            config, cache_key = await run_in_threadpool(self._prepare, config, quality)
+        except ValidationError as exc:
+            # same shape as the HTTP endpoints' 422 detail
+            detail = json.loads(exc.json(include_url=False))
+            await self._send({"type": "error", "seq": seq, "detail": detail})
+            return
+        except Exception as exc:
+            # e.g. an unreadable center_image while keying: report it and keep
+            # the session rendering later edits
+            await self._send_error(seq, exc)
+            return
+
+        if cache_key == self._last_key:
+            # nothing visible changed (e.g. a no-op edit): keep the frame shown
+            self.unchanged += 1
+            await self._send({"type": "unchanged", "seq": seq, "cache_key": cache_key})
+            return
+
+        await self._send({"type": "rendering", "seq": seq})
+        started = time.perf_counter()
+        while True:
+            if seq != self._latest_seq:
+                self.superseded += 1
+                return
+            try:
+                result, cached = await run_in_threadpool(self._render, config, cache_key)
+                break
+            except RenderQueueFull:
+                await asyncio.sleep(QUEUE_FULL_RETRY_SECONDS)
+            except Exception as exc:
+                await self._send_error(seq, exc)
+                return
+
+        if seq != self._latest_seq:
+            # a newer config arrived mid-render: only the newest frame is shown
+            self.superseded += 1
+            return
+
+        self.rendered += 1
+        self._last_key = cache_key
+        header = {
+            "type": "frame",
+            "seq": seq,
+            "cache_key": cache_key,
+            "media_type": result.media_type,
+            "quality": config.quality,
+            "cached": cached,
+            "render_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        await self._send(header, result.image_bytes)
@@ -0,0 +1,106 @@
+# poster_raster.py
+
+import threading
+
+import matplotlib as mpl
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from poster_fonts import monospace_families
+
+
+# rc settings shared by every chart layer. matplotlib has no per-figure or
+# per-thread rcParams, so instead of mutating them on every render they are
+# applied exactly once per process and never touched again; parallel renders
+# only ever read them. font.monospace is filled from poster_fonts with the
+# preferred families that are actually available.
+CHART_RC = {
+    "font.family": "monospace",
+}
+
+# Render quality tiers -> linear scale of the whole poster (template pixels
+# and chart DPI). Chart sizes are in points and poster layout in fractions of
+# the template, so every tier lays out identically; only resolution changes.
+QUALITY_SCALES = {
+    "draft": 0.35,
+    "preview": 0.5,
+    "standard": 1.0,
+    "export": 2.0,
+}
+DEFAULT_QUALITY = "standard"
+# Tiers whose scaled templates are decoded at start-up; export (2x) is large
+# and rare, so it is resized lazily on first use.
+WARM_SCALES = (QUALITY_SCALES["standard"], QUALITY_SCALES["preview"])
+
+_rc_lock = threading.Lock()
+_rc_applied = False
+
+
+def _ensure_chart_rc():
+    global _rc_applied
+    if _rc_applied:
+        return
+    with _rc_lock:
+        if not _rc_applied:
+            mpl.rcParams.update({**CHART_RC, "font.monospace": list(monospace_families())})
+            _rc_applied = True
+
+
+def quality_scale(quality: str | None) -> float:
+    """Map a render quality tier ("preview", "export", ...) to its scale."""
+    q = (quality or DEFAULT_QUALITY).strip().lower()
+    if q not in QUALITY_SCALES:
+        raise ValueError(f"quality must be one of: {', '.join(QUALITY_SCALES)}")
+    return QUALITY_SCALES[q]
+
+
+def chart_box(width: int, height: int, scale: float) -> tuple[int, int, int, int]:
+    """
+    (left, top, right, bottom) pixels of the chart area on a width x height
+    template at `scale`. Shared by every renderer and by anything that
+    pre-sizes assets for the chart (e.g. center watermarks).
+    """
+    footer_value_x = int(0.09 * width) + int(0.07 * width)
+    left = footer_value_x - int(229 * scale)
+    right = width - int(0.062 * width) + int(60 * scale)
+    return left, int(0.15 * height), right, int(0.90 * height)
+
+
+def new_chart_figure(width: int, height: int, dpi: float) -> Figure:
+    """
+    Create a pyplot-free Figure backed by its own FigureCanvasAgg.
+
+    The figure is sized so its canvas is exactly width x height pixels at
+    `dpi`. Nothing is registered with pyplot, so figures are independent
+    per render/thread and are freed by normal garbage collection.
+    """
+    _ensure_chart_rc()
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_to_image(fig, width: int, height: int) -> Image.Image:
+    """
+    Rasterize a matplotlib figure straight into a PIL RGBA image.
+
+    The figure is expected to be sized so that figsize * dpi == (width, height);
+    the Agg buffer is then handed to PIL as-is, with no PNG encode/decode and
+    no resampling. Transparency matches savefig(transparent=True) as long as
+    the figure/axes patches are already transparent (all renderers do this).
+    """
+    canvas = fig.canvas
+    if not isinstance(canvas, FigureCanvasAgg):
+        canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+
+    buf = canvas.buffer_rgba()
+    buf_w, buf_h = canvas.get_width_height(physical=True)
+    img = Image.frombuffer("RGBA", (buf_w, buf_h), buf, "raw", "RGBA", 0, 1).copy()
+
+    # Float rounding in figsize can leave the buffer a pixel off; crop/pad
+    # (never resample) so the chart lands exactly on the chart box.
+    if img.size != (width, height):
+        img = img.crop((0, 0, width, height))
+    return img
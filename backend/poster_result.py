@@ -0,0 +1,47 @@
+# poster_result.py
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+from poster_output import encode_image, resolve_output
+from poster_raster import DEFAULT_QUALITY
+
+
+@dataclass(frozen=True)
+class RenderResult:
+    """
+    In-memory output of a single poster render.
+
+    Renderers never write to shared paths; each call owns its own bytes, so
+    concurrent renders cannot clobber each other's output.
+    """
+
+    image_bytes: bytes
+    media_type: str
+    width: int
+    height: int
+    poster_type: str
+
+    def save(self, path) -> Path:
+        """Write the encoded image to `path` (handy for scripts/demos)."""
+        path = Path(path)
+        path.write_bytes(self.image_bytes)
+        return path
+
+
+def encode_poster(canvas: Image.Image, poster_type: str, quality: str = DEFAULT_QUALITY,
+                  output: dict | None = None) -> RenderResult:
+    """
+    Encode a finished poster canvas with the output settings for `quality`
+    (overridden by `output`, see poster_output) and wrap it in a RenderResult.
+    """
+    image_bytes, media_type = encode_image(canvas, resolve_output(quality, output))
+    return RenderResult(
+        image_bytes=image_bytes,
+        media_type=media_type,
+        width=canvas.width,
+        height=canvas.height,
+        poster_type=poster_type,
+    )
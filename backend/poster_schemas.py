@@ -7,6 +7,22 @@ from pydantic import BaseModel, field_validator, model_validator, ConfigDict, Fi
 PosterType = Literal["pie", "bar", "dual"]
 TimeRange = Literal["7d", "30d", "90d", "180d", "1y", "all"]
 TimeBucket = Literal["none", "7d", "30d", "90d", "180d", "1y"]
+RenderQuality = Literal["draft", "preview", "standard", "export"]
+BucketAgg = Literal["sum", "mean", "min", "max", "last", "count"]
+OutputFormat = Literal["png", "webp", "jpeg"]
+
+
+class OutputOptions(BaseModel):
+    """Encoder settings; unset fields fall back to the quality tier's defaults (poster_output)."""
+    format: Optional[OutputFormat] = None
+    # WebP / JPEG quality
+    quality: Optional[int] = Field(None, ge=1, le=100)
+    # WebP only: lossless encoding
+    lossless: Optional[bool] = None
+    # PNG zlib level; WebP encoder effort (clamped to 6)
+    compress_level: Optional[int] = Field(None, ge=0, le=9)
+    # palette-quantize to this many colours (PNG / WebP)
+    colors: Optional[int] = Field(None, ge=2, le=256)
 
 
 class BasePosterConfig(BaseModel):
@@ -18,6 +34,18 @@ class BasePosterConfig(BaseModel):
     # logical template selector; backend maps "main" → main_template.png, etc.
     template_name: Optional[str] = "main"
 
+    # render resolution tier: "preview" is fast/low-DPI for live editing,
+    # "export" is 2x for print; layout is identical across tiers
+    quality: RenderQuality = "standard"
+    # output encoding (format / quality / compression / palette); None uses
+    # the tier defaults: palette PNG for draft/preview, lossless PNG otherwise
+    output: Optional[OutputOptions] = None
+
+    # keep the top_n largest categories (pie/bar) or left series (dual) and
+    # fold the rest into one `other_label` entry; None = show everything
+    top_n: Optional[int] = Field(None, ge=1)
+    other_label: str = "Other"
+
     # optional override of the footer date
     date_str: Optional[str] = None
     # optional brand/logo in center for some charts
@@ -132,6 +160,14 @@ class DualConfig(BasePosterConfig):
 
     time_range: TimeRange = Field("all", alias="timeRange")
     time_bucket: TimeBucket = Field("none", alias="timeBucket")
+    # how points are combined per bucket: one agg for all left series or
+    # {series name: agg}; e.g. sum volumes but average a price
+    bucket_agg_left: Union[BucketAgg, Dict[str, BucketAgg]] = Field("sum", alias="bucketAggLeft")
+    bucket_agg_right: BucketAgg = Field("sum", alias="bucketAggRight")
+
+    # drawing budget for dense series (LTTB for lines, min/max for areas/bars);
+    # None = about two samples per chart pixel, 0 = draw every point
+    max_points: Optional[int] = Field(None, ge=0)
 
     @model_validator(mode="after")
     def validate_series_lengths(self) -> "DualConfig":
@@ -153,6 +189,14 @@ class DualConfig(BasePosterConfig):
         if self.right_series is not None and len(self.right_series) != left_len:
             raise ValueError("right_series length must match y_series length")
 
+        # per-series bucket aggregations must name existing series
+        if isinstance(self.bucket_agg_left, dict):
+            unknown = set(self.bucket_agg_left) - set(self.y_series)
+            if unknown:
+                raise ValueError(
+                    f"bucket_agg_left names unknown series: {', '.join(sorted(unknown))}"
+                )
+
         return self
 
 
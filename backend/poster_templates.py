@@ -0,0 +1,105 @@
+# poster_templates.py
+
+import logging
+import os
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+
+# ---------------------- File Helpers  ----------------------
+BASE_DIR = Path(__file__).resolve().parent
+TEMPLATE_DIR = BASE_DIR / "graphs" / "templates"
+
+DEFAULT_TEMPLATE_PATH = TEMPLATE_DIR / "main_template.png"
+DEFAULT_TEMPLATE_NAME = "main"
+TEMPLATE_SUFFIX = "_template.png"
+
+
+logger = logging.getLogger(__name__)
+
+# (path, scale) -> (mtime_ns, size, decoded RGBA image)
+_registry: dict[tuple[Path, float], tuple[int, int, Image.Image]] = {}
+_lock = threading.Lock()
+
+
+def _candidate_path(template_name: str) -> Path:
+    name = (template_name or DEFAULT_TEMPLATE_NAME).strip().lower()
+    return TEMPLATE_DIR / f"{name}{TEMPLATE_SUFFIX}"
+
+
+def resolve_template_path(template_name: str) -> Path:
+    """
+    Map a simple template name to a template PNG filename.
+
+    For now:
+      "main" -> main_template.png
+
+    Later you can add:
+      "dark" -> dark_template.png
+      "alt"  -> alt_template.png
+    """
+    # simple convention: <name>_template.png
+    candidate = _candidate_path(template_name)
+    if candidate.exists():
+        return candidate
+
+    # fallback to main if missing
+    return DEFAULT_TEMPLATE_PATH
+
+
+def _load(path: Path, scale: float = 1.0) -> Image.Image:
+    key = (path, scale)
+    with _lock:
+        entry = _registry.get(key)
+
+    st = os.stat(path)
+    if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        return entry[2]
+
+    if scale == 1.0:
+        img = Image.open(path).convert("RGBA")
+    else:
+        master = _load(path)
+        size = (round(master.width * scale), round(master.height * scale))
+        img = master.resize(size, Image.Resampling.LANCZOS)
+
+    with _lock:
+        _registry[key] = (st.st_mtime_ns, st.st_size, img)
+    logger.info(
+        "Template decoded",
+        extra={
+            "event": "template_reloaded" if entry is not None else "template_loaded",
+            "path": str(path),
+            "scale": scale,
+        },
+    )
+    return img
+
+
+def get_template(template_name: str, scale: float = 1.0) -> Image.Image:
+    """
+    Return the decoded RGBA template for `template_name`, resized by `scale`
+    (render quality tiers; 1.0 is the template's native size).
+
+    The image is shared process-wide and must be treated as read-only;
+    renderers draw on `template.copy()`. It is decoded once per scale and
+    re-decoded only when the file's mtime/size changes.
+    """
+    # The stat in _load doubles as the existence check, so the hot path is
+    # a single syscall; a missing template falls back to main.
+    try:
+        return _load(_candidate_path(template_name), scale)
+    except FileNotFoundError:
+        return _load(DEFAULT_TEMPLATE_PATH, scale)
+
+
+def preload_templates(scales=(1.0,)) -> list[str]:
+    """Decode every graphs/templates/*_template.png (at each scale) so first renders skip it."""
+    loaded = []
+    for path in sorted(TEMPLATE_DIR.glob(f"*{TEMPLATE_SUFFIX}")):
+        for scale in scales:
+            _load(path, scale)
+        loaded.append(path.name[: -len(TEMPLATE_SUFFIX)])
+    return loaded
@@ -0,0 +1,67 @@
+# test_concurrent_render.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pine_poster_adapter import render_pine_poster_from_config
+from poster_defaults import get_poster_default
+from poster_executor import render_executor
+from poster_raster import QUALITY_SCALES
+from poster_templates import get_template
+
+
+def _configs():
+    """A mix of pie, bar and dual posters, each visibly distinct (title, quality)."""
+    configs = []
+    for i, (poster_type, quality) in enumerate([
+        ("pie", "draft"), ("bar", "draft"), ("dual", "draft"),
+        ("pie", "preview"), ("bar", "preview"), ("dual", "preview"),
+        ("bar", "draft"), ("pie", "draft"), ("dual", "draft"),
+    ]):
+        config = get_poster_default(poster_type)
+        configs.append(config.model_copy(update={
+            "title": f"{config.title} #{i}",
+            "quality": quality,
+            # pinned, so serial and parallel renders agree on the footer
+            "date_str": "Jan 01, 2025",
+        }))
+    return configs
+
+
+def _expected_size(config):
+    return get_template(config.template_name or "main", QUALITY_SCALES[config.quality]).size
+
+
+def _check(configs, results, serial):
+    for config, result, reference in zip(configs, results, serial):
+        assert result.poster_type == config.poster_type
+        assert (result.width, result.height) == _expected_size(config)
+        assert result.image_bytes == reference.image_bytes, config.title
+
+
+@pytest.fixture(scope="module")
+def configs():
+    return _configs()
+
+
+@pytest.fixture(scope="module")
+def serial(configs):
+    return [render_pine_poster_from_config(config) for config in configs]
+
+
+def test_parallel_renders_match_their_own_config(configs, serial):
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(render_pine_poster_from_config, configs))
+    _check(configs, results, serial)
+
+
+def test_executor_renders_match_their_own_config(configs, serial):
+    render_executor.start()
+    try:
+        # no more callers than admission slots, so nothing is rejected
+        with ThreadPoolExecutor(max_workers=render_executor.queue_depth) as pool:
+            results = list(pool.map(render_executor.render, configs))
+    finally:
+        render_executor.shutdown()
+    _check(configs, results, serial)
@@ -0,0 +1,119 @@
+# test_dates.py
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from dateutil import parser as dateparser
+
+from poster_dates import parse_x_values
+
+
+# ---- reference: the per-element parser the fast path replaced ----
+def _naive_utc(dt):
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _reference_parse(values):
+    def parse(vals):
+        parsed = []
+        for xv in vals:
+            dt = xv if isinstance(xv, datetime) else dateparser.parse(str(xv))
+            if not isinstance(dt, datetime):
+                raise ValueError("x_values entries must be datetime-like or numeric")
+            parsed.append(_naive_utc(dt))
+        return parsed
+
+    def looks_like_datetime(vals):
+        return any(
+            isinstance(xv, datetime)
+            or (isinstance(xv, str) and any(tok in xv for tok in ("-", "/", "T", ":")))
+            for xv in vals
+        )
+
+    values = list(values)
+    if looks_like_datetime(values):
+        try:
+            return parse(values), True
+        except Exception as exc:
+            raise ValueError("not parseable") from exc
+    try:
+        return [float(v) for v in values], False
+    except Exception:
+        pass
+    try:
+        return parse(values), True
+    except Exception as exc:
+        raise ValueError("not parseable") from exc
+
+
+PARITY_COLUMNS = {
+    "iso_dates": ["2025-01-01", "2025-01-02", "2024-12-31"],
+    "iso_datetimes": ["2025-01-01T10:00", "2025-01-01 11:30:15", "2025-01-01T12:00:00.250"],
+    "iso_z": ["2025-03-01T00:00:00Z", "2025-03-01T06:00:00Z"],
+    "shared_offset": ["2025-03-01T00:00:00+05:30", "2025-03-02T12:00:00+05:30"],
+    "mixed_offsets": ["2025-03-01T00:00:00+05:30", "2025-03-01T00:00:00-02:00"],
+    "mixed_formats": ["2025-01-01", "Jan 3 2025", "2025/01/05 10:00", "05 Feb 2025 08:15"],
+    "slashes": ["01/02/2025", "01/03/2025"],
+    "datetime_objects": [
+        datetime(2025, 1, 1, 9),
+        datetime(2025, 1, 1, 9, tzinfo=timezone(timedelta(hours=2))),
+        "2025-01-02",
+    ],
+    "numeric_strings": ["1", "2.5", "-3"],
+    "numbers": [1, 2.5, 3],
+    "short_ints": [100, 200, 300],
+    "single": ["2025-06-30"],
+}
+
+
+@pytest.mark.parametrize("name", sorted(PARITY_COLUMNS))
+def test_matches_the_per_element_parser(name):
+    column = PARITY_COLUMNS[name]
+    expected, expected_is_date = _reference_parse(column)
+
+    parsed, is_date = parse_x_values(column)
+
+    assert is_date == expected_is_date
+    if is_date:
+        assert parsed.tolist() == np.array(expected, dtype="datetime64[us]").tolist()
+    else:
+        assert parsed.tolist() == expected
+
+
+@pytest.mark.parametrize("column", [
+    ["2025-01-01", "not a date"],
+    ["2025-01-01", "2025-13-45"],
+    ["Total", "Other"],
+    ["abc", "def"],
+])
+def test_rejects_what_the_per_element_parser_rejects(column):
+    with pytest.raises(ValueError):
+        _reference_parse(column)
+    with pytest.raises(ValueError):
+        parse_x_values(column)
+
+
+def test_repeat_columns_are_served_from_the_cache():
+    column = ["2025-01-01", "2025-01-02"]
+    first, _ = parse_x_values(column)
+    again, _ = parse_x_values(list(column))
+    assert again is first
+    assert not first.flags.writeable
+
+
+def test_epoch_columns_are_dates():
+    # the one intended difference: 10/13-digit epochs in range become dates
+    seconds = ["1735689600", "1735776000"]
+    parsed, is_date = parse_x_values(seconds)
+    assert is_date
+    assert parsed.tolist() == [datetime(2025, 1, 1), datetime(2025, 1, 2)]
+
+    millis, is_date = parse_x_values(["1735689600000", "1735689600500"])
+    assert is_date
+    assert millis[1] - millis[0] == np.timedelta64(500, "ms")
+
+    # other integers stay numeric
+    assert parse_x_values(["1000000000", "123"])[1] is False
@@ -0,0 +1,95 @@
+# test_decimate.py
+
+import numpy as np
+import pytest
+
+from poster_decimate import lttb_indices, minmax_indices, point_budget, with_required
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    x = np.arange(10_000, dtype=float)
+    y = np.cumsum(rng.normal(size=x.size))
+    y[4321] = y.max() + 50  # a single-sample spike
+    return x, y
+
+
+# ---- point budget ----
+def test_point_budget():
+    assert point_budget(800) == 1600
+    assert point_budget(800, 500) == 500
+    assert point_budget(800, 1) == 3
+    assert point_budget(800, 0) == 0
+
+
+# ---- LTTB ----
+@pytest.mark.parametrize("n_out", [3, 10, 500])
+def test_lttb_keeps_endpoints_within_budget(series, n_out):
+    x, y = series
+    idx = lttb_indices(x, y, n_out)
+
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert len(idx) <= n_out
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_keeps_a_spike(series):
+    x, y = series
+    assert 4321 in lttb_indices(x, y, 500)
+
+
+@pytest.mark.parametrize("n_out", [0, 50, 1000])
+def test_lttb_passes_short_series_through(n_out):
+    x = np.arange(50, dtype=float)
+    assert lttb_indices(x, np.sin(x), n_out).tolist() == list(range(50))
+
+
+# ---- min/max ----
+def _buckets(n, n_buckets):
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.intp)
+    return list(zip(starts[:-1], starts[1:]))
+
+
+@pytest.mark.parametrize("n_buckets", [1, 7, 250])
+def test_minmax_keeps_endpoints_and_every_bucket_extreme(series, n_buckets):
+    _, y = series
+    rows = np.vstack([y, -0.5 * y + 3])
+    idx = minmax_indices(rows, n_buckets)
+
+    assert idx[0] == 0 and idx[-1] == y.size - 1
+    # two extremes per bucket per row, plus the first and last sample
+    assert len(idx) <= 2 * n_buckets * len(rows) + 2
+    kept = set(idx.tolist())
+    for row in rows:
+        for lo, hi in _buckets(y.size, n_buckets):
+            assert lo + int(row[lo:hi].argmin()) in kept
+            assert lo + int(row[lo:hi].argmax()) in kept
+
+
+def test_minmax_single_row_within_budget(series):
+    _, y = series
+    idx = minmax_indices(y, 400)
+    assert len(idx) <= 2 * 400 + 2
+    assert 4321 in idx
+
+
+def test_minmax_maxima_only(series):
+    _, y = series
+    idx = minmax_indices(y, 100, keep_min=False)
+
+    assert len(idx) <= 100 + 2
+    kept = set(idx.tolist())
+    for lo, hi in _buckets(y.size, 100):
+        assert lo + int(y[lo:hi].argmax()) in kept
+
+
+@pytest.mark.parametrize("n_buckets", [0, 25, 40])
+def test_minmax_passes_short_series_through(n_buckets):
+    rows = np.arange(50, dtype=float)
+    assert minmax_indices(rows, n_buckets).tolist() == list(range(50))
+
+
+def test_with_required_merges_indices():
+    assert with_required(np.array([0, 5, 9]), [3, 5]).tolist() == [0, 3, 5, 9]
+    assert with_required(np.array([0, 9]), None).tolist() == [0, 9]
@@ -0,0 +1,213 @@
+# test_fetch.py
+
+import http.server
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from poster_fetch import RemoteAssetError, RemoteFetcher
+
+
+class _Origin(http.server.ThreadingHTTPServer):
+    """
+    Local stand-in for an image host. `routes` maps a path to a dict of
+    body, etag, status, delay (before the response) and trickle (seconds
+    between 1 KB body chunks); `requests` records (path, If-None-Match).
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.routes: dict[str, dict] = {}
+        self.requests: list[tuple[str, str | None]] = []
+        self._lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def hits(self, path: str) -> int:
+        with self._lock:
+            return sum(1 for p, _ in self.requests if p == path)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        origin = self.server
+        with origin._lock:
+            origin.requests.append((self.path, self.headers.get("If-None-Match")))
+        route = origin.routes.get(self.path, {"status": 404, "body": b""})
+        time.sleep(route.get("delay", 0))
+
+        etag = route.get("etag")
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = route.get("body", b"")
+        self.send_response(route.get("status", 200))
+        self.send_header("Content-Type", "image/png")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        trickle = route.get("trickle")
+        if not trickle:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), 1024):
+            self.wfile.write(body[start:start + 1024])
+            self.wfile.flush()
+            time.sleep(trickle)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    server = _Origin()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_fetcher(tmp_path):
+    fetchers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("cache_dir", tmp_path / "remote")
+        fetcher = RemoteFetcher(**kwargs)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def test_revalidates_with_etag(origin, make_fetcher):
+    origin.routes["/logo.png"] = {"body": b"logo-v1", "etag": '"v1"'}
+    fetcher = make_fetcher(fresh_seconds=0)
+
+    assert fetcher.fetch(origin.url("/logo.png")) == b"logo-v1"
+    assert fetcher.fetch(origin.url("/logo.png")) == b"logo-v1"
+
+    assert origin.requests == [("/logo.png", None), ("/logo.png", '"v1"')]
+    stats = fetcher.stats()
+    assert stats["downloaded"] == 1
+    assert stats["revalidated"] == 1
+
+
+def test_fresh_entries_skip_the_origin(origin, make_fetcher):
+    origin.routes["/logo.png"] = {"body": b"logo", "etag": '"v1"'}
+    fetcher = make_fetcher(fresh_seconds=300)
+
+    fetcher.fetch(origin.url("/logo.png"))
+    fetcher.fetch(origin.url("/logo.png"))
+
+    assert origin.hits("/logo.png") == 1
+    assert fetcher.stats()["hits_fresh"] == 1
+
+
+def test_changed_content_is_downloaded_again(origin, make_fetcher):
+    origin.routes["/logo.png"] = {"body": b"logo-v1", "etag": '"v1"'}
+    fetcher = make_fetcher(fresh_seconds=0)
+    fetcher.fetch(origin.url("/logo.png"))
+
+    origin.routes["/logo.png"] = {"body": b"logo-v2", "etag": '"v2"'}
+    assert fetcher.fetch(origin.url("/logo.png")) == b"logo-v2"
+    assert fetcher.digest(origin.url("/logo.png")) is not None
+
+
+def test_rejects_bodies_over_the_size_cap(origin, make_fetcher):
+    origin.routes["/big.png"] = {"body": b"x" * 5000}
+    fetcher = make_fetcher(max_bytes=1000)
+
+    with pytest.raises(RemoteAssetError, match="larger than"):
+        fetcher.fetch(origin.url("/big.png"))
+    assert fetcher.digest(origin.url("/big.png")) is None
+
+
+def test_socket_timeout(origin, make_fetcher):
+    origin.routes["/slow.png"] = {"body": b"slow", "delay": 2.0}
+    fetcher = make_fetcher(timeout=0.3)
+
+    started = time.monotonic()
+    with pytest.raises(RemoteAssetError):
+        fetcher.fetch(origin.url("/slow.png"))
+    assert time.monotonic() - started < 1.5
+
+
+def test_overall_deadline(origin, make_fetcher):
+    # every chunk arrives well within the socket timeout, the whole body doesn't
+    origin.routes["/trickle.png"] = {"body": b"x" * 8192, "trickle": 0.1}
+    fetcher = make_fetcher(timeout=2.0, deadline=0.3)
+
+    with pytest.raises(RemoteAssetError, match="deadline"):
+        fetcher.fetch(origin.url("/trickle.png"))
+
+
+def test_serves_cached_copy_when_the_origin_fails(origin, make_fetcher):
+    origin.routes["/logo.png"] = {"body": b"logo", "etag": '"v1"'}
+    fetcher = make_fetcher(fresh_seconds=0)
+    fetcher.fetch(origin.url("/logo.png"))
+
+    origin.routes["/logo.png"] = {"status": 500, "body": b"oops"}
+    assert fetcher.fetch(origin.url("/logo.png")) == b"logo"
+    assert fetcher.stats()["stale_served"] == 1
+
+
+def test_origin_failure_without_cache_raises(origin, make_fetcher):
+    origin.routes["/logo.png"] = {"status": 500, "body": b"oops"}
+    fetcher = make_fetcher()
+
+    with pytest.raises(RemoteAssetError, match="HTTP 500"):
+        fetcher.fetch(origin.url("/logo.png"))
+
+
+def test_prefetch_runs_concurrently(origin, make_fetcher):
+    paths = [f"/avatar{i}.png" for i in range(4)]
+    for path in paths:
+        origin.routes[path] = {"body": path.encode(), "delay": 0.5}
+    fetcher = make_fetcher(prefetch_workers=4)
+
+    started = time.monotonic()
+    # duplicates and local paths are ignored
+    refs = [origin.url(p) for p in paths] + [origin.url(paths[0]), "/tmp/local.png"]
+    futures = fetcher.prefetch(refs)
+    wait(futures)
+    assert len(futures) == len(paths)
+    assert time.monotonic() - started < 1.5
+
+    for path in paths:
+        assert fetcher.fetch(origin.url(path)) == path.encode()
+        assert origin.hits(path) == 1
+
+
+def test_concurrent_fetches_of_one_url_are_coalesced(origin, make_fetcher):
+    origin.routes["/logo.png"] = {"body": b"logo", "delay": 0.3}
+    fetcher = make_fetcher()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(fetcher.fetch(origin.url("/logo.png"))))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b"logo"] * 4
+    assert origin.hits("/logo.png") == 1
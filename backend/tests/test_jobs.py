@@ -0,0 +1,133 @@
+# test_jobs.py
+
+import sqlite3
+import time
+
+import pytest
+
+from poster_jobs import MAX_ATTEMPTS, STALE_SECONDS, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    store.open()
+    return store
+
+
+def _row(store, job_id):
+    with store._connect() as db:
+        return db.execute(
+            "SELECT status, owner, attempts, heartbeat_at, error FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+
+def _age(store, job_id, seconds):
+    """Pretend the job's last heartbeat was `seconds` ago."""
+    with store._connect() as db:
+        db.execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - seconds, job_id)
+        )
+
+
+def _stale_before():
+    return time.time() - STALE_SECONDS
+
+
+def test_claim_takes_the_oldest_queued_job(store):
+    first = store.add("render", [{}], 1)
+    second = store.add("render", [{}], 1)
+
+    assert store.claim("runner-a")["id"] == first
+    assert store.claim("runner-b")["id"] == second
+    assert store.claim("runner-a") is None
+
+    row = _row(store, first)
+    assert (row["status"], row["owner"], row["attempts"]) == ("running", "runner-a", 1)
+    assert row["heartbeat_at"] is not None
+
+
+def test_live_jobs_are_not_requeued(store):
+    job_id = store.add("render", [{}], 1)
+    store.claim("runner-a")
+    _age(store, job_id, STALE_SECONDS * 2)
+
+    store.heartbeat("runner-a")
+
+    assert store.requeue_stale(_stale_before()) == 0
+    assert _row(store, job_id)["status"] == "running"
+
+
+def test_only_stale_jobs_are_requeued(store):
+    dead = store.add("render", [{}], 1)
+    live = store.add("render", [{}], 1)
+    store.claim("runner-a")
+    store.claim("runner-b")
+    _age(store, dead, STALE_SECONDS * 2)
+
+    assert store.requeue_stale(_stale_before()) == 1
+
+    assert tuple(_row(store, dead))[:2] == ("queued", None)
+    assert tuple(_row(store, live))[:2] == ("running", "runner-b")
+    # the requeued job is claimable again and counts the new attempt
+    assert store.claim("runner-b")["id"] == dead
+    assert _row(store, dead)["attempts"] == 2
+
+
+def test_stale_job_fails_after_max_attempts(store):
+    job_id = store.add("render", [{}], 1)
+    for _ in range(MAX_ATTEMPTS):
+        assert store.claim("runner-a")["id"] == job_id
+        _age(store, job_id, STALE_SECONDS * 2)
+        store.requeue_stale(_stale_before())
+
+    row = _row(store, job_id)
+    assert (row["status"], row["attempts"]) == ("failed", MAX_ATTEMPTS)
+    assert row["error"] == "Interrupted too many times"
+    assert store.claim("runner-a") is None
+
+
+def test_a_runner_cannot_finish_a_job_it_lost(store):
+    job_id = store.add("render", [{}], 1)
+    store.claim("runner-a")
+    _age(store, job_id, STALE_SECONDS * 2)
+    store.requeue_stale(_stale_before())
+    store.claim("runner-b")
+
+    store.finish(job_id, "runner-a", "image/png", b"from-a")
+    store.fail(job_id, "runner-a", "boom")
+    assert _row(store, job_id)["status"] == "running"
+
+    store.finish(job_id, "runner-b", "image/png", b"from-b")
+    assert store.result(job_id) == ("image/png", b"from-b")
+
+
+def test_release_requeues_only_the_owners_jobs(store):
+    mine = store.add("render", [{}], 1)
+    theirs = store.add("render", [{}], 1)
+    store.claim("runner-a")
+    store.claim("runner-b")
+
+    assert store.release("runner-a") == 1
+
+    assert _row(store, mine)["status"] == "queued"
+    assert _row(store, theirs)["status"] == "running"
+
+
+def test_open_adds_columns_to_an_older_database(tmp_path):
+    path = tmp_path / "old.sqlite3"
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+        "payload TEXT NOT NULL, progress_done INTEGER NOT NULL DEFAULT 0, "
+        "progress_total INTEGER NOT NULL DEFAULT 1, created_at REAL NOT NULL, "
+        "started_at REAL, finished_at REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+        "error TEXT, cache_key TEXT, media_type TEXT, result BLOB)"
+    )
+    db.commit()
+    db.close()
+
+    store = JobStore(path)
+    store.open()
+    job_id = store.add("render", [{}], 1)
+    assert store.claim("runner-a")["id"] == job_id
@@ -0,0 +1,29 @@
+# test_piechart.py
+
+import pytest
+
+from pine_poster_adapter import render_pine_poster_from_config
+from poster_defaults import get_poster_default
+from poster_executor import CONFIG_ERRORS
+
+
+def _pie(values):
+    config = get_poster_default("pie")
+    return config.model_copy(update={
+        "labels": [f"Slice {i}" for i in range(len(values))],
+        "values": values,
+        "colors_hex": config.colors_hex[:len(values)],
+        "quality": "draft",
+    })
+
+
+def test_negative_values_are_a_config_error():
+    with pytest.raises(ValueError, match="non negative") as info:
+        render_pine_poster_from_config(_pie([5, -2, 3]))
+    assert isinstance(info.value, CONFIG_ERRORS)
+
+
+def test_all_zero_values_are_a_config_error():
+    with pytest.raises(ValueError, match="all be zero") as info:
+        render_pine_poster_from_config(_pie([0, 0, 0]))
+    assert isinstance(info.value, CONFIG_ERRORS)
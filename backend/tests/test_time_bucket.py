@@ -0,0 +1,37 @@
+# test_time_bucket.py
+
+import numpy as np
+
+from graph_datetime import apply_time_bucket
+
+
+def _dates(*days):
+    return np.array([f"2025-01-{d:02d}" for d in days], dtype="datetime64[us]")
+
+
+def test_no_bucket_keeps_the_input_order():
+    xs = _dates(20, 3, 11)
+    Y_left = np.array([[1.0, 2.0, 3.0]])
+    Y_right = np.array([10.0, 20.0, 30.0])
+
+    out_x, out_left, out_right = apply_time_bucket(xs, Y_left, Y_right, "none")
+
+    assert (out_x == xs).all()
+    assert out_left.tolist() == [[1.0, 2.0, 3.0]]
+    assert out_right.tolist() == [10.0, 20.0, 30.0]
+
+
+def test_bucketing_sorts_unsorted_points():
+    # Jan 20 and 21, 2025 share the week starting Monday Jan 20; Jan 3 is in the week of Dec 30
+    xs = _dates(21, 3, 20)
+    Y_left = np.array([[1.0, 2.0, 4.0]])
+    Y_right = np.array([10.0, 20.0, 40.0])
+
+    out_x, out_left, out_right = apply_time_bucket(
+        xs, Y_left, Y_right, "7d", agg_left="sum", agg_right="last"
+    )
+
+    assert out_x.tolist() == np.array(["2024-12-30", "2025-01-20"], dtype="datetime64[us]").tolist()
+    assert out_left.tolist() == [[2.0, 5.0]]
+    # "last" is the latest point of the bucket (Jan 21), not the last given
+    assert out_right.tolist() == [20.0, 10.0]
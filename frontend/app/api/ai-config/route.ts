@@ -84,6 +84,8 @@ type PieConfig = {
   template_name: string;
   date_str: string | null;
   center_image: string | null;   // READ-ONLY
+  top_n: number | null;          // keep the N largest, fold the rest into other_label
+  other_label: string;
   labels: string[];
   values: number[];
   colors_hex: string[] | null;
@@ -99,6 +101,8 @@ type BarConfig = {
   template_name: string;
   date_str: string | null;
   center_image: string | null;   // READ-ONLY
+  top_n: number | null;          // keep the N largest, fold the rest into other_label
+  other_label: string;
   labels: string[];
   values: number[];
   colors_hex: string[] | null;
@@ -117,6 +121,8 @@ type DualConfig = {
   template_name: string;
   date_str: string | null;
   center_image: string | null;   // READ-ONLY
+  top_n: number | null;          // keep the N largest, fold the rest into other_label
+  other_label: string;
 
   // X axis / left series
   x_values: string[];
@@ -129,6 +135,10 @@ type DualConfig = {
   include_zero_left: boolean;
   timeRange: "7d" | "30d" | "90d" | "180d" | "1y" | "all";
   timeBucket: "none" | "7d" | "30d" | "90d" | "180d" | "1y";
+  // per-bucket aggregation (only used when timeBucket != "none"); flows/volumes
+  // sum, prices/rates use "mean" or "last"
+  bucketAggLeft: "sum" | "mean" | "min" | "max" | "last" | "count";
+  bucketAggRight: "sum" | "mean" | "min" | "max" | "last" | "count";
 
   // Right axis (single numeric series)
   right_series: number[] | null;
@@ -404,6 +414,8 @@ You MUST return ONLY a single minified JSON object:
       dual.right_series_type = dual.right_series_type ?? "line";
       dual.timeRange = dual.timeRange ?? "all";
       dual.timeBucket = dual.timeBucket ?? "none";
+      dual.bucketAggLeft = dual.bucketAggLeft ?? "sum";
+      dual.bucketAggRight = dual.bucketAggRight ?? "sum";
     }
 
     // ---------------------------------------------------------------------
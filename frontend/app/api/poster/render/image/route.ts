@@ -0,0 +1,53 @@
+// app/api/poster/render/image/route.ts
+
+import { NextRequest, NextResponse } from "next/server";
+
+const BACKEND_BASE =
+  process.env.BACKEND_BASE_URL ?? "http://127.0.0.1:8000";
+
+// Headers passed through in each direction; the image body is streamed,
+// never buffered here.
+const REQUEST_HEADERS = ["if-none-match"];
+const RESPONSE_HEADERS = [
+  "content-type",
+  "content-length",
+  "etag",
+  "cache-control",
+  "content-location",
+  "x-poster-cached",
+];
+
+export async function POST(req: NextRequest) {
+  const headers: Record<string, string> = {
+    "Content-Type": "application/json",
+  };
+  for (const name of REQUEST_HEADERS) {
+    const value = req.headers.get(name);
+    if (value) headers[name] = value;
+  }
+
+  const query = req.nextUrl.search;
+  const res = await fetch(`${BACKEND_BASE}/poster/render/image${query}`, {
+    method: "POST",
+    headers,
+    body: await req.text(),
+  });
+
+  if (!res.ok && res.status !== 304) {
+    const text = await res.text();
+    return NextResponse.json(
+      { error: text || `Backend error ${res.status}` },
+      { status: res.status }
+    );
+  }
+
+  const outHeaders = new Headers();
+  for (const name of RESPONSE_HEADERS) {
+    const value = res.headers.get(name);
+    if (value) outHeaders.set(name, value);
+  }
+  return new NextResponse(res.status === 304 ? null : res.body, {
+    status: res.status,
+    headers: outHeaders,
+  });
+}
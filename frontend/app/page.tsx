@@ -1,7 +1,7 @@
 // app/page.tsx (or wherever this lives)
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   PosterType,
   PosterConfig,
@@ -10,7 +10,6 @@ import {
   DualConfig,
   TimeRange,
   TimeBucket,
-  RenderResponse,
   BindingState,       // ✅ use this instead of QueryBinding
   DualDataBinding,
   BarDataBinding,
@@ -26,6 +25,7 @@ import { DualPosterEditor } from "@/components/DualPosterEditor";
 import { PosterPreview } from "@/components/PosterPreview";
 import { ConfigChatPanel } from "@/components/ConfigChatPanel";
 import { ThemeToggle } from "@/components/ThemeToggle";
+import { usePreviewSocket } from "@/lib/usePreviewSocket";
 
 interface CatalogDbResponse {
   dbs: string[];
@@ -41,6 +41,19 @@ interface CatalogColumnsResponse {
 }
 
 const API_BASE = "http://127.0.0.1:8000";
+const PREVIEW_WS_URL = `${API_BASE.replace(/^http/, "ws")}/poster/preview/ws`;
+
+const EXTENSIONS: Record<string, string> = {
+  "image/png": "png",
+  "image/webp": "webp",
+  "image/jpeg": "jpg",
+};
+
+interface FullRender {
+  config: PosterConfig;
+  blob: Blob;
+  etag: string;
+}
 
 function isPie(config: PosterConfig): config is PieConfig {
   return config.poster_type === "pie";
@@ -80,11 +93,42 @@ export default function Page() {
   const [, setCatalogLoading] = useState(false);
   const [, setCatalogError] = useState<string | null>(null);
 
-  const [imageBase64, setImageBase64] = useState<string | null>(null);
+  const [imageUrl, setImageUrl] = useState<string | null>(null);
   const [loadingDefaults, setLoadingDefaults] = useState(false);
   const [rendering, setRendering] = useState(false);
+  const [downloading, setDownloading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
+  // Last HTTP render at the config's own quality: what Download saves.
+  const fullRenderRef = useRef<FullRender | null>(null);
+  // Preview frames for edits up to this seq predate that render.
+  const fullRenderSeqRef = useRef(0);
+
+  const showImage = (blob: Blob | null) => {
+    setImageUrl((previous) => {
+      if (previous) URL.revokeObjectURL(previous);
+      return blob ? URL.createObjectURL(blob) : null;
+    });
+  };
+
+  // Live preview: every edit goes to the socket, which only answers with
+  // the newest render (preview tier). Those frames are for the screen only;
+  // "Render poster" and Download use the config's own quality over HTTP.
+  const preview = usePreviewSocket(PREVIEW_WS_URL, {
+    onFrame: (blob, frame) => {
+      if (frame.seq <= fullRenderSeqRef.current) return;
+      setError(null);
+      showImage(blob);
+    },
+    onError: (detail) =>
+      setError(typeof detail === "string" ? detail : JSON.stringify(detail)),
+  });
+  const sendPreview = preview.send;
+
+  useEffect(() => {
+    if (config) sendPreview(config);
+  }, [config, sendPreview]);
+
   const cleanupUploadsForConfig = async (cfg: PosterConfig | null) => {
     if (!cfg) return;
 
@@ -116,7 +160,7 @@ export default function Page() {
       try {
         setError(null);
         setLoadingDefaults(true);
-        setImageBase64(null);
+        showImage(null);
 
         const res = await fetch(
           `${API_BASE}/poster/default?poster_type=${type}`,
@@ -198,31 +242,45 @@ export default function Page() {
     // config is reloaded by the effect above
   };
 
+  // Raw image bytes (no base64/JSON round trip); the backend answers 304
+  // when the config's ETag matches the full render we already hold.
+  const fetchFullRender = async (cfg: PosterConfig): Promise<FullRender> => {
+    const previous = fullRenderRef.current;
+    const headers: Record<string, string> = {
+      "Content-Type": "application/json",
+    };
+    if (previous) headers["If-None-Match"] = previous.etag;
+
+    const res = await fetch(`${API_BASE}/poster/render/image`, {
+      method: "POST",
+      headers,
+      body: JSON.stringify(cfg),
+    });
+    if (res.status === 304 && previous) {
+      fullRenderRef.current = { ...previous, config: cfg };
+      return fullRenderRef.current;
+    }
+    if (!res.ok) {
+      const text = await res.text();
+      throw new Error(text || `HTTP ${res.status}`);
+    }
+    fullRenderRef.current = {
+      config: cfg,
+      blob: await res.blob(),
+      etag: res.headers.get("ETag") ?? "",
+    };
+    return fullRenderRef.current;
+  };
+
   const handleRender = async () => {
     if (!config) return;
     try {
       setError(null);
       setRendering(true);
+      fullRenderSeqRef.current = preview.lastSeq();
 
-      const res = await fetch(`${API_BASE}/poster/render`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify(config),
-      });
-      if (!res.ok) {
-        const text = await res.text();
-        throw new Error(text || `HTTP ${res.status}`);
-      }
-      const data = (await res.json()) as RenderResponse;
-
-      if (!data.ok) {
-        throw new Error("Render failed");
-      }
-
-      setImageBase64(data.image_base64);
-      // Optionally: setConfig(data.config_used);
+      const { blob } = await fetchFullRender(config);
+      showImage(blob);
     } catch (e: any) {
       console.error(e);
       setError(e.message ?? "Failed to render poster");
@@ -231,13 +289,41 @@ export default function Page() {
     }
   };
 
+  // Downloads are always the config's own quality, never a preview frame.
+  const handleDownload = async () => {
+    if (!config) return;
+    try {
+      setError(null);
+      setDownloading(true);
+      const current = fullRenderRef.current;
+      const { blob } =
+        current && current.config === config
+          ? current
+          : await fetchFullRender(config);
+
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `pine_poster_${posterType}.${
+        EXTENSIONS[blob.type] ?? "png"
+      }`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (e: any) {
+      console.error(e);
+      setError(e.message ?? "Failed to download poster");
+    } finally {
+      setDownloading(false);
+    }
+  };
+
   const handleResetDefaults = () => {
     // Explicitly refetch defaults for current posterType
     (async () => {
       try {
         setError(null);
         setLoadingDefaults(true);
-        setImageBase64(null);
+        showImage(null);
         await cleanupUploadsForConfig(config);
         const res = await fetch(
           `${API_BASE}/poster/default?poster_type=${posterType}`,
@@ -350,9 +436,10 @@ export default function Page() {
         <section className="preview-panel">
           <div className="preview-section">
             <PosterPreview
-              imageBase64={imageBase64}
-              rendering={rendering}
-              posterType={posterType}
+              imageUrl={imageUrl}
+              rendering={rendering || preview.pending}
+              downloading={downloading}
+              onDownload={handleDownload}
             />
           </div>
 
@@ -10,6 +10,7 @@ import type {
   UiPoint,
   TimeRange,
   TimeBucket,
+  BucketAgg,
 } from "@/lib/types";
 import { HighlightEditor } from "./HighlightEditor";
 
@@ -125,6 +126,15 @@ function fromUiHighlights(
   };
 }
 
+const BUCKET_AGG_OPTIONS: { value: BucketAgg; label: string }[] = [
+  { value: "sum", label: "Sum" },
+  { value: "mean", label: "Average" },
+  { value: "min", label: "Min" },
+  { value: "max", label: "Max" },
+  { value: "last", label: "Last value" },
+  { value: "count", label: "Count" },
+];
+
 // ---- main component ----
 
 export function DualFields({ config, onChange }: Props) {
@@ -134,6 +144,9 @@ export function DualFields({ config, onChange }: Props) {
   const xValues = useMemo(() => config.x_values ?? [], [config.x_values]);
   const timeRange: TimeRange = (config.timeRange as TimeRange) ?? "all";
   const timeBucket: TimeBucket = (config.timeBucket as TimeBucket) ?? "none";
+  const bucketAggLeft: BucketAgg =
+    typeof config.bucketAggLeft === "string" ? config.bucketAggLeft : "sum";
+  const bucketAggRight: BucketAgg = config.bucketAggRight ?? "sum";
   const leftSeriesLabels = useMemo(
     () => Object.keys(config.y_series ?? {}),
     [config.y_series],
@@ -334,10 +347,46 @@ export function DualFields({ config, onChange }: Props) {
             <option value="1y">Year (Jan 1)</option>
           </select>
           <p className="field-help">
-            Buckets datetime x-values and sums all series before plotting.
+            Buckets datetime x-values and aggregates each series before
+            plotting.
           </p>
         </div>
 
+        {timeBucket !== "none" && (
+          <div className="field-row">
+            <label htmlFor="dual-bucket-agg-left">Bucket aggregation</label>
+            <select
+              id="dual-bucket-agg-left"
+              value={bucketAggLeft}
+              onChange={(e) =>
+                updateConfig({ bucketAggLeft: e.target.value as BucketAgg })
+              }
+            >
+              {BUCKET_AGG_OPTIONS.map((opt) => (
+                <option key={opt.value} value={opt.value}>
+                  Left: {opt.label}
+                </option>
+              ))}
+            </select>
+            <select
+              id="dual-bucket-agg-right"
+              value={bucketAggRight}
+              onChange={(e) =>
+                updateConfig({ bucketAggRight: e.target.value as BucketAgg })
+              }
+            >
+              {BUCKET_AGG_OPTIONS.map((opt) => (
+                <option key={opt.value} value={opt.value}>
+                  Right: {opt.label}
+                </option>
+              ))}
+            </select>
+            <p className="field-help">
+              E.g. sum volumes on the left, average a price on the right.
+            </p>
+          </div>
+        )}
+
         {/* 2. Left series */}
         <div className="field-row">
           <label htmlFor="dual-left-series">
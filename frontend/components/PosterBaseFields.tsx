@@ -167,6 +167,41 @@ export function PosterBaseFields({ config, onChange }: Props) {
           </p>
         </div>
 
+        <div className="field-row">
+          <label htmlFor="poster-top-n">Top categories</label>
+          <input
+            id="poster-top-n"
+            type="number"
+            min={1}
+            placeholder="Show all"
+            value={config.top_n ?? ""}
+            onChange={(e) =>
+              update({
+                top_n: e.target.value ? Math.max(1, Number(e.target.value)) : null,
+              } as PosterConfig)
+            }
+          />
+          <p className="field-help">
+            Keep the N largest slices, bars or series; the rest are summed into
+            one entry.
+          </p>
+        </div>
+
+        {config.top_n ? (
+          <div className="field-row">
+            <label htmlFor="poster-other-label">Other label</label>
+            <input
+              id="poster-other-label"
+              type="text"
+              value={config.other_label ?? "Other"}
+              onChange={(e) =>
+                update({ other_label: e.target.value || undefined } as PosterConfig)
+              }
+            />
+            <p className="field-help">Name of the folded entry.</p>
+          </div>
+        ) : null}
+
         <div className="field-row">
           <label htmlFor="poster-date">Footer date override</label>
           <input
@@ -1,20 +1,22 @@
 "use client";
 
 import Image from "next/image";
-import type { PosterType } from "@/lib/types";
 
 interface Props {
-  imageBase64: string | null;
+  imageUrl: string | null; // object URL of the image on screen (may be a preview frame)
   rendering: boolean;
-  posterType: PosterType;
+  downloading?: boolean;
+  // saves the poster at the config's own quality, not the on-screen frame
+  onDownload: () => void;
 }
 
-export function PosterPreview({ imageBase64, rendering, posterType }: Props) {
-  const hasImage = !!imageBase64;
-
-  const dataUrl = hasImage
-    ? `data:image/png;base64,${imageBase64}`
-    : undefined;
+export function PosterPreview({
+  imageUrl,
+  rendering,
+  downloading = false,
+  onDownload,
+}: Props) {
+  const hasImage = !!imageUrl;
 
   return (
     <>
@@ -22,14 +24,12 @@ export function PosterPreview({ imageBase64, rendering, posterType }: Props) {
       <div className="preview-header-row">
         <h2 className="preview-title">Preview</h2>
 
-        {hasImage && dataUrl && (
-          <a
-            href={dataUrl}
-            download={`pine_poster_${posterType}.png`}
-            className="preview-download-link"
-          >
-            <button type="button">Download PNG</button>
-          </a>
+        {hasImage && (
+          <span className="preview-download-link">
+            <button type="button" onClick={onDownload} disabled={downloading}>
+              {downloading ? "Preparing..." : "Download"}
+            </button>
+          </span>
         )}
       </div>
 
@@ -43,9 +43,9 @@ export function PosterPreview({ imageBase64, rendering, posterType }: Props) {
           </div>
         )}
 
-        {hasImage && dataUrl && (
+        {hasImage && imageUrl && (
           <Image
-            src={dataUrl}
+            src={imageUrl}
             alt="Poster preview"
             className="preview-image"
             width={1200}
@@ -7,6 +7,19 @@ export type PosterType = "pie" | "bar" | "dual";
 
 export type TimeRange = "7d" | "30d" | "90d" | "180d" | "1y" | "all";
 export type TimeBucket = "none" | "7d" | "30d" | "90d" | "180d" | "1y";
+export type BucketAgg = "sum" | "mean" | "min" | "max" | "last" | "count";
+
+export type RenderQuality = "draft" | "preview" | "standard" | "export";
+export type OutputFormat = "png" | "webp" | "jpeg";
+
+// Encoder settings; unset fields use the quality tier's defaults
+export interface OutputOptions {
+  format?: OutputFormat | null;
+  quality?: number | null; // WebP / JPEG, 1-100
+  lossless?: boolean | null; // WebP
+  compress_level?: number | null; // PNG 0-9, WebP effort (max 6)
+  colors?: number | null; // palette size, 2-256
+}
 
 export interface BasePosterConfig {
   poster_type: PosterType;
@@ -14,6 +27,12 @@ export interface BasePosterConfig {
   subtitle?: string;
   note_value?: string;
   template_name?: string;
+  // render resolution tier; layout is identical across tiers
+  quality?: RenderQuality;
+  output?: OutputOptions | null;
+  // keep the N largest categories / left series, fold the rest into "Other"
+  top_n?: number | null;
+  other_label?: string;
   date_str?: string | null;
   center_image?: string | null; // backend file path
 }
@@ -80,6 +99,11 @@ export interface DualConfig extends BasePosterConfig {
   timeRange: TimeRange;
   // optional aggregation window (calendar bucket) applied before plotting
   timeBucket: TimeBucket;
+  // per-bucket aggregation: one for all left series or { series name: agg }
+  bucketAggLeft?: BucketAgg | Record<string, BucketAgg>;
+  bucketAggRight?: BucketAgg;
+  // drawing budget for dense series; null = ~2 per chart pixel, 0 = all points
+  max_points?: number | null;
 }
 
 export type PosterConfig = PieConfig | BarConfig | DualConfig;
@@ -87,9 +111,28 @@ export type PosterConfig = PieConfig | BarConfig | DualConfig;
 export interface RenderResponse {
   ok: boolean;
   image_base64: string;
+  media_type: string;
+  cache_key: string;
+  cached: boolean;
   config_used: PosterConfig;
 }
 
+// Messages from the /poster/preview/ws live-preview socket; a "frame" is
+// followed by one binary message with the image bytes.
+export type PreviewMessage =
+  | { type: "rendering"; seq: number }
+  | { type: "unchanged"; seq: number; cache_key: string }
+  | { type: "error"; seq: number | null; detail: unknown }
+  | {
+      type: "frame";
+      seq: number;
+      cache_key: string;
+      media_type: string;
+      quality: RenderQuality;
+      cached: boolean;
+      render_ms: number;
+    };
+
 // ===================
 // Highlight UI types
 // ===================
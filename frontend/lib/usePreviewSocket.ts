@@ -0,0 +1,102 @@
+// lib/usePreviewSocket.ts
+"use client";
+
+import { useCallback, useEffect, useRef, useState } from "react";
+import type { PosterConfig, PreviewMessage } from "@/lib/types";
+
+const RECONNECT_MS = 1000;
+
+type FrameMessage = Extract<PreviewMessage, { type: "frame" }>;
+
+interface Options {
+  onFrame: (blob: Blob, frame: FrameMessage) => void;
+  onError?: (detail: unknown) => void;
+}
+
+/**
+ * Live preview over a WebSocket: call `send(config)` on every edit. The
+ * backend coalesces bursts and only pushes the newest frame, so the caller
+ * never has to debounce or cancel anything itself.
+ */
+export function usePreviewSocket(url: string, { onFrame, onError }: Options) {
+  const socketRef = useRef<WebSocket | null>(null);
+  const seqRef = useRef(0);
+  const latestRef = useRef<PosterConfig | null>(null);
+  const headerRef = useRef<FrameMessage | null>(null);
+  const handlers = useRef({ onFrame, onError });
+  handlers.current = { onFrame, onError };
+
+  const [connected, setConnected] = useState(false);
+  // seq of the newest edit the backend hasn't answered yet
+  const [pendingSeq, setPendingSeq] = useState<number | null>(null);
+
+  const post = useCallback((config: PosterConfig) => {
+    const socket = socketRef.current;
+    if (!socket || socket.readyState !== WebSocket.OPEN) return;
+    seqRef.current += 1;
+    setPendingSeq(seqRef.current);
+    socket.send(JSON.stringify({ seq: seqRef.current, config }));
+  }, []);
+
+  useEffect(() => {
+    let closed = false;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    const open = () => {
+      const socket = new WebSocket(url);
+      socket.binaryType = "blob";
+      socketRef.current = socket;
+
+      socket.onopen = () => {
+        setConnected(true);
+        // re-sync a config edited while disconnected
+        if (latestRef.current) post(latestRef.current);
+      };
+      socket.onmessage = (event) => {
+        if (typeof event.data !== "string") {
+          const header = headerRef.current;
+          headerRef.current = null;
+          if (!header) return;
+          const blob = new Blob([event.data], { type: header.media_type });
+          handlers.current.onFrame(blob, header);
+          return;
+        }
+        const message = JSON.parse(event.data) as PreviewMessage;
+        if (message.type === "frame") {
+          headerRef.current = message;
+        } else if (message.type === "error") {
+          handlers.current.onError?.(message.detail);
+        }
+        if (message.type !== "rendering" && message.seq === seqRef.current) {
+          setPendingSeq(null);
+        }
+      };
+      socket.onclose = () => {
+        setConnected(false);
+        setPendingSeq(null);
+        if (!closed) retry = setTimeout(open, RECONNECT_MS);
+      };
+    };
+
+    open();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      socketRef.current?.close();
+      socketRef.current = null;
+    };
+  }, [url, post]);
+
+  const send = useCallback(
+    (config: PosterConfig) => {
+      latestRef.current = config;
+      post(config);
+    },
+    [post],
+  );
+
+  // seq of the newest edit sent so far (frames carry the seq they render)
+  const lastSeq = useCallback(() => seqRef.current, []);
+
+  return { send, lastSeq, connected, pending: pendingSeq !== null };
+}